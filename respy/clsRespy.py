@@ -21,6 +21,7 @@ from respy.python.shared.shared_auxiliary import distribute_parameters
 from respy.python.shared.shared_auxiliary import get_est_info
 from respy.python.shared.shared_auxiliary import remove_scratch
 from respy.python.shared.shared_auxiliary import replace_missing_values
+from respy.python.shared.shared_constants import DATA_FILE_FORMATS
 from respy.python.shared.shared_constants import DATA_FORMATS_SIM
 from respy.python.shared.shared_constants import DATA_LABELS_SIM
 from respy.python.shared.shared_constants import OPT_EST_FORT
@@ -28,6 +29,7 @@ from respy.python.shared.shared_constants import OPT_EST_PYTH
 from respy.python.simulate.simulate_auxiliary import check_dataset_sim
 from respy.python.simulate.simulate_auxiliary import write_info
 from respy.python.simulate.simulate_auxiliary import write_out
+from respy.python.simulate.simulate_auxiliary import write_out_chunks
 
 
 class RespyCls(object):
@@ -265,15 +267,23 @@ class RespyCls(object):
         return x, val
 
     def simulate(self):
-        """Simulate dataset of synthetic agents following the model."""
+        """Simulate dataset of synthetic agents following the model.
+
+        If the agents are simulated in chunks, each chunk is written to disk as soon as
+        it is simulated and the full dataset is never held in memory. Then, the
+        returned dataset is None and the sample is read from the file with the
+        simulated sample.
+
+        """
         # Distribute class attributes
-        is_debug, version, is_store, file_sim = dist_class_attributes(
-            self, "is_debug", "version", "is_store", "file_sim"
+        is_debug, version, is_store, file_sim, is_info_sim = dist_class_attributes(
+            self, "is_debug", "version", "is_store", "file_sim", "is_info_sim"
         )
+        chunk_size_sim = self.get_attr("chunk_size_sim")
 
         # Cleanup
-        for ext in ["sim", "sol", "dat", "info"]:
-            fname = file_sim + ".respy." + ext
+        for suffix in [".sim", ".sol", ".info", ".pkl", *DATA_FILE_FORMATS.values()]:
+            fname = file_sim + ".respy" + suffix
             if os.path.exists(fname):
                 os.unlink(fname)
 
@@ -317,28 +327,47 @@ class RespyCls(object):
         if is_store:
             self.store("solution.respy.pkl")
 
-        # ====================================================================
-        # todo: harmonize python and fortran
-        # ====================================================================
-        if self.attr["version"] == "python":
-            data_frame = data_array[DATA_LABELS_SIM]
-        elif self.attr["version"] == "fortran":
-            data_frame = pd.DataFrame(
-                data=replace_missing_values(data_array), columns=DATA_LABELS_SIM
-            )
-        else:
-            raise NotImplementedError
+        # The chunks are only simulated while they are written to disk.
+        if chunk_size_sim is not None:
+            try:
+                write_out_chunks(
+                    self, (_process_simulated_data(self, chunk) for chunk in data_array)
+                )
+            finally:
+                data_array.close()
 
-        data_frame = data_frame.astype(DATA_FORMATS_SIM)
+            return self, None
 
-        # ====================================================================
-        data_frame.set_index(["Identifier", "Period"], drop=False, inplace=True)
+        data_frame = _process_simulated_data(self, data_array)
 
         # Checks
         if is_debug:
             check_dataset_sim(data_frame, self)
 
         write_out(self, data_frame)
-        write_info(self, data_frame)
+        if is_info_sim:
+            write_info(self, data_frame)
 
         return self, data_frame
+
+
+def _process_simulated_data(respy_obj, data_array):
+    """Convert the simulated data to a data frame indexed by agents and periods."""
+    # ====================================================================
+    # todo: harmonize python and fortran
+    # ====================================================================
+    if respy_obj.attr["version"] == "python":
+        data_frame = data_array[DATA_LABELS_SIM]
+    elif respy_obj.attr["version"] == "fortran":
+        data_frame = pd.DataFrame(
+            data=replace_missing_values(data_array), columns=DATA_LABELS_SIM
+        )
+    else:
+        raise NotImplementedError
+
+    data_frame = data_frame.astype(DATA_FORMATS_SIM)
+
+    # ====================================================================
+    data_frame.set_index(["Identifier", "Period"], drop=False, inplace=True)
+
+    return data_frame
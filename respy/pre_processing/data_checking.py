@@ -4,8 +4,13 @@ from respy.python.shared.shared_auxiliary import dist_class_attributes
 from respy.python.shared.shared_constants import DATA_LABELS_EST
 
 
-def check_estimation_dataset(data_frame, respy_obj):
-    """Run consistency checks on data_frame."""
+def check_estimation_dataset(data_frame, respy_obj, is_chunk=False):
+    """Run consistency checks on data_frame.
+
+    If ``is_chunk`` is true, the dataset contains only some of the agents and the number
+    of agents is not checked.
+
+    """
     # Distribute class attributes
     num_periods, edu_spec, num_agents_est = dist_class_attributes(
         respy_obj, "num_periods", "edu_spec", "num_agents_est"
@@ -95,7 +100,10 @@ def check_estimation_dataset(data_frame, respy_obj):
     # estimation is available. We do not enforce a strict equality here as a
     # simulated dataset is checked for its estimation suitability in
     # general, i.e. before any constraints on initial conditions.
-    np.testing.assert_equal(data_frame["Identifier"].nunique() >= num_agents_est, True)
+    if not is_chunk:
+        np.testing.assert_equal(
+            data_frame["Identifier"].nunique() >= num_agents_est, True
+        )
 
 
 def check_state_variables(agent):
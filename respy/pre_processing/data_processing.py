@@ -1,3 +1,6 @@
+import os
+
+import numpy as np
 import pandas as pd
 
 from respy.pre_processing.data_checking import check_estimation_dataset
@@ -13,7 +16,7 @@ def process_dataset(respy_obj):
     )
 
     # Process dataset from files.
-    data_frame = pd.read_csv(file_est, delim_whitespace=True, header=0, na_values=".")
+    data_frame = read_dataset(file_est)
     data_frame.set_index(["Identifier", "Period"], drop=False, inplace=True)
 
     # We want to allow to estimate with only a subset of periods in the sample.
@@ -50,3 +53,26 @@ def process_dataset(respy_obj):
 
     # Finishing
     return data_frame
+
+
+def read_dataset(fname):
+    """Read a dataset from a text file or a columnar binary file.
+
+    The format is determined by the file extension. Files ending with ``.parquet``,
+    ``.feather`` or ``.npz`` are read as binary files, e.g. written by
+    :func:`~respy.python.simulate.simulate_auxiliary.write_dataset`. All other files
+    are text files whose columns are separated by whitespace.
+
+    """
+    suffix = os.path.splitext(fname)[1]
+    if suffix == ".parquet":
+        data_frame = pd.read_parquet(fname)
+    elif suffix == ".feather":
+        data_frame = pd.read_feather(fname)
+    elif suffix == ".npz":
+        with np.load(fname) as arrays:
+            data_frame = pd.DataFrame({label: arrays[label] for label in arrays.files})
+    else:
+        data_frame = pd.read_csv(fname, delim_whitespace=True, header=0, na_values=".")
+
+    return data_frame
@@ -1,3 +1,7 @@
+import importlib.util
+import os
+import sys
+
 import numpy as np
 import pandas as pd
 
@@ -5,6 +9,7 @@ from respy.custom_exceptions import UserError
 from respy.python.shared.shared_auxiliary import check_model_parameters
 from respy.python.shared.shared_auxiliary import get_optim_paras
 from respy.python.shared.shared_auxiliary import replace_missing_values
+from respy.python.shared.shared_constants import DATA_FILE_FORMATS
 from respy.python.shared.shared_constants import IS_FORTRAN
 from respy.python.shared.shared_constants import IS_PARALLELISM_MPI
 from respy.python.shared.shared_constants import IS_PARALLELISM_OMP
@@ -23,14 +28,11 @@ def check_model_attributes(attr_dict):
     # Parallelism
     assert isinstance(a["num_procs"], int)
     assert a["num_procs"] > 0
-    if a["num_procs"] > 1:
-        assert a["version"] == "fortran"
-
-    assert isinstance(a["num_procs"], int)
-    assert a["num_procs"] > 0
-    if a["num_procs"] > 1:
-        assert a["version"] == "fortran"
+    if a["num_procs"] > 1 and a["version"] == "fortran":
         assert IS_PARALLELISM_MPI
+    if a["num_procs"] > 1 and a["version"] == "python":
+        # The process pool relies on shared memory which requires Python 3.8.
+        assert sys.version_info >= (3, 8)
 
     # Version version of package
     assert a["version"] in ["fortran", "python"]
@@ -61,6 +63,25 @@ def check_model_attributes(attr_dict):
         assert isinstance(num_agents, int)
         assert num_agents > 0
 
+    # Simulation in chunks of agents which is only available in the Python version
+    if a["chunk_size_sim"] is not None:
+        assert isinstance(a["chunk_size_sim"], int)
+        assert a["chunk_size_sim"] > 0
+        assert a["version"] == "python"
+
+    # Format of the file with the simulated sample and the optional report. In chunks,
+    # the sample is appended to the file which is not possible for all formats.
+    assert a["format_sim"] in DATA_FILE_FORMATS
+    if a["chunk_size_sim"] is not None:
+        assert a["format_sim"] in ["text", "parquet"]
+
+    # Parquet and Feather files are written and read with pyarrow.
+    is_arrow = a["format_sim"] in ["parquet", "feather"]
+    is_arrow |= os.path.splitext(a["file_est"])[1] in [".parquet", ".feather"]
+    if is_arrow:
+        assert importlib.util.find_spec("pyarrow") is not None
+    assert a["is_info_sim"] in [True, False]
+
     # Number of periods
     assert np.isfinite(a["num_periods"])
     assert isinstance(a["num_periods"], int)
@@ -71,9 +92,71 @@ def check_model_attributes(attr_dict):
     assert isinstance(a["num_draws_emax"], int)
     assert a["num_draws_emax"] >= 0
 
+    # Sequences of draws for Monte Carlo integration which are only available in the
+    # Python version
+    for key in ["sequence_emax", "sequence_prob"]:
+        assert a[key] in ["random", "sobol", "halton"]
+        if a[key] != "random":
+            assert a["version"] == "python"
+            # The sequences are implemented in scipy.stats.qmc since scipy 1.7.
+            assert importlib.util.find_spec("scipy.stats.qmc") is not None
+
+    # Quadrature for the integration of the expected maximum utility which is only
+    # available in the Python version
+    assert a["integration_emax"] in ["monte-carlo", "quadrature"]
+    assert a["quadrature_rule"] in ["product", "smolyak"]
+    assert isinstance(a["quadrature_nodes"], int)
+    assert a["quadrature_nodes"] > 0
+    if a["integration_emax"] == "quadrature":
+        assert a["version"] == "python"
+
+    # Variance reduction for Monte Carlo integration which is only available in the
+    # Python version
+    for key in ["is_antithetic_emax", "is_antithetic_prob", "is_control_variate"]:
+        assert a[key] in [True, False]
+        if a[key]:
+            assert a["version"] == "python"
+
+    # Adaptive number of draws for Monte Carlo integration which is only available in
+    # the Python version and requires independent draws with equal weights
+    if a["tolerance_emax"] is not None:
+        assert isinstance(a["tolerance_emax"], float)
+        assert a["tolerance_emax"] > 0
+        assert a["num_draws_emax"] > 0
+        assert a["version"] == "python"
+        assert a["integration_emax"] == "monte-carlo"
+        assert not a["is_antithetic_emax"]
+        assert not a["is_control_variate"]
+        assert a["sequence_emax"] == "random"
+
     # Debugging mode
     assert a["is_debug"] in [True, False]
 
+    # Cache of the state space which is only available in the Python version
+    assert a["state_space_cache"] is None or isinstance(a["state_space_cache"], str)
+    if a["state_space_cache"] is not None:
+        assert a["version"] == "python"
+
+    # Indexer of the state space which is only available in the Python version
+    assert a["indexer_type"] in ["dense", "compact"]
+    if a["indexer_type"] == "compact":
+        assert a["version"] == "python"
+
+    # Streaming evaluation of the likelihood which is only available in the Python
+    # version and is not combined with the evaluation of the contributions in a pool of
+    # processes
+    assert a["is_streaming"] in [True, False]
+    if a["is_streaming"]:
+        assert a["version"] == "python"
+        assert a["num_procs"] == 1
+
+    # Cache of the criterion function which is only available in the Python version
+    assert isinstance(a["cache_size"], int)
+    assert a["cache_size"] >= 0
+    assert a["file_cache"] is None or isinstance(a["file_cache"], str)
+    if a["cache_size"] > 0 or a["file_cache"] is not None:
+        assert a["version"] == "python"
+
     # Window for smoothing parameter
     assert isinstance(a["tau"], float)
     assert a["tau"] > 0
@@ -114,7 +197,7 @@ def check_model_attributes(attr_dict):
     np.testing.assert_almost_equal(np.sum(a["edu_spec"]["share"]), 1.0, decimal=4)
 
     # Derivatives
-    assert a["derivatives"] in ["forward-differences"]
+    assert a["derivatives"] in ["forward-differences", "central-differences"]
 
     # Check model parameters
     check_model_parameters(a["optim_paras"])
@@ -37,12 +37,20 @@ def _options_spec_from_attributes(attr):
         "optimizer": attr["optimizer_used"],
         "seed": attr["seed_prob"],
         "tau": attr["tau"],
+        "streaming": attr["is_streaming"],
+        "cache": attr["cache_size"],
+        "cache_file": attr["file_cache"],
+        "sequence": attr["sequence_prob"],
+        "antithetic": attr["is_antithetic_prob"],
     }
 
     simulation = {
         "file": attr["file_sim"],
         "agents": attr["num_agents_sim"],
         "seed": attr["seed_sim"],
+        "chunk_size": attr["chunk_size_sim"],
+        "format": attr["format_sim"],
+        "info": attr["is_info_sim"],
     }
 
     program = {
@@ -61,6 +69,15 @@ def _options_spec_from_attributes(attr):
         "store": attr["is_store"],
         "seed": attr["seed_emax"],
         "draws": attr["num_draws_emax"],
+        "cache_dir": attr["state_space_cache"],
+        "indexer": attr["indexer_type"],
+        "sequence": attr["sequence_emax"],
+        "integration": attr["integration_emax"],
+        "rule": attr["quadrature_rule"],
+        "nodes": attr["quadrature_nodes"],
+        "antithetic": attr["is_antithetic_emax"],
+        "control_variate": attr["is_control_variate"],
+        "tolerance": attr["tolerance_emax"],
     }
 
     options_spec = {
@@ -98,12 +115,29 @@ def _params_spec_from_attributes(attr):
 
 def _create_attribute_dictionary(params_spec, options_spec):
     attr = {
+        "cache_size": int(options_spec["estimation"].get("cache", 0)),
+        "chunk_size_sim": options_spec["simulation"].get("chunk_size"),
         "edu_max": int(options_spec["edu_spec"]["max"]),
+        "file_cache": options_spec["estimation"].get("cache_file"),
         "file_est": str(options_spec["estimation"]["file"]),
         "file_sim": str(options_spec["simulation"]["file"]),
+        "format_sim": str(options_spec["simulation"].get("format", "text")),
+        "indexer_type": str(options_spec["solution"].get("indexer", "dense")),
+        "integration_emax": str(
+            options_spec["solution"].get("integration", "monte-carlo")
+        ),
+        "is_antithetic_emax": bool(options_spec["solution"].get("antithetic", False)),
+        "is_antithetic_prob": bool(
+            options_spec["estimation"].get("antithetic", False)
+        ),
+        "is_control_variate": bool(
+            options_spec["solution"].get("control_variate", False)
+        ),
         "is_debug": bool(options_spec["program"]["debug"]),
+        "is_info_sim": bool(options_spec["simulation"].get("info", True)),
         "is_interpolated": bool(options_spec["interpolation"]["flag"]),
         "is_store": bool(options_spec["solution"]["store"]),
+        "is_streaming": bool(options_spec["estimation"].get("streaming", False)),
         "maxfun": int(options_spec["estimation"]["maxfun"]),
         "num_agents_est": int(options_spec["estimation"]["agents"]),
         "num_agents_sim": int(options_spec["simulation"]["agents"]),
@@ -119,10 +153,16 @@ def _create_attribute_dictionary(params_spec, options_spec):
         "optimizer_used": str(options_spec["estimation"]["optimizer"]),
         # make type conversions here
         "precond_spec": options_spec["preconditioning"],
+        "quadrature_nodes": int(options_spec["solution"].get("nodes", 3)),
+        "quadrature_rule": str(options_spec["solution"].get("rule", "product")),
         "seed_emax": int(options_spec["solution"]["seed"]),
         "seed_prob": int(options_spec["estimation"]["seed"]),
         "seed_sim": int(options_spec["simulation"]["seed"]),
+        "sequence_emax": str(options_spec["solution"].get("sequence", "random")),
+        "sequence_prob": str(options_spec["estimation"].get("sequence", "random")),
+        "state_space_cache": options_spec["solution"].get("cache_dir"),
         "tau": float(options_spec["estimation"]["tau"]),
+        "tolerance_emax": options_spec["solution"].get("tolerance"),
         "version": str(options_spec["program"]["version"]),
         "derivatives": str(options_spec["derivatives"]),
         # to-do: add type conversions and checks for edu spec
@@ -131,6 +171,11 @@ def _create_attribute_dictionary(params_spec, options_spec):
         "num_paras": len(params_spec),
     }
 
+    if attr["tolerance_emax"] is not None:
+        attr["tolerance_emax"] = float(attr["tolerance_emax"])
+    if attr["chunk_size_sim"] is not None:
+        attr["chunk_size_sim"] = int(attr["chunk_size_sim"])
+
     # todo: add assert statements for bounds
     bounds = []
     for coeff in params_spec.index:
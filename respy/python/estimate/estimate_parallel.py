@@ -0,0 +1,209 @@
+"""Evaluate the criterion function at many points in a pool of local processes.
+
+The numerical approximation of the gradient requires one evaluation of the criterion
+function per free parameter and direction. The evaluations are independent and are
+distributed across the processes, so that the gradient takes about as long as a single
+evaluation.
+
+The draws, the prepared data and the arrays of the state space which do not depend on
+the parameters are stored in shared memory and are only read by the workers. Each worker
+solves the model in its own buffers for the rewards and emaxs.
+
+"""
+import copy
+import weakref
+
+import numpy as np
+
+from respy.python.estimate.estimate_python import pyth_criterion
+from respy.python.evaluate.evaluate_python import prepare_data_for_contributions
+from respy.python.shared.shared_parallelism import attach_shared_arrays
+from respy.python.shared.shared_parallelism import release_shared_arrays
+from respy.python.shared.shared_parallelism import SharedArrays
+from respy.python.shared.shared_parallelism import start_workers
+from respy.python.shared.shared_parallelism import stop_workers
+from respy.python.solve.solve_auxiliary import CACHE_COMPACT_INDEXER
+from respy.python.solve.solve_auxiliary import CompactIndexer
+
+# Arrays of the state space which do not depend on the parameters.
+STATE_SPACE_ARRAYS = ["states", "states_core", "covariates_core", "child_indices"]
+
+# Positions of the large arguments of the criterion function following the parameters.
+IDX_DATA, IDX_DRAWS_EMAX, IDX_DRAWS_PROB, IDX_STATE_SPACE = 3, 5, 6, 7
+
+
+class CriterionPool:
+    """Pool of processes which evaluate the criterion function.
+
+    Each process receives the arguments of the criterion function once where the large
+    arrays are replaced by blocks of shared memory. Afterwards, only the parameter
+    vectors and the values of the criterion function are exchanged.
+
+    Parameters
+    ----------
+    args : tuple
+        Arguments of :func:`~respy.python.estimate.estimate_python.pyth_criterion`
+        following the parameter vector. The last argument, the pool of processes for the
+        contributions, is not passed to the workers.
+    num_procs : int
+        Number of processes.
+
+    """
+
+    def __init__(self, args, num_procs):
+        args = list(args[:-1]) + [None]
+        if not isinstance(args[IDX_DATA], dict):
+            args[IDX_DATA] = prepare_data_for_contributions(
+                args[IDX_STATE_SPACE], args[IDX_DATA]
+            )
+
+        arrays, args, indexer_shape = _split_arrays_from_args(args)
+        self._shared = SharedArrays(arrays)
+
+        self._connections, self._processes = start_workers(
+            _evaluate_criterion_in_worker,
+            [(self._shared.specs, args, indexer_shape)] * num_procs,
+        )
+        self._finalizer = weakref.finalize(
+            self, _shutdown_pool, self._connections, self._processes, self._shared
+        )
+
+    def evaluate(self, xs):
+        """Evaluate the criterion function at multiple points.
+
+        Parameters
+        ----------
+        xs : np.ndarray
+            Array with shape (num_points, num_paras) containing the full parameter
+            vectors.
+
+        Returns
+        -------
+        fvals : np.ndarray
+            Array with shape (num_points,) containing the values of the criterion
+            function.
+
+        """
+        chunks = np.array_split(np.arange(len(xs)), len(self._connections))
+
+        for conn, chunk in zip(self._connections, chunks):
+            conn.send([xs[i] for i in chunk])
+
+        results = [conn.recv() for conn in self._connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+        return np.concatenate(results)
+
+    def close(self):
+        """Stop the processes and release the shared memory."""
+        self._finalizer()
+
+
+def _split_arrays_from_args(args):
+    """Split the large arrays from the arguments of the criterion function.
+
+    The arrays are replaced by None in a copy of the arguments. The state space is
+    copied without the arrays, the rewards and the emaxs.
+
+    """
+    args = list(args)
+    data = args[IDX_DATA]
+    state_space = args[IDX_STATE_SPACE]
+
+    arrays = {
+        "periods_draws_emax": args[IDX_DRAWS_EMAX],
+        "periods_draws_prob": args[IDX_DRAWS_PROB],
+    }
+    arrays.update(
+        ("data_" + key, value)
+        for key, value in data.items()
+        if isinstance(value, np.ndarray)
+    )
+    arrays.update(
+        ("unique_" + key, value) for key, value in data["unique_observations"].items()
+    )
+    arrays.update((name, getattr(state_space, name)) for name in STATE_SPACE_ARRAYS)
+    if isinstance(state_space.indexer, CompactIndexer):
+        arrays.update(zip(CACHE_COMPACT_INDEXER, state_space.indexer.arrays))
+        indexer_shape = state_space.indexer.shape
+    else:
+        arrays["indexer"] = state_space.indexer
+        indexer_shape = None
+
+    args[IDX_DATA] = {
+        key: value
+        for key, value in data.items()
+        if not isinstance(value, np.ndarray) and key != "unique_observations"
+    }
+    args[IDX_DRAWS_EMAX] = args[IDX_DRAWS_PROB] = None
+
+    state_space = copy.copy(state_space)
+    for name in STATE_SPACE_ARRAYS + ["indexer", "rewards", "emaxs"]:
+        setattr(state_space, name, None)
+    state_space.__dict__.pop("_optim_paras_rewards", None)
+    state_space.__dict__.pop("_covariates", None)
+    args[IDX_STATE_SPACE] = state_space
+
+    return arrays, tuple(args), indexer_shape
+
+
+def _join_arrays_with_args(arrays, args, indexer_shape):
+    """Insert the arrays in shared memory into the arguments of the criterion function.
+
+    This reverses :func:`_split_arrays_from_args`.
+
+    """
+    args = list(args)
+    arrays = dict(arrays)
+
+    args[IDX_DRAWS_EMAX] = arrays.pop("periods_draws_emax")
+    args[IDX_DRAWS_PROB] = arrays.pop("periods_draws_prob")
+
+    data = dict(args[IDX_DATA])
+    data["unique_observations"] = {}
+    for name in list(arrays):
+        if name.startswith("data_"):
+            data[name[len("data_") :]] = arrays.pop(name)
+        elif name.startswith("unique_"):
+            data["unique_observations"][name[len("unique_") :]] = arrays.pop(name)
+    args[IDX_DATA] = data
+
+    state_space = args[IDX_STATE_SPACE]
+    for name in STATE_SPACE_ARRAYS:
+        setattr(state_space, name, arrays.pop(name))
+    if indexer_shape is None:
+        state_space.indexer = arrays.pop("indexer")
+    else:
+        state_space.indexer = CompactIndexer.from_arrays(
+            [arrays.pop(name) for name in CACHE_COMPACT_INDEXER], indexer_shape
+        )
+
+    return tuple(args)
+
+
+def _evaluate_criterion_in_worker(conn, specs, args, indexer_shape):
+    """Evaluate the criterion function at the received points until the pool stops."""
+    args = _join_arrays_with_args(attach_shared_arrays(specs), args, indexer_shape)
+
+    while True:
+        xs = conn.recv()
+        if xs is None:
+            break
+
+        try:
+            fvals = np.array([pyth_criterion(x, *args) for x in xs], dtype=float)
+        except Exception as e:
+            fvals = e
+        conn.send(fvals)
+
+    del args
+    release_shared_arrays()
+    conn.close()
+
+
+def _shutdown_pool(connections, processes, shared):
+    """Stop all processes and release the shared memory."""
+    stop_workers(connections, processes)
+    shared.close()
@@ -1,7 +1,11 @@
+import numpy as np
+
 from respy.python.evaluate.evaluate_python import pyth_contributions
 from respy.python.shared.shared_auxiliary import distribute_parameters
 from respy.python.shared.shared_auxiliary import get_log_likl
 from respy.python.solve.solve_auxiliary import pyth_backward_induction
+from respy.python.solve.solve_auxiliary import pyth_backward_induction_batch
+from respy.python.solve.solve_auxiliary import pyth_backward_induction_by_period
 
 
 def pyth_criterion(
@@ -14,14 +18,50 @@ def pyth_criterion(
     periods_draws_emax,
     periods_draws_prob,
     state_space,
+    is_streaming=False,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    seed_emax=None,
+    pool=None,
 ):
-    """Criterion function for the likelihood maximization."""
+    """Criterion function for the likelihood maximization.
+
+    If ``is_streaming`` is true, the likelihood contributions of each period are
+    evaluated as soon as the emaxs of the period are available. Thus, the emaxs of all
+    states are never held in memory at once.
+
+    If ``pool`` is an instance of
+    :class:`~respy.python.evaluate.evaluate_parallel.ContributionsPool`, the model is
+    solved in the main process and the contributions are evaluated by the processes of
+    the pool.
+
+    The contributions are computed in log space, so that the likelihood of agents with
+    long panels does not underflow.
+
+    ``weights_emax`` contains the weights of the draws for the expected maximum utility,
+    e.g. the weights of a quadrature rule. By default, all draws have the same weight.
+    If ``is_control_variate`` is true, the wage shocks are used as control variates for
+    the expected maximum utility. If ``tolerance_emax`` is given, the number of draws
+    for the expected maximum utility is chosen adaptively in each period.
+
+    If ``seed_emax`` is given, the interpolation points are drawn by a random number
+    generator which is seeded with ``seed_emax`` in each evaluation. Thus, the states
+    at which the emax is simulated are the same in each evaluation and in each process
+    of a pool. Otherwise, the global random number generator is used.
+
+    """
     optim_paras = distribute_parameters(x, is_debug)
 
+    if is_interpolated and seed_emax is not None:
+        random_state = np.random.RandomState(seed_emax)
+    else:
+        random_state = None
+
     # Calculate all systematic rewards
     state_space.update_systematic_rewards(optim_paras)
 
-    state_space = pyth_backward_induction(
+    args = (
         periods_draws_emax,
         state_space,
         is_debug,
@@ -30,12 +70,150 @@ def pyth_criterion(
         optim_paras,
         "",
         False,
+        weights_emax,
+        is_control_variate,
+        tolerance_emax,
+        random_state,
     )
 
-    contribs = pyth_contributions(
-        state_space, data, periods_draws_prob, tau, optim_paras
-    )
+    if pool is not None:
+        pyth_backward_induction(*args)
+
+        contribs = pool.evaluate(optim_paras, is_log=True)
+
+    elif is_streaming:
+        contribs = pyth_contributions(
+            state_space,
+            data,
+            periods_draws_prob,
+            tau,
+            optim_paras,
+            pyth_backward_induction_by_period(*args),
+            is_log=True,
+        )
+    else:
+        state_space = pyth_backward_induction(*args)
+
+        contribs = pyth_contributions(
+            state_space, data, periods_draws_prob, tau, optim_paras, is_log=True
+        )
 
-    crit_val = get_log_likl(contribs)
+    crit_val = get_log_likl(contribs, is_log=True)
 
     return crit_val
+
+
+def pyth_criterion_batch(
+    xs,
+    is_interpolated,
+    num_points_interp,
+    is_debug,
+    data,
+    tau,
+    periods_draws_emax,
+    periods_draws_prob,
+    state_space,
+    is_streaming=False,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    seed_emax=None,
+    pool=None,
+):
+    """Evaluate the criterion function at multiple points.
+
+    The model is solved for all points at once with
+    :func:`~respy.python.solve.solve_auxiliary.pyth_backward_induction_batch` which
+    traverses the state space only once, e.g. for the evaluations of a numerical
+    gradient. Afterwards, the contributions are evaluated for each point.
+
+    The points are evaluated one after another with :func:`pyth_criterion` if the batch
+    would not yield the same values, i.e. for streaming, a pool of processes, control
+    variates, an adaptive number of draws or interpolation points which are drawn anew
+    in each evaluation.
+
+    Parameters
+    ----------
+    xs : list
+        List of full parameter vectors.
+
+    The remaining arguments are the same as for :func:`pyth_criterion`.
+
+    Returns
+    -------
+    fvals : np.ndarray
+        Array with shape (num_points,) containing the values of the criterion function.
+
+    """
+    args = (
+        is_interpolated,
+        num_points_interp,
+        is_debug,
+        data,
+        tau,
+        periods_draws_emax,
+        periods_draws_prob,
+        state_space,
+        is_streaming,
+        weights_emax,
+        is_control_variate,
+        tolerance_emax,
+        seed_emax,
+        pool,
+    )
+    is_batch = not (
+        is_streaming
+        or pool is not None
+        or is_control_variate
+        or tolerance_emax is not None
+        or (is_interpolated and seed_emax is None)
+    )
+    if not is_batch or len(xs) < 2:
+        return np.array([pyth_criterion(x, *args) for x in xs])
+
+    optim_paras_sets = [distribute_parameters(x, is_debug) for x in xs]
+
+    rewards = []
+    for optim_paras in optim_paras_sets:
+        state_space.update_systematic_rewards(optim_paras)
+        rewards.append(state_space.rewards.copy())
+
+    if is_interpolated:
+        random_state = np.random.RandomState(seed_emax)
+    else:
+        random_state = None
+
+    emaxs = pyth_backward_induction_batch(
+        periods_draws_emax,
+        state_space,
+        is_debug,
+        is_interpolated,
+        num_points_interp,
+        rewards,
+        [optim_paras["delta"][0] for optim_paras in optim_paras_sets],
+        [optim_paras["shocks_cholesky"] for optim_paras in optim_paras_sets],
+        weights_emax,
+        random_state=random_state,
+    )
+
+    # The rewards of the last set remain in ``state_space.rewards`` which is consistent
+    # with the parameters of the last update.
+    fvals = np.empty(len(xs))
+    for i, optim_paras in enumerate(optim_paras_sets):
+        state_space.rewards[:] = rewards[i]
+        emaxs_by_period = (
+            (period, emaxs[i, state_space.slices_by_periods[period]])
+            for period in range(state_space.num_periods)
+        )
+        contribs = pyth_contributions(
+            state_space,
+            data,
+            periods_draws_prob,
+            tau,
+            optim_paras,
+            emaxs_by_period,
+            is_log=True,
+        )
+        fvals[i] = get_log_likl(contribs, is_log=True)
+
+    return fvals
@@ -1,8 +1,12 @@
+import hashlib
+import os
+from collections import OrderedDict
 from datetime import datetime
 
 import numpy as np
 
 from respy.python.estimate.estimate_python import pyth_criterion
+from respy.python.estimate.estimate_python import pyth_criterion_batch
 from respy.python.record.record_estimation import record_estimation_eval
 from respy.python.record.record_warning import record_warning
 from respy.python.shared.shared_auxiliary import apply_scaling
@@ -40,15 +44,147 @@ class OptimizationClass(object):
         self.num_step = -1
         self.num_eval = 0
 
+        # Cache of evaluations of the criterion function
+        self.cache = None
+        self.num_cache_hits = 0
+
+        # Attributes for the numerical approximation of the gradient
+        self.derivatives = "forward-differences"
+        self.eps = None
+        self.paras_bounds = None
+        self.pool = None
+        self._last_eval = None
+
     def crit_func(self, x_optim_free_scaled, *args):
         """Wrapper for different implementations of the criterion function."""
         start = datetime.now()
-        precond_matrix = self.precond_matrix
         x_optim_all_unscaled = self._construct_all_current_values(
-            apply_scaling(x_optim_free_scaled, precond_matrix, "undo")
+            apply_scaling(x_optim_free_scaled, self.precond_matrix, "undo")
+        )
+        fval = self._get_cached_fval(x_optim_all_unscaled)
+        if fval is None:
+            fval = pyth_criterion(x_optim_all_unscaled, *args)
+            self._set_cached_fval(x_optim_all_unscaled, fval)
+
+        self._record_eval(fval, x_optim_all_unscaled, start)
+        self._last_eval = (np.array(x_optim_free_scaled, dtype=float), fval)
+
+        # Finishing
+        return fval
+
+    def crit_grad(self, x_optim_free_scaled, *args):
+        """Approximate the gradient of the criterion function with finite differences.
+
+        The scheme is either forward or central differences with step size ``eps``. If
+        a step leaves ``paras_bounds``, the step is taken in the opposite direction. The
+        criterion function is evaluated at all required points at once which happens in
+        parallel if ``pool`` is an instance of
+        :class:`~respy.python.estimate.estimate_parallel.CriterionPool`. Otherwise, the
+        model is solved for all points at once with
+        :func:`~respy.python.estimate.estimate_python.pyth_criterion_batch`. Afterwards,
+        the evaluations are recorded in the same order as sequential evaluations.
+
+        """
+        x = np.array(x_optim_free_scaled, dtype=float)
+        num_free = x.shape[0]
+
+        # Determine the steps in the positive and negative direction for each parameter.
+        # A step of zero refers to the evaluation at x.
+        h = np.full(num_free, self.eps)
+        if self.paras_bounds is None:
+            is_upper_ok = is_lower_ok = np.ones(num_free, dtype=bool)
+        else:
+            is_upper_ok = x + h <= self.paras_bounds[:, 1]
+            is_lower_ok = x - h >= self.paras_bounds[:, 0]
+
+        is_forward = is_upper_ok | ~is_lower_ok
+        if self.derivatives == "central-differences":
+            is_central = is_upper_ok & is_lower_ok
+        else:
+            is_central = np.zeros(num_free, dtype=bool)
+
+        steps_pos = np.where(is_central | is_forward, h, 0)
+        steps_neg = np.where(is_central | ~is_forward, -h, 0)
+
+        h_vecs_pos = np.diag(steps_pos)
+        h_vecs_neg = np.diag(steps_neg)
+        points = [x + h_vecs_pos[i] for i in np.flatnonzero(steps_pos)]
+        points += [x + h_vecs_neg[i] for i in np.flatnonzero(steps_neg)]
+
+        # The evaluation at x is often available from the last call of the criterion
+        # function.
+        is_one_sided = ~is_central.all()
+        is_cached = self._last_eval is not None and np.array_equal(
+            self._last_eval[0], x
         )
-        fval = pyth_criterion(x_optim_all_unscaled, *args)
+        if is_one_sided and not is_cached:
+            points = [x] + points
+
+        start = datetime.now()
+        xs_optim_all_unscaled = [
+            self._construct_all_current_values(
+                apply_scaling(point, self.precond_matrix, "undo")
+            )
+            for point in points
+        ]
+        # Only points which are not cached are evaluated.
+        fvals = [self._get_cached_fval(x) for x in xs_optim_all_unscaled]
+        idx_missing = [i for i, fval in enumerate(fvals) if fval is None]
+        if idx_missing:
+            xs_missing = [xs_optim_all_unscaled[i] for i in idx_missing]
+            if self.pool is None:
+                fvals_missing = pyth_criterion_batch(xs_missing, *args)
+            else:
+                fvals_missing = self.pool.evaluate(xs_missing)
+            for i, fval in zip(idx_missing, fvals_missing):
+                fvals[i] = fval
+                self._set_cached_fval(xs_optim_all_unscaled[i], fval)
+        fvals = np.array(fvals)
+
+        for fval, x_optim_all_unscaled in zip(fvals, xs_optim_all_unscaled):
+            self._record_eval(fval, x_optim_all_unscaled, start)
+
+        if is_one_sided:
+            if is_cached:
+                fval = self._last_eval[1]
+            else:
+                fval, fvals = fvals[0], fvals[1:]
+        else:
+            fval = np.nan
+
+        num_pos = np.count_nonzero(steps_pos)
+        fvals_pos = np.full(num_free, fval)
+        fvals_pos[steps_pos != 0] = fvals[:num_pos]
+        fvals_neg = np.full(num_free, fval)
+        fvals_neg[steps_neg != 0] = fvals[num_pos:]
+
+        # Recompute the steps as exactly representable numbers.
+        dx = (x + steps_pos) - (x + steps_neg)
+        grad = (fvals_pos - fvals_neg) / dx
+
+        if is_one_sided:
+            self._last_eval = (x, fval)
 
+        return grad
+
+    def _get_cached_fval(self, x_optim_all_unscaled):
+        """Get the cached value of the criterion function or None."""
+        if self.cache is None:
+            return None
+
+        fval = self.cache.get(x_optim_all_unscaled)
+        if fval is not None:
+            self.num_cache_hits += 1
+
+        return fval
+
+    def _set_cached_fval(self, x_optim_all_unscaled, fval):
+        """Store the value of the criterion function in the cache."""
+        if self.cache is not None:
+            self.cache.set(x_optim_all_unscaled, fval)
+
+    def _record_eval(self, fval, x_optim_all_unscaled, start):
+        """Record an evaluation of the criterion function."""
         # Don't record anything if evaluating the criterion function simply to
         # get the precondition matrix.
         if not hasattr(self, "is_scaling"):
@@ -65,9 +201,6 @@ class OptimizationClass(object):
             # Enforce a maximum number of function evaluations.
             check_early_termination(self.maxfun, self.num_eval)
 
-        # Finishing
-        return fval
-
     def _construct_all_current_values(self, x_optim_free_unscaled):
         """Construct the full set of current values."""
         x_optim_all_unscaled_start = self.x_optim_all_unscaled_start
@@ -84,3 +217,72 @@ class OptimizationClass(object):
                 j += 1
 
         return x_optim_all_unscaled
+
+
+class CriterionCache(object):
+    """Least recently used cache of the values of the criterion function.
+
+    The values are keyed on a hash of the full vector of unscaled parameters.
+    Optionally, all evaluations are appended to a file and replayed when a cache is
+    created with the same file, e.g. after an estimation was interrupted. The file has
+    to be deleted if the model specification or the data change as the values would be
+    outdated.
+
+    Parameters
+    ----------
+    size : int
+        Maximum number of values of the current estimation kept in memory. All values
+        replayed from the file are kept.
+    fname : str, optional
+        Name of the file which stores all evaluations.
+
+    Example
+    -------
+    >>> cache = CriterionCache(1)
+    >>> cache.set(np.zeros(2), 1.0)
+    >>> cache.get(np.zeros(2))
+    1.0
+    >>> cache.set(np.ones(2), 2.0)
+    >>> cache.get(np.zeros(2)) is None
+    True
+
+    """
+
+    def __init__(self, size, fname=None):
+        self.size = size
+        self.fname = fname
+        self._values = OrderedDict()
+        self._replayed_values = {}
+
+        if fname is not None and os.path.exists(fname):
+            with open(fname) as in_file:
+                for line in in_file:
+                    key, fval = line.split()
+                    self._replayed_values[key] = float(fval)
+
+    def get(self, x_optim_all_unscaled):
+        """Get the value of the criterion function or None if it is not cached."""
+        key = self._get_key(x_optim_all_unscaled)
+        if key in self._values:
+            self._values.move_to_end(key)
+            fval = self._values[key]
+        else:
+            fval = self._replayed_values.get(key)
+
+        return fval
+
+    def set(self, x_optim_all_unscaled, fval):
+        """Store the value of the criterion function."""
+        key = self._get_key(x_optim_all_unscaled)
+        self._values[key] = fval
+        while len(self._values) > self.size:
+            self._values.popitem(last=False)
+
+        if self.fname is not None:
+            with open(self.fname, "a") as out_file:
+                out_file.write("{} {!r}\n".format(key, float(fval)))
+
+    @staticmethod
+    def _get_key(x_optim_all_unscaled):
+        x = np.ascontiguousarray(x_optim_all_unscaled, dtype=float)
+        return hashlib.sha256(x.tobytes()).hexdigest()
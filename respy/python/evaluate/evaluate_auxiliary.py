@@ -151,6 +151,35 @@ def get_pdf_of_normal_distribution(x, mu, sigma):
     return probability
 
 
+@vectorize(["f4(f4, f4, f4)", "f8(f8, f8, f8)"], nopython=True, target="cpu")
+def get_log_pdf_of_normal_distribution(x, mu, sigma):
+    """Compute the log probability of ``x`` under a normal distribution.
+
+    Parameters
+    ----------
+    x : float or np.ndarray
+        The log probability is calculated for this value.
+    mu : float or np.ndarray
+        Mean of the normal distribution.
+    sigma : float or np.ndarray
+        Standard deviation of the normal distribution.
+
+    Returns
+    -------
+    log_probability : float
+        Log probability of ``x`` under a normal distribution with mean ``mu`` and
+        standard deviation ``sigma``.
+
+    Example
+    -------
+    >>> from scipy.stats import norm
+    >>> result = get_log_pdf_of_normal_distribution(1.0, 0.5, 2.0)
+    >>> assert np.isclose(result, norm.logpdf(1.0, 0.5, 2.0))
+
+    """
+    return -np.log(np.sqrt(2 * np.pi) * sigma) - (x - mu) ** 2 / (2 * sigma ** 2)
+
+
 @guvectorize(
     ["f8, f8[:], i8, f8[:, :, :], i8, f8[:, :], f8[:, :], f8[:]"],
     "(), (w), (), (i, p, n), (), (m, n) -> (p, n), (p)",
@@ -252,8 +281,8 @@ def create_draws_and_prob_wages(
     for k in range(k_):
         for m in range(m_):
             val = 0.0
-            for l in range(l_):
-                val += temp_draws[k, l] * sc[m, l]
+            for idx_shock in range(l_):
+                val += temp_draws[k, idx_shock] * sc[m, idx_shock]
             if m < 2:
                 val_exp = np.exp(val)
                 val_clipped = clip(val_exp, 0.0, HUGE_FLOAT)
@@ -261,3 +290,187 @@ def create_draws_and_prob_wages(
                 draws[k, m] = val_clipped
             else:
                 draws[k, m] = val
+
+
+@guvectorize(
+    ["f8, f8[:], f8[:], f8[:], i8, f8[:, :, :], i8, f8[:, :], f8, b1, f8, b1, f8[:]"],
+    "(), (w), (n), (n), (), (i, p, n), (), (n, n), (), (), (), () -> ()",
+    nopython=True,
+    target="parallel",
+)
+def simulate_probability_of_observation(
+    wage_observed,
+    wages_systematic,
+    rewards_systematic,
+    emaxs,
+    period,
+    periods_draws_prob,
+    choice,
+    sc,
+    delta,
+    max_education,
+    tau,
+    is_log,
+    prob_obs,
+):
+    """Simulate the probability of observing the agent's choice and wage.
+
+    This kernel fuses :func:`create_draws_and_prob_wages` and
+    :func:`simulate_probability_of_agents_observed_choice`. For each draw, the shocks
+    are adjusted to the observed wage, the probability of the wage and the smoothed
+    probability of the choice are computed and their product is averaged over all
+    draws. Thus, neither the adjusted draws nor the probabilities per draw are stored.
+
+    If ``is_log`` is true, the logarithm of the probability is computed without leaving
+    the log space. The wage densities are log densities, the smoothed choice
+    probabilities are computed with the log-sum-exp trick and the average over draws is
+    accumulated as a running log-sum-exp. Thus, the result does not underflow.
+
+    Parameters
+    ----------
+    wage_observed : float
+        Agent's observed wage.
+    wages_systematic : np.ndarray
+        Array with shape (2,) containing systematic wages.
+    rewards_systematic : np.ndarray
+        Array with shape (4,).
+    emaxs : np.ndarray
+        Array with shape (4,)
+    period : int
+        Number of period.
+    periods_draws_prob : np.ndarray
+        Array with shape (num_periods, num_draws, num_choices) containing sets of draws
+        for all periods.
+    choice : int
+        Choice between one and four.
+    sc : np.ndarray
+        Array with shape (num_choices, num_choices).
+    delta : float
+        Discount rate.
+    max_education: bool
+        Indicator for whether the state has reached maximum education.
+    tau : float
+        Smoothing parameter for choice probabilities.
+    is_log : bool
+        Indicator for whether the log probability is returned.
+
+    Returns
+    -------
+    prob_obs : float
+        Probability or log probability of the observation averaged over all draws.
+
+    """
+    num_draws, num_choices = periods_draws_prob.shape[1:]
+    num_wages = wages_systematic.shape[0]
+    draws_stan = periods_draws_prob[period]
+
+    temp_draws = np.empty(num_choices)
+    total_values = np.empty(num_choices)
+
+    has_wage = ~np.isnan(wage_observed)
+    if has_wage:
+        log_wo = np.log(wage_observed)
+        log_wage_observed = clip(log_wo, -HUGE_FLOAT, HUGE_FLOAT)
+
+        log_ws = np.log(wages_systematic[choice - 1])
+        log_wage_systematic = clip(log_ws, -HUGE_FLOAT, HUGE_FLOAT)
+
+        dist = log_wage_observed - log_wage_systematic
+
+    prob_sum = 0.0
+    log_prob_max = -np.inf
+
+    for i in range(num_draws):
+
+        # Adjust draws and compute the probability of the wage as in
+        # :func:`create_draws_and_prob_wages`.
+        for j in range(num_choices):
+            temp_draws[j] = draws_stan[i, j]
+
+        prob_wage = 0.0 if is_log else 1.0
+        if has_wage:
+            if choice == 1:
+                temp_draws[0] = dist / sc[0, 0]
+                if is_log:
+                    prob_wage = get_log_pdf_of_normal_distribution(dist, 0.0, sc[0, 0])
+                else:
+                    prob_wage = get_pdf_of_normal_distribution(dist, 0.0, sc[0, 0])
+            elif choice == 2:
+                temp_draws[1] = (dist - sc[1, 0] * draws_stan[i, 0]) / sc[1, 1]
+                means = sc[1, 0] * draws_stan[i, 0]
+                if is_log:
+                    prob_wage = get_log_pdf_of_normal_distribution(
+                        dist, means, sc[1, 1]
+                    )
+                else:
+                    prob_wage = get_pdf_of_normal_distribution(dist, means, sc[1, 1])
+            else:
+                temp_draws[0] = 0.0
+                temp_draws[1] = 0.0
+
+        # Compute the total values of all choices as in
+        # :func:`simulate_probability_of_agents_observed_choice`.
+        max_total_values = 0.0
+
+        for j in range(num_choices):
+            draw = 0.0
+            for idx_shock in range(num_choices):
+                draw += temp_draws[idx_shock] * sc[j, idx_shock]
+
+            if j < num_wages:
+                draw = clip(np.exp(draw), 0.0, HUGE_FLOAT)
+                rew_ex = (
+                    wages_systematic[j] * draw
+                    + rewards_systematic[j]
+                    - wages_systematic[j]
+                )
+            else:
+                rew_ex = rewards_systematic[j] + draw
+
+            cont_value = rew_ex + delta * emaxs[j]
+
+            if j == 2 and max_education:
+                cont_value += INADMISSIBILITY_PENALTY
+
+            total_values[j] = cont_value
+
+            if cont_value > max_total_values or j == 0:
+                max_total_values = cont_value
+
+        if is_log:
+            # The smoothed choice probability in logs is computed with the log-sum-exp
+            # trick which is already stabilized by the maximum of total values.
+            sum_smooth_values = 0.0
+            for j in range(num_choices):
+                sum_smooth_values += np.exp((total_values[j] - max_total_values) / tau)
+
+            log_prob = (
+                (total_values[choice - 1] - max_total_values) / tau
+                - np.log(sum_smooth_values)
+                + prob_wage
+            )
+
+            # Accumulate the sum over draws as a running log-sum-exp.
+            if log_prob > log_prob_max:
+                prob_sum = prob_sum * np.exp(log_prob_max - log_prob) + 1.0
+                log_prob_max = log_prob
+            elif log_prob > -np.inf:
+                prob_sum += np.exp(log_prob - log_prob_max)
+
+        else:
+            sum_smooth_values = 0.0
+
+            for j in range(num_choices):
+                val_exp = np.exp((total_values[j] - max_total_values) / tau)
+
+                val_clipped = clip(val_exp, 0.0, HUGE_FLOAT)
+
+                total_values[j] = val_clipped
+                sum_smooth_values += val_clipped
+
+            prob_sum += total_values[choice - 1] / sum_smooth_values * prob_wage
+
+    if is_log:
+        prob_obs[0] = log_prob_max + np.log(prob_sum) - np.log(num_draws)
+    else:
+        prob_obs[0] = prob_sum / num_draws
@@ -0,0 +1,164 @@
+"""Evaluate the likelihood contributions in a pool of local processes.
+
+The agents of the sample are split into contiguous shards and each process evaluates
+the contributions of one shard. The systematic rewards and emaxs of the state space are
+stored in shared memory, so that the model is solved once in the main process and the
+workers do not receive copies of the arrays in every evaluation.
+
+"""
+import weakref
+from types import SimpleNamespace
+
+import numpy as np
+
+from respy.python.evaluate.evaluate_python import prepare_data_for_contributions
+from respy.python.evaluate.evaluate_python import pyth_contributions
+from respy.python.shared.shared_parallelism import attach_shared_arrays
+from respy.python.shared.shared_parallelism import release_shared_arrays
+from respy.python.shared.shared_parallelism import SharedArrays
+from respy.python.shared.shared_parallelism import start_workers
+from respy.python.shared.shared_parallelism import stop_workers
+
+
+class ContributionsPool:
+    """Pool of processes which evaluate the likelihood contributions.
+
+    After the pool is created, ``state_space.rewards`` and ``state_space.emaxs`` are
+    backed by shared memory. Thus, the model is solved as usual in the main process,
+    e.g. with :func:`~respy.python.solve.solve_auxiliary.pyth_backward_induction`,
+    before the contributions are evaluated with :meth:`evaluate`.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    data : pd.DataFrame
+        DataFrame with the empirical dataset.
+    periods_draws_prob : np.ndarray
+        Array with shape (num_periods, num_draws_prob, num_choices) containing i.i.d.
+        draws from standard normal distributions.
+    tau : float
+        Smoothing parameter for choice probabilities.
+    num_procs : int
+        Number of processes. It is reduced to the number of agents if necessary.
+
+    """
+
+    def __init__(self, state_space, data, periods_draws_prob, tau, num_procs):
+        rewards = getattr(state_space, "rewards", None)
+        if rewards is None:
+            rewards = np.empty((state_space.num_states, 9))
+        emaxs = getattr(state_space, "emaxs", None)
+        if emaxs is None:
+            emaxs = np.zeros((state_space.num_states, 5))
+
+        self._state_space = state_space
+        self._shared = SharedArrays({"rewards": rewards, "emaxs": emaxs})
+        state_space.rewards = self._shared.arrays["rewards"]
+        state_space.emaxs = self._shared.arrays["emaxs"]
+
+        args_by_worker = [
+            (
+                self._shared.specs,
+                prepare_data_for_contributions(state_space, shard),
+                periods_draws_prob,
+                tau,
+            )
+            for shard in _split_data_by_agents(data, num_procs)
+        ]
+        self._connections, self._processes = start_workers(
+            _evaluate_contributions_in_worker, args_by_worker
+        )
+
+        self._finalizer = weakref.finalize(
+            self, _shutdown_pool, self._connections, self._processes, self._shared
+        )
+
+    def evaluate(self, optim_paras, is_log=False):
+        """Evaluate the likelihood contributions of all agents.
+
+        Parameters
+        ----------
+        optim_paras : dict
+            Dictionary with quantities that were extracted from the parameter vector.
+        is_log : bool, default False
+            Indicator for whether the log contributions are computed.
+
+        Returns
+        -------
+        contribs : np.ndarray
+            Array with shape (num_agents,) containing contributions of estimated agents
+            or their logarithm.
+
+        """
+        for conn in self._connections:
+            conn.send((optim_paras, is_log))
+
+        results = [conn.recv() for conn in self._connections]
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+
+        return np.concatenate(results)
+
+    def close(self):
+        """Stop the processes and move the state space out of shared memory."""
+        if not self._finalizer.alive:
+            return
+
+        self._state_space.rewards = np.array(self._state_space.rewards)
+        self._state_space.emaxs = np.array(self._state_space.emaxs)
+        self._finalizer()
+
+
+def _split_data_by_agents(data, num_shards):
+    """Split the data into shards of contiguous agents.
+
+    The identifiers in each shard start at zero, so that each shard can be prepared like
+    a complete sample.
+
+    """
+    identifiers = data.Identifier.values
+    bounds = np.append(
+        np.flatnonzero(np.r_[True, identifiers[1:] != identifiers[:-1]]),
+        identifiers.shape[0],
+    )
+    num_agents = bounds.shape[0] - 1
+    num_shards = max(1, min(num_shards, num_agents))
+
+    shards = []
+    for agents in np.array_split(np.arange(num_agents), num_shards):
+        shard = data.iloc[bounds[agents[0]] : bounds[agents[-1] + 1]].copy()
+        shard["Identifier"] -= shard["Identifier"].iloc[0]
+        shards.append(shard)
+
+    return shards
+
+
+def _evaluate_contributions_in_worker(conn, specs, data, periods_draws_prob, tau):
+    """Evaluate the contributions of a shard until the pool is closed."""
+    state_space = SimpleNamespace(**attach_shared_arrays(specs))
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+
+        optim_paras, is_log = task
+        try:
+            contribs = pyth_contributions(
+                state_space, data, periods_draws_prob, tau, optim_paras, is_log=is_log
+            )
+        except Exception as e:
+            contribs = e
+        conn.send(contribs)
+
+    del state_space
+    release_shared_arrays()
+    conn.close()
+
+
+def _shutdown_pool(connections, processes, shared):
+    """Stop all processes and release the shared memory."""
+    stop_workers(connections, processes)
+    shared.close()
@@ -1,13 +1,22 @@
 import numpy as np
+from scipy.special import logsumexp
 
-from respy.python.evaluate.evaluate_auxiliary import create_draws_and_prob_wages
-from respy.python.evaluate.evaluate_auxiliary import (
-    simulate_probability_of_agents_observed_choice,
-)
+from respy.python.evaluate.evaluate_auxiliary import simulate_probability_of_observation
 from respy.python.shared.shared_auxiliary import get_conditional_probabilities
 
+# Keys of prepared data which contain arrays with one row per observation.
+DATA_OBSERVATIONS = ["ks", "periods", "choices", "wages_observed", "max_education"]
 
-def pyth_contributions(state_space, data, periods_draws_prob, tau, optim_paras):
+
+def pyth_contributions(
+    state_space,
+    data,
+    periods_draws_prob,
+    tau,
+    optim_paras,
+    emaxs_by_period=None,
+    is_log=False,
+):
     """Calculate the likelihood contribution of each individual in the sample.
 
     The function calculates all likelihood contributions for all observations in the
@@ -20,8 +29,10 @@ def pyth_contributions(state_space, data, periods_draws_prob, tau, optim_paras):
     ----------
     state_space : class
         Class of state space.
-    data : pd.DataFrame
-        DataFrame with the empirical dataset.
+    data : pd.DataFrame or dict
+        DataFrame with the empirical dataset or the output of
+        :func:`prepare_data_for_contributions` which avoids repeating the preparation in
+        every evaluation.
     periods_draws_prob : np.ndarray
         Array with shape (num_periods, num_draws_prob, num_choices) containing i.i.d.
         draws from standard normal distributions.
@@ -29,16 +40,123 @@ def pyth_contributions(state_space, data, periods_draws_prob, tau, optim_paras):
         Smoothing parameter for choice probabilities.
     optim_paras : dict
         Dictionary with quantities that were extracted from the parameter vector.
+    emaxs_by_period : iterable, optional
+        Iterable of tuples of a period and the emaxs of all states in this period, e.g.
+        :func:`~respy.python.solve.solve_auxiliary.pyth_backward_induction_by_period`.
+        If given, the probabilities of the observations in a period are computed as
+        soon as its emaxs are available and ``state_space.emaxs`` is not accessed.
+        Otherwise, the model has to be solved before.
+    is_log : bool, default False
+        Indicator for whether the log contributions are computed in log space. For long
+        panels, the products of probabilities in levels underflow to zero.
 
     Returns
     -------
     contribs : np.ndarray
-        Array with shape (num_agents,) containing contributions of estimated agents.
+        Array with shape (num_agents,) containing contributions of estimated agents or
+        their logarithm.
 
     """
+    if not isinstance(data, dict):
+        data = prepare_data_for_contributions(state_space, data)
+
     if np.count_nonzero(optim_paras["shocks_cholesky"]) == 0:
-        return np.ones(data.Identifier.unique().shape[0])
+        return np.zeros(data["num_agents"]) if is_log else np.ones(data["num_agents"])
+
+    # Update type-specific probabilities conditional on whether the initial level of
+    # education is greater than nine.
+    type_shares = get_conditional_probabilities(
+        optim_paras["type_shares"], data["agents_initial_education_levels"]
+    )
+
+    # The probabilities are only simulated for unique observations and then assigned
+    # to all observations.
+    unique = data["unique_observations"]
+    ks = unique["ks"]
+
+    if emaxs_by_period is None:
+        prob_unique = get_probability_of_observations(
+            state_space,
+            unique,
+            state_space.emaxs[ks, :4],
+            periods_draws_prob,
+            tau,
+            optim_paras,
+            is_log,
+        )
+    else:
+        prob_unique = np.empty(ks.shape)
+        for period, emaxs_period in emaxs_by_period:
+            is_period = unique["periods"][:, 0] == period
+            if not is_period.any():
+                continue
+
+            data_period = {key: unique[key][is_period] for key in DATA_OBSERVATIONS}
+            idx = data_period["ks"] - state_space.slices_by_periods[period].start
+
+            prob_unique[is_period] = get_probability_of_observations(
+                state_space,
+                data_period,
+                emaxs_period[idx, :4],
+                periods_draws_prob,
+                tau,
+                optim_paras,
+                is_log,
+            )
+
+    prob_obs = prob_unique[data["idx_unique_observations_inverse"]]
+
+    if is_log:
+        # Sum the log likelihood of observations for each individual-type combination
+        # over all periods. Then, add the log type shares and aggregate over types with
+        # the log-sum-exp trick.
+        log_prob_type = np.add.reduceat(prob_obs, data["idx_agents_first_observation"])
+        with np.errstate(divide="ignore"):
+            log_type_shares = np.log(type_shares)
+        contribs = logsumexp(log_prob_type + log_type_shares, axis=1)
+
+    else:
+        # Accumulate the likelihood of observations for each individual-type
+        # combination over all periods.
+        prob_type = np.multiply.reduceat(
+            prob_obs, data["idx_agents_first_observation"]
+        )
+
+        # Multiply each individual-type contribution with its type-specific shares and
+        # sum over types to get the likelihood contribution for each individual.
+        contribs = (prob_type * type_shares).sum(axis=1)
+
+    return contribs
+
+
+def prepare_data_for_contributions(state_space, data):
+    """Prepare the empirical dataset for the evaluation of the likelihood.
+
+    The preparation does not depend on the parameters. Thus, it is performed once before
+    the estimation and the result is passed to :func:`pyth_contributions` in each
+    evaluation of the criterion function.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    data : pd.DataFrame
+        DataFrame with the empirical dataset.
+
+    Returns
+    -------
+    prepared_data : dict
+        Dictionary with the following entries. ``unique_observations`` is a dictionary
+        with the arrays ``ks``, ``periods``, ``choices``, ``wages_observed`` and
+        ``max_education`` of unique observations with shape (num_unique, num_types).
+        ``ks`` contains the indices of the states of each observation and type and
+        ``max_education`` indicates whether the maximum education is reached.
+        ``idx_unique_observations_inverse`` maps each observation to its unique
+        counterpart.
+        ``idx_agents_first_observation`` and ``agents_initial_education_levels`` have
+        the shape (num_agents,). ``num_agents`` is the number of agents.
 
+    """
     # Convert data to np.ndarray. Separate wages from other characteristics as they need
     # to be integers.
     agents = data[
@@ -60,12 +178,6 @@ def pyth_contributions(state_space, data, periods_draws_prob, tau, optim_paras):
     idx_agents_first_observation = np.hstack((0, np.cumsum(num_obs_per_agent)[:-1]))
     agents_initial_education_levels = agents[idx_agents_first_observation, 3]
 
-    # Update type-specific probabilities conditional on whether the initial level of
-    # education is greater than nine.
-    type_shares = get_conditional_probabilities(
-        optim_paras["type_shares"], agents_initial_education_levels
-    )
-
     # Extract observable components of the state space and agent's decision.
     periods, exp_as, exp_bs, edus, choices_lagged, choices = (
         agents[:, i] for i in range(6)
@@ -82,41 +194,85 @@ def pyth_contributions(state_space, data, periods_draws_prob, tau, optim_paras):
     wages_observed = wages_observed.repeat(state_space.num_types).reshape(
         -1, state_space.num_types
     )
-    wages_systematic = state_space.rewards[ks, -2:]
-
-    # Adjust the draws to simulate the expected maximum utility and calculate the
-    # probability of observing the wage.
-    draws, prob_wages = create_draws_and_prob_wages(
-        wages_observed,
-        wages_systematic,
-        periods,
-        periods_draws_prob,
-        choices,
-        optim_paras["shocks_cholesky"],
+
+    observations = {
+        "ks": ks,
+        "periods": periods,
+        "choices": choices,
+        "wages_observed": wages_observed,
+        "max_education": state_space.states[ks, 3] >= state_space.edu_max,
+    }
+
+    # Without a wage, the probability of an observation only depends on the state and
+    # the choice. Thus, these observations are grouped into cells whose probability is
+    # simulated once. Each observation with a wage forms its own cell.
+    num_obs = ks.shape[0]
+    has_wage = ~np.isnan(wages_observed[:, 0])
+    cells = np.column_stack(
+        (ks[:, 0], choices[:, 0], np.where(has_wage, np.arange(num_obs), -1))
+    )
+    _, idx_unique, idx_unique_inverse = np.unique(
+        cells, axis=0, return_index=True, return_inverse=True
     )
 
-    # Simulate the probability of observing the choice of the individual.
-    prob_choices = simulate_probability_of_agents_observed_choice(
+    prepared_data = {
+        "unique_observations": {
+            key: observations[key][idx_unique] for key in DATA_OBSERVATIONS
+        },
+        "idx_unique_observations_inverse": idx_unique_inverse.reshape(-1),
+        "idx_agents_first_observation": idx_agents_first_observation,
+        "agents_initial_education_levels": agents_initial_education_levels,
+        "num_agents": data.Identifier.unique().shape[0],
+    }
+
+    return prepared_data
+
+
+def get_probability_of_observations(
+    state_space, data, emaxs, periods_draws_prob, tau, optim_paras, is_log=False
+):
+    """Calculate the probability of observations for all types.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    data : dict
+        Contains the arrays of the observations with shape (num_obs, num_types) which
+        are returned by :func:`prepare_data_for_contributions`.
+    emaxs : np.ndarray
+        Array with shape (num_obs, num_types, 4) containing the emaxs of the subsequent
+        period for each choice.
+    periods_draws_prob : np.ndarray
+        Array with shape (num_periods, num_draws_prob, num_choices) containing i.i.d.
+        draws from standard normal distributions.
+    tau : float
+        Smoothing parameter for choice probabilities.
+    optim_paras : dict
+        Dictionary with quantities that were extracted from the parameter vector.
+    is_log : bool, default False
+        Indicator for whether the log probabilities are returned.
+
+    Returns
+    -------
+    prob_obs : np.ndarray
+        Array with shape (num_obs, num_types) containing the probability of each
+        observation averaged over all draws or its logarithm.
+
+    """
+    ks = data["ks"]
+
+    return simulate_probability_of_observation(
+        data["wages_observed"],
         state_space.rewards[ks, -2:],
         state_space.rewards[ks, :4],
-        state_space.emaxs[ks, :4],
-        draws,
+        emaxs,
+        data["periods"],
+        periods_draws_prob,
+        data["choices"],
+        optim_paras["shocks_cholesky"],
         optim_paras["delta"],
-        state_space.states[ks, 3] >= state_space.edu_max,
-        choices - 1,
+        data["max_education"],
         tau,
+        is_log,
     )
-
-    # Multiply the probability of the agent's choice with the probability of wage and
-    # average over all draws to get the probability of the observation.
-    prob_obs = (prob_choices * prob_wages).mean(axis=2)
-
-    # Accumulate the likelihood of observations for each individual-type combination
-    # over all periods.
-    prob_type = np.multiply.reduceat(prob_obs, idx_agents_first_observation)
-
-    # Multiply each individual-type contribution with its type-specific shares and sum
-    # over types to get the likelihood contribution for each individual.
-    contribs = (prob_type * type_shares).sum(axis=1)
-
-    return contribs
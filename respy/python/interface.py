@@ -2,13 +2,16 @@ from math import floor
 from math import log10
 
 import numpy as np
-from scipy.optimize import approx_fprime
 from scipy.optimize import fmin_bfgs
 from scipy.optimize import fmin_l_bfgs_b
 from scipy.optimize import fmin_powell
 
 from respy.custom_exceptions import MaxfunError
+from respy.python.estimate.estimate_parallel import CriterionPool
+from respy.python.estimate.estimate_wrapper import CriterionCache
 from respy.python.estimate.estimate_wrapper import OptimizationClass
+from respy.python.evaluate.evaluate_parallel import ContributionsPool
+from respy.python.evaluate.evaluate_python import prepare_data_for_contributions
 from respy.python.record.record_estimation import record_estimation_final
 from respy.python.record.record_estimation import record_estimation_scalability
 from respy.python.record.record_estimation import record_estimation_scaling
@@ -18,9 +21,12 @@ from respy.python.shared.shared_auxiliary import create_draws
 from respy.python.shared.shared_auxiliary import dist_class_attributes
 from respy.python.shared.shared_auxiliary import get_optim_paras
 from respy.python.shared.shared_constants import HUGE_FLOAT
+from respy.python.simulate.simulate_parallel import SimulationPool
 from respy.python.simulate.simulate_python import pyth_simulate
+from respy.python.simulate.simulate_python import pyth_simulate_chunks
 from respy.python.solve.solve_auxiliary import StateSpace
 from respy.python.solve.solve_python import pyth_solve
+from respy.python.solve.solve_quadrature import create_quadrature
 
 
 def respy_interface(respy_obj, request, data=None):
@@ -48,6 +54,23 @@ def respy_interface(respy_obj, request, data=None):
         num_types,
         num_paras,
         num_agents_est,
+        state_space_cache,
+        indexer_type,
+        is_streaming,
+        num_procs,
+        derivatives,
+        cache_size,
+        file_cache,
+        sequence_emax,
+        sequence_prob,
+        integration_emax,
+        quadrature_rule,
+        quadrature_nodes,
+        is_antithetic_emax,
+        is_antithetic_prob,
+        is_control_variate,
+        tolerance_emax,
+        chunk_size_sim,
     ) = dist_class_attributes(
         respy_obj,
         "optim_paras",
@@ -71,15 +94,45 @@ def respy_interface(respy_obj, request, data=None):
         "num_types",
         "num_paras",
         "num_agents_est",
+        "state_space_cache",
+        "indexer_type",
+        "is_streaming",
+        "num_procs",
+        "derivatives",
+        "cache_size",
+        "file_cache",
+        "sequence_emax",
+        "sequence_prob",
+        "integration_emax",
+        "quadrature_rule",
+        "quadrature_nodes",
+        "is_antithetic_emax",
+        "is_antithetic_prob",
+        "is_control_variate",
+        "tolerance_emax",
+        "chunk_size_sim",
     )
 
     if request == "estimate":
 
         periods_draws_prob = create_draws(
-            num_periods, num_draws_prob, seed_prob, is_debug
+            num_periods,
+            num_draws_prob,
+            seed_prob,
+            is_debug,
+            sequence_prob,
+            is_antithetic_prob,
         )
-        periods_draws_emax = create_draws(
-            num_periods, num_draws_emax, seed_emax, is_debug
+        periods_draws_emax, weights_emax = create_draws_emax(
+            num_periods,
+            num_draws_emax,
+            seed_emax,
+            is_debug,
+            sequence_emax,
+            is_antithetic_emax,
+            integration_emax,
+            quadrature_rule,
+            quadrature_nodes,
         )
 
         # Construct starting values
@@ -92,207 +145,288 @@ def respy_interface(respy_obj, request, data=None):
 
         # Construct the state space
         state_space = StateSpace(
-            num_periods, num_types, edu_spec["start"], edu_spec["max"]
-        )
-
-        # Collect arguments that are required for the criterion function.
-        # These must be in the correct order already.
-        args = (
-            is_interpolated,
-            num_points_interp,
-            is_debug,
-            data,
-            tau,
-            periods_draws_emax,
-            periods_draws_prob,
-            state_space,
-        )
-
-        # Special case where just one evaluation at the starting values is
-        # requested is accounted for. Note, that the relevant value of the
-        # criterion function is always the one indicated by the class attribute
-        # and not the value returned by the optimization algorithm.
-        num_free = optim_paras["paras_fixed"].count(False)
-
-        # Take only bounds from unfixed parameters and insert default bounds.
-        mask_paras_fixed = np.array(optim_paras["paras_fixed"])
-        paras_bounds_free_unscaled = np.array(optim_paras["paras_bounds"])[
-            ~mask_paras_fixed
-        ]
-        paras_bounds_free_unscaled[:, 0] = np.where(
-            paras_bounds_free_unscaled[:, 0] == None,  # noqa: E711
-            -HUGE_FLOAT,
-            paras_bounds_free_unscaled[:, 0],
-        )
-        paras_bounds_free_unscaled[:, 1] = np.where(
-            paras_bounds_free_unscaled[:, 1] == None,  # noqa: E711
-            HUGE_FLOAT,
-            paras_bounds_free_unscaled[:, 1],
-        )
-
-        record_estimation_scaling(
-            x_optim_free_unscaled_start,
-            None,
-            None,
-            None,
-            optim_paras["paras_fixed"],
-            True,
-        )
-
-        precond_matrix = get_precondition_matrix(
-            precond_spec,
-            optim_paras,
-            x_optim_all_unscaled_start,
-            args,
-            maxfun,
-            num_paras,
+            num_periods,
             num_types,
+            edu_spec["start"],
+            edu_spec["max"],
+            indexer_type=indexer_type,
+            cache=state_space_cache,
         )
 
-        x_optim_free_scaled_start = apply_scaling(
-            x_optim_free_unscaled_start, precond_matrix, "do"
-        )
+        # The pools are closed even if the estimation is interrupted.
+        pool = None
+        criterion_pool = None
+        try:
+            # With multiple processes, each process evaluates the contributions of its
+            # share of the agents.
+            if num_procs > 1:
+                pool = ContributionsPool(
+                    state_space, data, periods_draws_prob, tau, num_procs
+                )
 
-        paras_bounds_free_scaled = np.full((num_free, 2), np.nan)
-        for i in range(2):
-            paras_bounds_free_scaled[:, i] = apply_scaling(
-                paras_bounds_free_unscaled[:, i], precond_matrix, "do"
+            # Prepare the data once as it does not depend on the parameters.
+            data = prepare_data_for_contributions(state_space, data)
+
+            # Collect arguments that are required for the criterion function.
+            # These must be in the correct order already. With multiple processes, the
+            # interpolation points are drawn with seed_emax in each evaluation, so that
+            # all processes use the same points.
+            args = (
+                is_interpolated,
+                num_points_interp,
+                is_debug,
+                data,
+                tau,
+                periods_draws_emax,
+                periods_draws_prob,
+                state_space,
+                is_streaming,
+                weights_emax,
+                is_control_variate,
+                tolerance_emax,
+                seed_emax if num_procs > 1 else None,
+                pool,
             )
 
-        record_estimation_scaling(
-            x_optim_free_unscaled_start,
-            x_optim_free_scaled_start,
-            paras_bounds_free_scaled,
-            precond_matrix,
-            optim_paras["paras_fixed"],
-            False,
-        )
-
-        opt_obj = OptimizationClass(
-            x_optim_all_unscaled_start,
-            optim_paras["paras_fixed"],
-            precond_matrix,
-            num_types,
-        )
-        opt_obj.maxfun = maxfun
-
-        if maxfun == 0:
+            # Special case where just one evaluation at the starting values is
+            # requested is accounted for. Note, that the relevant value of the
+            # criterion function is always the one indicated by the class attribute
+            # and not the value returned by the optimization algorithm.
+            num_free = optim_paras["paras_fixed"].count(False)
+
+            # Take only bounds from unfixed parameters and insert default bounds.
+            mask_paras_fixed = np.array(optim_paras["paras_fixed"])
+            paras_bounds_free_unscaled = np.array(optim_paras["paras_bounds"])[
+                ~mask_paras_fixed
+            ]
+            paras_bounds_free_unscaled[:, 0] = np.where(
+                paras_bounds_free_unscaled[:, 0] == None,  # noqa: E711
+                -HUGE_FLOAT,
+                paras_bounds_free_unscaled[:, 0],
+            )
+            paras_bounds_free_unscaled[:, 1] = np.where(
+                paras_bounds_free_unscaled[:, 1] == None,  # noqa: E711
+                HUGE_FLOAT,
+                paras_bounds_free_unscaled[:, 1],
+            )
 
-            record_estimation_scalability("Start")
-            opt_obj.crit_func(x_optim_free_scaled_start, *args)
-            record_estimation_scalability("Finish")
+            record_estimation_scaling(
+                x_optim_free_unscaled_start,
+                None,
+                None,
+                None,
+                optim_paras["paras_fixed"],
+                True,
+            )
 
-            success = True
-            message = "Single evaluation of criterion function at starting values."
+            # With multiple processes, the criterion function is evaluated at all points
+            # of the numerical gradient in parallel.
+            is_gradient = maxfun > 0 and (
+                precond_spec["type"] == "gradient"
+                or optimizer_used in ["SCIPY-BFGS", "SCIPY-LBFGSB"]
+            )
+            if num_procs > 1 and is_gradient:
+                criterion_pool = CriterionPool(args, num_procs)
 
-        elif optimizer_used == "SCIPY-BFGS":
+            # The values of the criterion function are cached to avoid repeated
+            # evaluations at the same parameters.
+            if cache_size > 0:
+                criterion_cache = CriterionCache(cache_size, file_cache)
+            else:
+                criterion_cache = None
+
+            precond_matrix = get_precondition_matrix(
+                precond_spec,
+                optim_paras,
+                x_optim_all_unscaled_start,
+                args,
+                maxfun,
+                num_paras,
+                num_types,
+                derivatives,
+                criterion_pool,
+                criterion_cache,
+            )
 
-            bfgs_maxiter = optimizer_options["SCIPY-BFGS"]["maxiter"]
-            bfgs_gtol = optimizer_options["SCIPY-BFGS"]["gtol"]
-            bfgs_eps = optimizer_options["SCIPY-BFGS"]["eps"]
+            x_optim_free_scaled_start = apply_scaling(
+                x_optim_free_unscaled_start, precond_matrix, "do"
+            )
 
-            try:
-                rslt = fmin_bfgs(
-                    opt_obj.crit_func,
-                    x_optim_free_scaled_start,
-                    args=args,
-                    gtol=bfgs_gtol,
-                    epsilon=bfgs_eps,
-                    maxiter=bfgs_maxiter,
-                    full_output=True,
-                    disp=False,
+            paras_bounds_free_scaled = np.full((num_free, 2), np.nan)
+            for i in range(2):
+                paras_bounds_free_scaled[:, i] = apply_scaling(
+                    paras_bounds_free_unscaled[:, i], precond_matrix, "do"
                 )
 
-                success = rslt[6] not in [1, 2]
-                message = "Optimization terminated successfully."
-                if rslt[6] == 1:
-                    message = "Maximum number of iterations exceeded."
-                elif rslt[6] == 2:
-                    message = "Gradient and/or function calls not changing."
-
-            except MaxfunError:
-                success = False
-                message = "Maximum number of iterations exceeded."
-
-        elif optimizer_used == "SCIPY-LBFGSB":
-
-            lbfgsb_maxiter = optimizer_options["SCIPY-LBFGSB"]["maxiter"]
-            lbfgsb_maxls = optimizer_options["SCIPY-LBFGSB"]["maxls"]
-            lbfgsb_factr = optimizer_options["SCIPY-LBFGSB"]["factr"]
-            lbfgsb_pgtol = optimizer_options["SCIPY-LBFGSB"]["pgtol"]
-            lbfgsb_eps = optimizer_options["SCIPY-LBFGSB"]["eps"]
-            lbfgsb_m = optimizer_options["SCIPY-LBFGSB"]["m"]
-
-            try:
-                rslt = fmin_l_bfgs_b(
-                    opt_obj.crit_func,
-                    x_optim_free_scaled_start,
-                    args=args,
-                    approx_grad=True,
-                    bounds=paras_bounds_free_scaled,
-                    m=lbfgsb_m,
-                    factr=lbfgsb_factr,
-                    pgtol=lbfgsb_pgtol,
-                    epsilon=lbfgsb_eps,
-                    iprint=-1,
-                    maxfun=maxfun,
-                    maxiter=lbfgsb_maxiter,
-                    maxls=lbfgsb_maxls,
-                )
+            record_estimation_scaling(
+                x_optim_free_unscaled_start,
+                x_optim_free_scaled_start,
+                paras_bounds_free_scaled,
+                precond_matrix,
+                optim_paras["paras_fixed"],
+                False,
+            )
 
-                success = rslt[2]["warnflag"] in [0]
-                message = rslt[2]["task"]
-
-            except MaxfunError:
-                success = False
-                message = "Maximum number of iterations exceeded."
-
-        elif optimizer_used == "SCIPY-POWELL":
-
-            powell_maxiter = optimizer_options["SCIPY-POWELL"]["maxiter"]
-            powell_maxfun = optimizer_options["SCIPY-POWELL"]["maxfun"]
-            powell_xtol = optimizer_options["SCIPY-POWELL"]["xtol"]
-            powell_ftol = optimizer_options["SCIPY-POWELL"]["ftol"]
-
-            try:
-                rslt = fmin_powell(
-                    opt_obj.crit_func,
-                    x_optim_free_scaled_start,
-                    args,
-                    powell_xtol,
-                    powell_ftol,
-                    powell_maxiter,
-                    powell_maxfun,
-                    disp=0,
-                )
+            opt_obj = OptimizationClass(
+                x_optim_all_unscaled_start,
+                optim_paras["paras_fixed"],
+                precond_matrix,
+                num_types,
+            )
+            opt_obj.maxfun = maxfun
+            opt_obj.derivatives = derivatives
+            opt_obj.pool = criterion_pool
+            opt_obj.cache = criterion_cache
+
+            # Scipy approximates the gradient with forward differences sequentially.
+            # Thus, our own approximation is only used for central differences or in
+            # parallel.
+            if derivatives == "central-differences" or criterion_pool is not None:
+                crit_grad = opt_obj.crit_grad
+            else:
+                crit_grad = None
+
+            if maxfun == 0:
+
+                record_estimation_scalability("Start")
+                opt_obj.crit_func(x_optim_free_scaled_start, *args)
+                record_estimation_scalability("Finish")
+
+                success = True
+                message = "Single evaluation of criterion function at starting values."
+
+            elif optimizer_used == "SCIPY-BFGS":
+
+                bfgs_maxiter = optimizer_options["SCIPY-BFGS"]["maxiter"]
+                bfgs_gtol = optimizer_options["SCIPY-BFGS"]["gtol"]
+                bfgs_eps = optimizer_options["SCIPY-BFGS"]["eps"]
+
+                opt_obj.eps = bfgs_eps
+
+                try:
+                    rslt = fmin_bfgs(
+                        opt_obj.crit_func,
+                        x_optim_free_scaled_start,
+                        fprime=crit_grad,
+                        args=args,
+                        gtol=bfgs_gtol,
+                        epsilon=bfgs_eps,
+                        maxiter=bfgs_maxiter,
+                        full_output=True,
+                        disp=False,
+                    )
+
+                    success = rslt[6] not in [1, 2]
+                    message = "Optimization terminated successfully."
+                    if rslt[6] == 1:
+                        message = "Maximum number of iterations exceeded."
+                    elif rslt[6] == 2:
+                        message = "Gradient and/or function calls not changing."
+
+                except MaxfunError:
+                    success = False
+                    message = "Maximum number of iterations exceeded."
 
-                success = rslt[5] not in [1, 2]
-                message = "Optimization terminated successfully."
-                if rslt[5] == 1:
-                    message = "Maximum number of function evaluations."
-                elif rslt[5] == 2:
-                    message = "Maximum number of iterations."
+            elif optimizer_used == "SCIPY-LBFGSB":
+
+                lbfgsb_maxiter = optimizer_options["SCIPY-LBFGSB"]["maxiter"]
+                lbfgsb_maxls = optimizer_options["SCIPY-LBFGSB"]["maxls"]
+                lbfgsb_factr = optimizer_options["SCIPY-LBFGSB"]["factr"]
+                lbfgsb_pgtol = optimizer_options["SCIPY-LBFGSB"]["pgtol"]
+                lbfgsb_eps = optimizer_options["SCIPY-LBFGSB"]["eps"]
+                lbfgsb_m = optimizer_options["SCIPY-LBFGSB"]["m"]
+
+                opt_obj.eps = lbfgsb_eps
+                opt_obj.paras_bounds = paras_bounds_free_scaled
+
+                try:
+                    rslt = fmin_l_bfgs_b(
+                        opt_obj.crit_func,
+                        x_optim_free_scaled_start,
+                        fprime=crit_grad,
+                        args=args,
+                        approx_grad=crit_grad is None,
+                        bounds=paras_bounds_free_scaled,
+                        m=lbfgsb_m,
+                        factr=lbfgsb_factr,
+                        pgtol=lbfgsb_pgtol,
+                        epsilon=lbfgsb_eps,
+                        iprint=-1,
+                        maxfun=maxfun,
+                        maxiter=lbfgsb_maxiter,
+                        maxls=lbfgsb_maxls,
+                    )
+
+                    success = rslt[2]["warnflag"] in [0]
+                    message = rslt[2]["task"]
+
+                except MaxfunError:
+                    success = False
+                    message = "Maximum number of iterations exceeded."
 
-            except MaxfunError:
-                success = False
-                message = "Maximum number of iterations exceeded."
+            elif optimizer_used == "SCIPY-POWELL":
+
+                powell_maxiter = optimizer_options["SCIPY-POWELL"]["maxiter"]
+                powell_maxfun = optimizer_options["SCIPY-POWELL"]["maxfun"]
+                powell_xtol = optimizer_options["SCIPY-POWELL"]["xtol"]
+                powell_ftol = optimizer_options["SCIPY-POWELL"]["ftol"]
+
+                try:
+                    rslt = fmin_powell(
+                        opt_obj.crit_func,
+                        x_optim_free_scaled_start,
+                        args,
+                        powell_xtol,
+                        powell_ftol,
+                        powell_maxiter,
+                        powell_maxfun,
+                        disp=0,
+                    )
+
+                    success = rslt[5] not in [1, 2]
+                    message = "Optimization terminated successfully."
+                    if rslt[5] == 1:
+                        message = "Maximum number of function evaluations."
+                    elif rslt[5] == 2:
+                        message = "Maximum number of iterations."
+
+                except MaxfunError:
+                    success = False
+                    message = "Maximum number of iterations exceeded."
 
-        else:
-            raise NotImplementedError
+            else:
+                raise NotImplementedError
 
-        record_estimation_final(success, message)
-        record_estimation_stop()
+            record_estimation_final(success, message)
+            record_estimation_stop()
+        finally:
+            if pool is not None:
+                pool.close()
+            if criterion_pool is not None:
+                criterion_pool.close()
 
     elif request == "simulate":
 
-        # Draw draws for the simulation.
-        periods_draws_sims = create_draws(
-            num_periods, num_agents_sim, seed_sim, is_debug
-        )
+        # Draw draws for the simulation. In chunks, the draws are created for each
+        # chunk separately.
+        if chunk_size_sim is None:
+            periods_draws_sims = create_draws(
+                num_periods, num_agents_sim, seed_sim, is_debug
+            )
+        else:
+            periods_draws_sims = None
 
         # Draw standard normal deviates for the solution and evaluation step.
-        periods_draws_emax = create_draws(
-            num_periods, num_draws_emax, seed_emax, is_debug
+        periods_draws_emax, weights_emax = create_draws_emax(
+            num_periods,
+            num_draws_emax,
+            seed_emax,
+            is_debug,
+            sequence_emax,
+            is_antithetic_emax,
+            integration_emax,
+            quadrature_rule,
+            quadrature_nodes,
         )
 
         # Collect arguments for different implementations of the simulation.
@@ -306,25 +440,120 @@ def respy_interface(respy_obj, request, data=None):
             optim_paras,
             file_sim,
             num_types,
+            state_space_cache,
+            weights_emax,
+            is_control_variate,
+            tolerance_emax,
+            indexer_type,
         )
 
-        simulated_data = pyth_simulate(
+        # In chunks, the datasets are yielded as they are simulated and the caller
+        # writes them to disk.
+        if chunk_size_sim is None:
+            simulated_data = pyth_simulate(
+                state_space,
+                num_agents_sim,
+                periods_draws_sims,
+                seed_sim,
+                file_sim,
+                edu_spec,
+                optim_paras,
+                is_debug,
+            )
+        else:
+            simulated_data = simulate_in_chunks(
+                state_space,
+                num_agents_sim,
+                chunk_size_sim,
+                seed_sim,
+                file_sim,
+                edu_spec,
+                optim_paras,
+                is_debug,
+                num_procs,
+            )
+
+        args = (state_space, simulated_data)
+
+    else:
+        raise NotImplementedError("This request is not implemented.")
+
+    return args
+
+
+def simulate_in_chunks(
+    state_space,
+    num_agents_sim,
+    chunk_size,
+    seed_sim,
+    file_sim,
+    edu_spec,
+    optim_paras,
+    is_debug,
+    num_procs,
+):
+    """Yield the datasets of chunks of simulated agents.
+
+    With multiple processors, the chunks are simulated by a pool of processes which is
+    closed once the generator is exhausted or closed.
+
+    """
+    pool = None
+    try:
+        if num_procs > 1:
+            pool = SimulationPool(
+                state_space, edu_spec, optim_paras, is_debug, num_procs
+            )
+
+        yield from pyth_simulate_chunks(
             state_space,
             num_agents_sim,
-            periods_draws_sims,
+            chunk_size,
             seed_sim,
             file_sim,
             edu_spec,
             optim_paras,
             is_debug,
+            pool,
         )
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def create_draws_emax(
+    num_periods,
+    num_draws_emax,
+    seed_emax,
+    is_debug,
+    sequence_emax,
+    is_antithetic_emax,
+    integration_emax,
+    quadrature_rule,
+    quadrature_nodes,
+):
+    """Create the draws and weights for the integration of the expected maximum utility.
 
-        args = (state_space, simulated_data)
+    For Monte Carlo integration, the weights are None which means that all draws have
+    the same weight. For quadrature, the nodes replace the draws.
 
+    """
+    if integration_emax == "quadrature":
+        periods_draws_emax, weights_emax = create_quadrature(
+            num_periods, quadrature_rule, quadrature_nodes
+        )
     else:
-        raise NotImplementedError("This request is not implemented.")
+        periods_draws_emax = create_draws(
+            num_periods,
+            num_draws_emax,
+            seed_emax,
+            is_debug,
+            sequence_emax,
+            is_antithetic_emax,
+        )
+        weights_emax = None
 
-    return args
+    return periods_draws_emax, weights_emax
 
 
 def get_precondition_matrix(
@@ -335,6 +564,9 @@ def get_precondition_matrix(
     maxfun,
     num_paras,
     num_types,
+    derivatives="forward-differences",
+    criterion_pool=None,
+    criterion_cache=None,
 ):
     """ Get the preconditioning matrix for the optimization.
     """
@@ -352,6 +584,9 @@ def get_precondition_matrix(
     )
 
     opt_obj.is_scaling = False
+    opt_obj.derivatives = derivatives
+    opt_obj.pool = criterion_pool
+    opt_obj.cache = criterion_cache
 
     # Distribute information about user request.
     precond_minimum = precond_spec["minimum"]
@@ -371,9 +606,8 @@ def get_precondition_matrix(
         precond_matrix = get_scales_magnitudes(x_optim_free_unscaled_start)
     elif precond_type == "gradient":
         opt_obj.is_scaling = None
-        grad = approx_fprime(
-            x_optim_free_unscaled_start, opt_obj.crit_func, precond_eps, *args
-        )
+        opt_obj.eps = precond_eps
+        grad = opt_obj.crit_grad(x_optim_free_unscaled_start, *args)
         precond_matrix = np.zeros((num_free, num_free))
         for i in range(num_free):
             grad[i] = max(np.abs(grad[i]), precond_minimum)
@@ -211,6 +211,7 @@ def record_estimation_eval(opt_obj, fval, x_optim_all_unscaled, start):
         opt_obj.crit_vals[2],
         x_econ_container[:, 2],
         num_paras,
+        opt_obj.num_cache_hits if opt_obj.cache is not None else None,
     )
 
 
@@ -224,6 +225,7 @@ def write_est_info(
     value_current,
     paras_current,
     num_paras,
+    num_cache_hits=None,
 ):
 
     # Formatting for the file
@@ -250,6 +252,8 @@ def write_est_info(
         fmt_ = "\n{0:<25}    {1:>25}\n"
         out_file.write(fmt_.format(*[" Number of Steps", num_step]))
         out_file.write(fmt_.format(*[" Number of Evaluations", num_eval]))
+        if num_cache_hits is not None:
+            out_file.write(fmt_.format(*[" Number of Cache Hits", num_cache_hits]))
 
 
 def char_floats(floats):
@@ -1,7 +1,9 @@
 import os
 
 
-def record_solution_progress(indicator, file_sim, period=None, num_states=None):
+def record_solution_progress(
+    indicator, file_sim, period=None, num_states=None, num_draws=None
+):
 
     if indicator == 1:
         if os.path.exists(file_sim + ".respy.sol"):
@@ -17,6 +19,9 @@ def record_solution_progress(indicator, file_sim, period=None, num_states=None):
         line = string.format(
             *["... solving period", period, "with", num_states, "states"]
         )
+    elif indicator == 5:
+        string = """{:>18}{:>3}{:>5} {:>7} {:>7}"""
+        line = string.format(*["... period", period, "used", num_draws, "draws"])
     elif indicator == -1:
         line = "... finished\n"
     elif indicator == -2:
@@ -1,6 +1,7 @@
 import linecache
 import os
 import shlex
+import warnings
 
 import numpy as np
 from numba import guvectorize
@@ -16,23 +17,27 @@ from respy.python.shared.shared_constants import PRINT_FLOAT
 from respy.python.shared.shared_constants import TINY_FLOAT
 
 
-def get_log_likl(contribs):
+def get_log_likl(contribs, is_log=False):
     """Aggregate contributions to the likelihood value.
 
     Parameters
     ----------
     contribs : np.ndarray
         Array with shape (num_agents_est,).
+    is_log : bool, default False
+        Indicator for whether ``contribs`` are log contributions.
 
     Returns
     -------
     crit_val : float
 
     """
-    if np.sum(np.abs(contribs) > HUGE_FLOAT) > 0:
+    log_contribs = contribs if is_log else np.log(contribs)
+
+    if np.sum(log_contribs > np.log(HUGE_FLOAT)) > 0:
         record_warning(5)
 
-    crit_val = -np.mean(np.clip(np.log(contribs), -HUGE_FLOAT, HUGE_FLOAT))
+    crit_val = -np.mean(np.clip(log_contribs, -HUGE_FLOAT, HUGE_FLOAT))
 
     return crit_val
 
@@ -477,25 +482,55 @@ def get_emaxs_of_subsequent_period(states, indexer, emaxs, edu_max):
     return emaxs
 
 
-def create_draws(num_periods, num_draws, seed, is_debug):
+def create_draws(
+    num_periods, num_draws, seed, is_debug, sequence="random", is_antithetic=False
+):
     """Create the relevant set of draws.
 
     Handle special case of zero variances as this case is useful for testing.
     The draws are from a standard normal distribution and transformed later in
     the code.
 
+    Instead of pseudo-random draws, the draws can be based on low-discrepancy sequences
+    which cover the unit hypercube more evenly and thus reduce the integration error of
+    the Monte Carlo integration for a given number of draws. The points of the
+    scrambled sequences are mapped to standard normal deviates with the inverse of the
+    cumulative distribution function. Each period is based on an independently
+    scrambled sequence. The balance properties of Sobol sequences require the number of
+    draws to be a power of two.
+
+    Antithetic draws consist of pairs of draws with opposite signs. Thus, the mean of an
+    even number of draws is exactly zero and the variance of the integration of
+    functions which are monotonic in the draws is reduced. Only half of the draws are
+    generated randomly.
+
     Parameters
     ----------
     num_periods : int
     num_draws : int
     seed : int
     is_debug : bool
+    sequence : {"random", "sobol", "halton"}, default "random"
+        Type of the sequence of draws.
+    is_antithetic : bool, default False
+        Indicator for whether the second half of the draws mirrors the first half.
 
     Returns
     -------
     draws : np.array
         Draws with shape (num_periods, num_draws)
 
+    Example
+    -------
+    >>> draws = create_draws(2, 64, 1, False, "sobol")
+    >>> draws.shape
+    (2, 64, 4)
+    >>> np.abs(draws.mean(axis=1)).max() < 0.05
+    True
+    >>> draws = create_draws(2, 64, 1, False, is_antithetic=True)
+    >>> np.allclose(draws.mean(axis=1), 0)
+    True
+
     """
     # Control randomness by setting seed value
     np.random.seed(seed)
@@ -503,11 +538,49 @@ def create_draws(num_periods, num_draws, seed, is_debug):
     # Draw random deviates from a standard normal distribution or read it from
     # disk. The latter is available to allow for testing across implementation.
     if is_debug and os.path.exists(".draws.respy.test"):
-        draws = read_draws(num_periods, num_draws)
-    else:
+        return read_draws(num_periods, num_draws)
+
+    num_draws_random = (num_draws + 1) // 2 if is_antithetic else num_draws
+
+    if sequence == "random":
         draws = np.random.multivariate_normal(
-            np.zeros(4), np.identity(4), (num_periods, num_draws)
+            np.zeros(4), np.identity(4), (num_periods, num_draws_random)
         )
+    elif sequence in ["sobol", "halton"]:
+        draws = create_quasi_random_draws(
+            num_periods, num_draws_random, seed, sequence
+        )
+    else:
+        raise NotImplementedError
+
+    if is_antithetic:
+        draws = np.concatenate((draws, -draws), axis=1)[:, :num_draws]
+
+    return draws
+
+
+def create_quasi_random_draws(num_periods, num_draws, seed, sequence):
+    """Create standard normal draws based on scrambled low-discrepancy sequences.
+
+    The sequences are implemented in :mod:`scipy.stats.qmc` which requires scipy 1.7.
+
+    """
+    from scipy.stats import norm
+    from scipy.stats import qmc
+
+    sampler = {"sobol": qmc.Sobol, "halton": qmc.Halton}[sequence]
+    seed_sequences = np.random.SeedSequence(seed).spawn(num_periods)
+
+    draws = np.empty((num_periods, num_draws, 4))
+    for period, seed_sequence in enumerate(seed_sequences):
+        rng = np.random.default_rng(seed_sequence)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", "The balance properties of Sobol")
+            points = sampler(d=4, scramble=True, seed=rng).random(num_draws)
+
+        # Scrambled points are in [0, 1). Zeros are shifted to avoid infinite draws.
+        points = np.clip(points, TINY_FLOAT, 1 - TINY_FLOAT)
+        draws[period] = norm.ppf(points)
 
     return draws
 
@@ -106,6 +106,25 @@ for key_ in DATA_LABELS_SIM:
     else:
         DATA_FORMATS_SIM[key_] = np.float
 
+# Binary files store the integer columns with compact types. Only the identifiers
+# require more than 16 bits.
+DATA_FORMATS_COMPACT = {}
+for key_, format_ in DATA_FORMATS_SIM.items():
+    if format_ is np.float:
+        DATA_FORMATS_COMPACT[key_] = np.float64
+    elif key_ in ["Identifier"]:
+        DATA_FORMATS_COMPACT[key_] = np.int32
+    else:
+        DATA_FORMATS_COMPACT[key_] = np.int16
+
+# Formats of the files with simulated datasets and their file extensions.
+DATA_FILE_FORMATS = {
+    "text": ".dat",
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "npz": ".npz",
+}
+
 # Set Numba configuration.
 import numba  # noqa: E402
 
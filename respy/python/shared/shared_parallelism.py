@@ -0,0 +1,168 @@
+"""Manage a local pool of processes and share arrays between them.
+
+The arrays are stored in blocks of :mod:`multiprocessing.shared_memory` which requires
+Python 3.8. Thus, it is imported lazily.
+
+"""
+import multiprocessing as mp
+
+import numpy as np
+
+# Blocks attached by a worker have to be kept alive as long as the worker uses them.
+_ATTACHED_BLOCKS = []
+
+
+class SharedArrays:
+    """Copy arrays into shared memory.
+
+    Parameters
+    ----------
+    arrays : dict
+        Dictionary of arrays which are copied into shared memory.
+
+    Attributes
+    ----------
+    arrays : dict
+        Dictionary of arrays which are backed by shared memory.
+    specs : dict
+        Dictionary with the name of the memory block, the shape and the dtype of each
+        array. It is passed to :func:`attach_shared_arrays` in the workers.
+
+    Example
+    -------
+    >>> shared = SharedArrays({"a": np.arange(3)})
+    >>> attached = attach_shared_arrays(shared.specs)
+    >>> attached["a"][0] = 10
+    >>> shared.arrays["a"]
+    array([10,  1,  2])
+    >>> release_shared_arrays()
+    >>> shared.close()
+
+    """
+
+    def __init__(self, arrays):
+        from multiprocessing import shared_memory
+
+        self._blocks = []
+        self.arrays = {}
+        self.specs = {}
+
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+            view[...] = array
+
+            self._blocks.append(block)
+            self.arrays[name] = view
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def close(self):
+        """Release and remove all blocks of shared memory.
+
+        Views on the blocks which are still referenced elsewhere prevent closing the
+        mapping in this process, but the blocks are removed nonetheless.
+
+        """
+        self.arrays = {}
+        for block in self._blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+            block.unlink()
+        self._blocks = []
+
+
+def attach_shared_arrays(specs):
+    """Attach to arrays in shared memory created by :class:`SharedArrays`.
+
+    Parameters
+    ----------
+    specs : dict
+        Dictionary with the name of the memory block, the shape and the dtype of each
+        array.
+
+    Returns
+    -------
+    arrays : dict
+        Dictionary of arrays which are backed by shared memory.
+
+    """
+    from multiprocessing import shared_memory
+
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers share the resource tracker of the parent process which is why the
+        # block is not registered twice and is removed by the creating process only.
+        block = shared_memory.SharedMemory(name=block_name)
+        _ATTACHED_BLOCKS.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+    return arrays
+
+
+def release_shared_arrays():
+    """Detach from all blocks of shared memory attached in this process."""
+    while _ATTACHED_BLOCKS:
+        block = _ATTACHED_BLOCKS.pop()
+        try:
+            block.close()
+        except BufferError:
+            pass
+
+
+def start_workers(target, args_by_worker):
+    """Start one process per worker which is connected to the main process by a pipe.
+
+    Processes are spawned instead of forked because forking a process whose numba
+    threads are already running can deadlock the children.
+
+    Parameters
+    ----------
+    target : callable
+        Function executed by each worker. It receives its end of the pipe as the first
+        argument followed by the arguments of the worker. It is defined at the module
+        level, so that it can be pickled.
+    args_by_worker : list
+        List with a tuple of arguments for each worker.
+
+    Returns
+    -------
+    connections : list
+        List with the ends of the pipes in the main process.
+    processes : list
+        List of started processes.
+
+    """
+    context = mp.get_context("spawn")
+
+    connections = []
+    processes = []
+    for args in args_by_worker:
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(
+            target=target, args=(child_conn,) + tuple(args), daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        connections.append(parent_conn)
+        processes.append(process)
+
+    return connections, processes
+
+
+def stop_workers(connections, processes):
+    """Signal all workers to stop by sending ``None`` and wait for them to exit."""
+    for conn in connections:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        conn.close()
+
+    for process in processes:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
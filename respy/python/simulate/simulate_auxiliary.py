@@ -7,36 +7,171 @@ import pandas as pd
 from respy.pre_processing.data_checking import check_estimation_dataset
 from respy.python.shared.shared_auxiliary import dist_class_attributes
 from respy.python.shared.shared_auxiliary import get_conditional_probabilities
+from respy.python.shared.shared_constants import DATA_FILE_FORMATS
+from respy.python.shared.shared_constants import DATA_FORMATS_COMPACT
 
 
 def construct_transition_matrix(base_df):
     """ This method constructs the transition matrix.
+
+    Rows of choices which are never followed by another choice are zero.
+
+    """
+    return _normalize_rows(get_transition_counts(base_df))
+
+
+def get_transition_counts(base_df):
+    """Count the transitions between choices.
+
+    The transitions are the choices in consecutive rows of the same agent. They are
+    counted in a single pass with :func:`numpy.bincount`.
+
     """
-    df = base_df.copy(deep=True)
-    df["Choice_Next"] = df.groupby(level="Identifier")["Choice"].shift(-1)
-    args = []
-    for label in ["Choice", "Choice_Next"]:
-        args += [pd.Categorical(df[label], categories=range(1, 5))]
-    tm = pd.crosstab(*args, normalize="index", dropna=False).to_numpy()
+    identifiers = base_df.index.get_level_values("Identifier").to_numpy()
+    choices = base_df["Choice"].to_numpy()
+
+    # The rows of each agent are ordered like the rows of the dataset.
+    order = np.argsort(identifiers, kind="mergesort")
+    identifiers, choices = identifiers[order], choices[order]
 
-    return tm
+    is_transition = identifiers[1:] == identifiers[:-1]
+    transitions = (choices[:-1] - 1) * 4 + choices[1:] - 1
+    counts = np.bincount(transitions[is_transition], minlength=16).reshape(4, 4)
 
+    return counts
 
-def get_final_education(agent):
+
+def get_final_education(data_frame):
     """ This method construct the final level of schooling for each individual.
+
+    The dataset is expected to be sorted by identifiers and periods.
+
     """
-    edu_final = agent["Years_Schooling"].iloc[0] + agent["Choice"].eq(3).sum()
+    identifiers = data_frame["Identifier"].to_numpy()
+    schooling = data_frame["Years_Schooling"].to_numpy()
+
+    is_first = np.r_[True, identifiers[1:] != identifiers[:-1]]
+    is_last = np.r_[identifiers[1:] != identifiers[:-1], True]
+    agents = np.cumsum(is_first) - 1
+
+    edu_final = schooling[is_first] + np.bincount(
+        agents, weights=data_frame["Choice"].to_numpy() == 3
+    )
 
     # As a little test, we just ensure that the final level of education is equal or
     # less the level the agent entered the final period.
-    valid = [agent["Years_Schooling"].iloc[-1], agent["Years_Schooling"].iloc[-1] + 1]
-    np.testing.assert_equal(edu_final in valid, True)
+    np.testing.assert_equal(
+        np.isin(edu_final - schooling[is_last], [0, 1]).all(), True
+    )
 
     return edu_final
 
 
+def get_info_statistics(data_frame, num_periods, num_types, edu_spec):
+    """Collect the statistics of a simulated sample which are reported by write_info.
+
+    Apart from the wages of working agents which are needed for the percentiles, all
+    statistics are counts or sums. Thus, the statistics of chunks of agents are combined
+    with :func:`merge_info_statistics` without keeping the chunks.
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        Simulated dataset sorted by identifiers and periods.
+    num_periods : int
+        Number of periods in the model.
+    num_types : int
+        Number of types.
+    edu_spec : dict
+        Information on education.
+
+    Returns
+    -------
+    statistics : dict
+        Dictionary with the statistics.
+
+    """
+    periods = data_frame["Period"].to_numpy()
+    choices = data_frame["Choice"].to_numpy()
+    wages = data_frame["Wage"].to_numpy()
+
+    # The choices of all periods are counted in a single pass.
+    choice_counts = np.bincount(
+        periods * 4 + choices - 1, minlength=num_periods * 4
+    ).reshape(-1, 4)
+
+    wages_working = []
+    for j in range(2):
+        wages_working.append([])
+        for t in range(num_periods):
+            wages_period = wages[(periods == t) & (choices == j + 1)]
+            wages_working[j].append(wages_period[~np.isnan(wages_period)])
+
+    # Initial conditions are counted for the first period of each agent. Initial levels
+    # of schooling which are not part of the model are ignored.
+    is_initial = periods == 0
+    edu_starts = np.array(edu_spec["start"])
+    is_start = data_frame["Years_Schooling"].to_numpy()[is_initial, None] == edu_starts
+    has_start = is_start.any(axis=1)
+    edu_indices = is_start.argmax(axis=1)[has_start]
+
+    types = data_frame["Type"].to_numpy()[is_initial][has_start]
+    schooling_by_type = np.bincount(
+        edu_indices * num_types + types, minlength=len(edu_starts) * num_types
+    ).reshape(-1, num_types)
+
+    lagged_choices = data_frame["Lagged_Choice"].to_numpy()[is_initial][has_start]
+    is_lagged = np.isin(lagged_choices, [3, 4])
+    lagged_by_schooling = np.bincount(
+        edu_indices[is_lagged] * 2 + lagged_choices[is_lagged] - 3,
+        minlength=len(edu_starts) * 2,
+    ).reshape(-1, 2)
+
+    statistics = {
+        "num_agents": data_frame["Identifier"].unique().shape[0],
+        "choice_counts": choice_counts,
+        "transition_counts": get_transition_counts(data_frame),
+        "wages_working": wages_working,
+        "edu_final_sum": get_final_education(data_frame).sum(),
+        "schooling_by_type": schooling_by_type,
+        "lagged_by_schooling": lagged_by_schooling,
+    }
+
+    return statistics
+
+
+def merge_info_statistics(statistics, other):
+    """Combine the statistics of two samples with different agents."""
+    merged = {}
+    for key, value in statistics.items():
+        if key == "wages_working":
+            merged[key] = [
+                [np.concatenate(pair) for pair in zip(wages, wages_other)]
+                for wages, wages_other in zip(value, other[key])
+            ]
+        else:
+            merged[key] = value + other[key]
+
+    return merged
+
+
 def write_info(respy_obj, data_frame):
     """ Write information about the simulated economy.
+    """
+    num_periods, num_types, edu_spec = dist_class_attributes(
+        respy_obj, "num_periods", "num_types", "edu_spec"
+    )
+    statistics = get_info_statistics(data_frame, num_periods, num_types, edu_spec)
+
+    write_info_statistics(respy_obj, statistics)
+
+
+def write_info_statistics(respy_obj, statistics):
+    """ Write information about the simulated economy from its statistics.
+
+    The statistics are collected with :func:`get_info_statistics`, e.g. for each chunk
+    of agents separately.
+
     """
     # Distribute class attributes
     optim_paras, num_types, file_sim, seed_sim, edu_spec = dist_class_attributes(
@@ -44,8 +179,9 @@ def write_info(respy_obj, data_frame):
     )
 
     # Get basic information
-    num_agents_sim = data_frame["Identifier"].unique().shape[0]
-    num_periods = data_frame["Period"].unique().shape[0]
+    num_agents_sim = statistics["num_agents"]
+    counts = statistics["choice_counts"]
+    num_periods = int((counts.sum(axis=1) > 0).sum())
 
     # Write information to file
     with open(file_sim + ".respy.info", "w") as file_:
@@ -61,15 +197,9 @@ def write_info(respy_obj, data_frame):
         labels = ["Period", "Work A", "Work B", "School", "Home"]
         file_.write(fmt_.format(*labels))
 
-        choices = data_frame["Choice"]
         for t in range(num_periods):
-            args = []
-            for decision in [1, 2, 3, 4]:
-                args += [choices.loc[slice(None), t].eq(decision).sum()]
-            args = [x / float(num_agents_sim) for x in args]
-
             fmt_ = "{:>10}" + "{:14.4f}" * 4 + "\n"
-            file_.write(fmt_.format((t + 1), *args))
+            file_.write(fmt_.format((t + 1), *counts[t] / float(num_agents_sim)))
 
         # We also print out the transition matrix as it provides some insights about the
         # persistence of choices. However, we can only compute this transition matrix if
@@ -81,18 +211,11 @@ def write_info(respy_obj, data_frame):
             labels = ["Work A", "Work B", "School", "Home"]
             file_.write(fmt_.format(*[""] + labels))
 
-            tb = construct_transition_matrix(data_frame)
+            tb = _normalize_rows(statistics["transition_counts"])
             for i in range(4):
                 fmt_ = "    {:6}" + "{:14.4f}" * 4 + "\n"
                 line = [labels[i]] + tb[i, :].tolist()
-
-                # In contrast to the official documentation, the crosstab command omits
-                # categories in the current pandas release when they are not part of the
-                # data. We suspect this will be ironed out in the next releases.
-                try:
-                    file_.write(fmt_.format(*line))
-                except IndexError:
-                    pass
+                file_.write(fmt_.format(*line))
 
             file_.write("\n\n")
 
@@ -112,13 +235,13 @@ def write_info(respy_obj, data_frame):
 
             for t in range(num_periods):
 
-                is_working = choices.loc[slice(None), t] == j + 1
-                wages = data_frame["Wage"].loc[slice(None), t][is_working]
-                count = wages.count()
+                wages_working = statistics["wages_working"][j][t]
+                count = wages_working.shape[0]
 
                 if count > 0:
-                    mean, sd = np.mean(wages), np.sqrt(np.var(wages))
-                    percentiles = np.percentile(wages, [20, 50, 80]).tolist()
+                    mean = np.mean(wages_working)
+                    sd = np.sqrt(np.var(wages_working))
+                    percentiles = np.percentile(wages_working, [20, 50, 80]).tolist()
                 else:
                     mean, sd = "---", "---"
                     percentiles = ["---", "---", "---"]
@@ -139,10 +262,10 @@ def write_info(respy_obj, data_frame):
         fmt_ = "    {:<16}" + "   {:15.5f}\n"
         file_.write("   Additional Information\n\n")
 
-        stat = data_frame["Choice"].eq(1).sum() / float(num_agents_sim)
+        stat = counts[:, 0].sum() / float(num_agents_sim)
         file_.write(fmt_.format(*["Average Work A", stat]))
 
-        stat = data_frame["Choice"].eq(2).sum() / float(num_agents_sim)
+        stat = counts[:, 1].sum() / float(num_agents_sim)
         file_.write(fmt_.format(*["Average Work B", stat]))
 
         # The calculation of years of schooling is a little more difficult to determine
@@ -150,35 +273,43 @@ def write_info(respy_obj, data_frame):
         # column on Years_Schooling only contains information on the level of schooling
         # attainment going in the period, thus is not identical to the final level of
         # schooling for individuals that enroll in school in the very last period.
-        stat = data_frame.groupby(level="Identifier").apply(get_final_education).mean()
+        stat = statistics["edu_final_sum"] / float(num_agents_sim)
         file_.write(fmt_.format(*["Average School", stat]))
 
-        stat = data_frame["Choice"].eq(4).sum() / float(num_agents_sim)
+        stat = counts[:, 3].sum() / float(num_agents_sim)
         file_.write(fmt_.format(*["Average Home", stat]))
         file_.write("\n")
 
         file_.write("\n\n   Schooling by Type\n\n")
 
-        cat_schl = pd.Categorical(
-            data_frame["Years_Schooling"][:, 0], categories=edu_spec["start"]
-        )
-        cat_type = pd.Categorical(data_frame["Type"][:, 0], categories=range(num_types))
+        schooling_by_type = statistics["schooling_by_type"]
+        total = schooling_by_type.sum()
 
         for normalize in ["all", "columns", "index"]:
 
+            # The shares are computed like a crosstab with margins.
             if normalize == "columns":
                 file_.write("\n    ... by Type \n\n")
                 num_columns = num_types + 1
+                info = np.column_stack(
+                    (
+                        _normalize_rows(schooling_by_type.T).T,
+                        _divide(schooling_by_type.sum(axis=1), total),
+                    )
+                )
             elif normalize == "index":
                 file_.write("\n    ... by Schooling \n\n")
                 num_columns = num_types
+                info = np.row_stack(
+                    (
+                        _normalize_rows(schooling_by_type),
+                        _divide(schooling_by_type.sum(axis=0), total),
+                    )
+                )
             else:
                 file_.write("\n    ... jointly \n\n")
                 num_columns = num_types
-
-            info = pd.crosstab(
-                cat_schl, cat_type, normalize=normalize, dropna=False, margins=True
-            ).to_numpy()
+                info = _divide(schooling_by_type, total)
 
             fmt_ = "   {:>10}    " + "{:>25}" * num_columns + "\n\n"
             line = ["Schooling"]
@@ -200,11 +331,7 @@ def write_info(respy_obj, data_frame):
 
         # We want to provide information on the value of the lagged activity when
         # entering the model based on the level of initial education.
-        cat_1 = pd.Categorical(
-            data_frame["Years_Schooling"][:, 0], categories=edu_spec["start"]
-        )
-        cat_2 = pd.Categorical(data_frame["Lagged_Choice"][:, 0], categories=[3, 4])
-        info = pd.crosstab(cat_1, cat_2, normalize=normalize, dropna=False).to_numpy()
+        info = _normalize_rows(statistics["lagged_by_schooling"])
 
         file_.write("\n\n   Initial Lagged Activity by Schooling\n\n")
         fmt_ = "\n   {:>10}" + "    {:>25}" + "{:>25}\n\n"
@@ -222,18 +349,158 @@ def write_info(respy_obj, data_frame):
             file_.write(fmt_.format(*[i, stat]))
 
 
+def _normalize_rows(counts):
+    """Normalize the rows of a matrix of counts. Rows without counts are zero."""
+    return _divide(counts, counts.sum(axis=1, keepdims=True))
+
+
+def _divide(counts, totals):
+    """Divide counts by totals. Divisions by zero yield zero."""
+    counts = np.asarray(counts, dtype=float)
+
+    return np.divide(
+        counts, totals, out=np.zeros_like(counts), where=np.asarray(totals) > 0
+    )
+
+
 def write_out(respy_obj, data_frame):
     """ Write dataset to file.
     """
     # Distribute class attributes
-    file_sim = respy_obj.get_attr("file_sim")
+    file_sim, format_sim = dist_class_attributes(respy_obj, "file_sim", "format_sim")
 
-    # We maintain several versions of the file.
-    with open(file_sim + ".respy.dat", "w") as file_:
-        data_frame.to_string(file_, index=False, header=True, na_rep=".")
+    # We maintain several versions of the file. Binary files replace the text file
+    # which is slow to write and to read.
+    if format_sim == "text":
+        with open(file_sim + ".respy.dat", "w") as file_:
+            data_frame.to_string(file_, index=False, header=True, na_rep=".")
+    else:
+        write_dataset(data_frame, file_sim + ".respy" + DATA_FILE_FORMATS[format_sim])
     data_frame.to_pickle(file_sim + ".respy.pkl")
 
 
+def write_out_chunks(respy_obj, data_frames):
+    """ Write the datasets of chunks of agents to file as they arrive.
+
+    Text files are appended and Parquet files receive a row group for each chunk. The
+    statistics of write_info are collected for each chunk and merged. Thus, only one
+    chunk is held in memory at a time and no pickle of the full sample is written.
+
+    Parameters
+    ----------
+    respy_obj : RespyCls
+        Class of the model.
+    data_frames : iterable
+        Iterable of the simulated datasets of each chunk in the order of the agents.
+
+    """
+    # Distribute class attributes
+    file_sim, format_sim, is_info_sim, is_debug = dist_class_attributes(
+        respy_obj, "file_sim", "format_sim", "is_info_sim", "is_debug"
+    )
+    num_periods, num_types, edu_spec = dist_class_attributes(
+        respy_obj, "num_periods", "num_types", "edu_spec"
+    )
+
+    fname = file_sim + ".respy" + DATA_FILE_FORMATS[format_sim]
+    if format_sim == "text":
+        file_ = open(fname, "w")
+    elif format_sim == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        file_ = None
+    else:
+        raise ValueError(f"The format {format_sim!r} cannot be written in chunks.")
+
+    statistics = None
+    num_agents = 0
+    try:
+        for data_frame in data_frames:
+            if is_debug:
+                check_dataset_sim(data_frame, respy_obj, is_chunk=True)
+
+            if format_sim == "text":
+                if num_agents > 0:
+                    file_.write("\n")
+                data_frame.to_string(
+                    file_, index=False, header=num_agents == 0, na_rep="."
+                )
+            else:
+                table = pa.Table.from_pandas(
+                    _compact_dataset(data_frame), preserve_index=False
+                )
+                if file_ is None:
+                    file_ = pq.ParquetWriter(fname, table.schema)
+                file_.write_table(table)
+
+            num_agents += data_frame["Identifier"].unique().shape[0]
+
+            if is_info_sim:
+                statistics_chunk = get_info_statistics(
+                    data_frame, num_periods, num_types, edu_spec
+                )
+                if statistics is None:
+                    statistics = statistics_chunk
+                else:
+                    statistics = merge_info_statistics(statistics, statistics_chunk)
+    finally:
+        if file_ is not None:
+            file_.close()
+
+    if is_debug:
+        num_agents_sim, num_agents_est = dist_class_attributes(
+            respy_obj, "num_agents_sim", "num_agents_est"
+        )
+        np.testing.assert_equal(num_agents, num_agents_sim)
+        np.testing.assert_equal(num_agents >= num_agents_est, True)
+
+    if is_info_sim:
+        write_info_statistics(respy_obj, statistics)
+
+
+def write_dataset(data_frame, fname):
+    """Write a dataset to a columnar binary file.
+
+    The format is determined by the file extension which is either ``.parquet``,
+    ``.feather`` or ``.npz``. Parquet and Feather files require ``pyarrow``. Integer
+    columns are stored with compact types and the index is dropped.
+
+    Parameters
+    ----------
+    data_frame : pd.DataFrame
+        Simulated or observed dataset.
+    fname : str
+        Name of the file.
+
+    """
+    data_frame = _compact_dataset(data_frame)
+
+    suffix = os.path.splitext(fname)[1]
+    if suffix == ".parquet":
+        data_frame.to_parquet(fname, index=False)
+    elif suffix == ".feather":
+        data_frame.to_feather(fname)
+    elif suffix == ".npz":
+        np.savez(fname, **{label: data_frame[label].to_numpy() for label in data_frame})
+    else:
+        suffixes = [value for value in DATA_FILE_FORMATS.values() if value != ".dat"]
+        raise ValueError(
+            f"Unknown file extension {suffix!r}. Supported are {', '.join(suffixes)}."
+        )
+
+
+def _compact_dataset(data_frame):
+    """Store integer columns with compact types and drop the index."""
+    return data_frame.reset_index(drop=True).astype(
+        {
+            label: format_
+            for label, format_ in DATA_FORMATS_COMPACT.items()
+            if label in data_frame
+        }
+    )
+
+
 def format_float(x):
     """ Pretty formatting for floats
     """
@@ -281,10 +548,11 @@ def get_estimation_vector(optim_paras):
     return vector
 
 
-def check_dataset_sim(data_frame, respy_obj):
+def check_dataset_sim(data_frame, respy_obj, is_chunk=False):
     """ This routine runs some consistency checks on the simulated dataset.
     Some more restrictions are imposed on the simulated dataset than the
-    observed data.
+    observed data. If ``is_chunk`` is true, the dataset contains only some of the
+    simulated agents.
     """
     # Distribute class attributes
     num_agents = respy_obj.get_attr("num_agents_sim")
@@ -299,7 +567,7 @@ def check_dataset_sim(data_frame, respy_obj):
         np.testing.assert_equal(group["Period"].count(), num_periods)
 
     # So, we run all checks on the observed dataset.
-    check_estimation_dataset(data_frame, respy_obj)
+    check_estimation_dataset(data_frame, respy_obj, is_chunk)
 
     # Checks for PERIODS
     dat = data_frame["Period"]
@@ -307,7 +575,10 @@ def check_dataset_sim(data_frame, respy_obj):
 
     # Checks for IDENTIFIER
     dat = data_frame["Identifier"]
-    np.testing.assert_equal(dat.max(), num_agents - 1)
+    if is_chunk:
+        np.testing.assert_equal(dat.max() <= num_agents - 1, True)
+    else:
+        np.testing.assert_equal(dat.max(), num_agents - 1)
 
     # Checks for TYPES
     dat = data_frame["Type"]
@@ -381,12 +652,12 @@ def get_random_types(num_types, optim_paras, num_agents_sim, edu_start, is_debug
     if is_debug and os.path.exists(".types.respy.test"):
         types = np.genfromtxt(".types.respy.test")
     else:
-        types = []
-        for i in range(num_agents_sim):
-            probs = get_conditional_probabilities(
-                type_info["shares"], np.array([edu_start[i]])
-            )
-            types += np.random.choice(type_info["order"], p=probs, size=1).tolist()
+        probs = get_conditional_probabilities(
+            type_info["shares"], np.array(edu_start, ndmin=1)
+        )
+        types = draw_from_categorical(
+            type_info["order"], probs.reshape(num_agents_sim, -1)
+        )
 
     # If we only have one individual, we need to ensure that types are a vector.
     types = np.array(types, ndmin=1)
@@ -428,13 +699,54 @@ def get_random_choice_lagged_start(edu_spec, num_agents_sim, edu_start, is_debug
     if is_debug and os.path.exists(".initial_lagged.respy.test"):
         lagged_start = np.genfromtxt(".initial_lagged.respy.test")
     else:
-        lagged_start = []
-        for i in range(num_agents_sim):
-            idx = edu_spec["start"].index(edu_start[i])
-            probs = edu_spec["lagged"][idx], 1 - edu_spec["lagged"][idx]
-            lagged_start += np.random.choice([3, 4], p=probs, size=1).tolist()
+        # Look up the share of agents with lagged schooling for each initial level.
+        is_start = np.array(edu_start, ndmin=1).reshape(-1, 1) == edu_spec["start"]
+        shares_lagged = np.array(edu_spec["lagged"])[is_start.argmax(axis=1)]
+        probs = np.column_stack((shares_lagged, 1 - shares_lagged))
+        lagged_start = draw_from_categorical([3, 4], probs)
 
     # If we only have one individual, we need to ensure that activities are a vector.
     lagged_start = np.array(lagged_start, ndmin=1)
 
     return lagged_start
+
+
+def draw_from_categorical(values, probs):
+    """Draw one value for each row of probabilities by inverse transform sampling.
+
+    All agents are sampled at once. The draws are identical to calling
+    ``np.random.choice(values, p=probs[i])`` for each row as the same uniform draws
+    are consumed in the same order and compared with the same cumulative distribution
+    functions.
+
+    Parameters
+    ----------
+    values : array_like
+        Array with shape (num_values,) containing the values which are drawn.
+    probs : np.ndarray
+        Array with shape (num_draws, num_values) containing the probabilities of the
+        values for each draw.
+
+    Returns
+    -------
+    draws : np.ndarray
+        Array with shape (num_draws,) containing the drawn values.
+
+    Example
+    -------
+    >>> probs = np.array([[0.5, 0.5], [0.2, 0.8], [1, 0]])
+    >>> np.random.seed(0)
+    >>> draws = draw_from_categorical([3, 4], probs)
+    >>> np.random.seed(0)
+    >>> expected = [np.random.choice([3, 4], p=p, size=1)[0] for p in probs]
+    >>> np.array_equal(draws, expected)
+    True
+
+    """
+    cdf = probs.cumsum(axis=1)
+    cdf /= cdf[:, -1:]
+
+    uniforms = np.random.random_sample(probs.shape[0])
+    indices = (cdf <= uniforms.reshape(-1, 1)).sum(axis=1)
+
+    return np.asarray(values)[indices]
@@ -0,0 +1,151 @@
+"""Simulate chunks of agents in a pool of local processes.
+
+Each chunk of agents has its own seed, so that the simulated sample does not depend on
+the number of processes. The arrays of the solved state space are stored in shared
+memory and are only read by the workers.
+
+"""
+import weakref
+from types import SimpleNamespace
+
+from respy.python.shared.shared_parallelism import attach_shared_arrays
+from respy.python.shared.shared_parallelism import release_shared_arrays
+from respy.python.shared.shared_parallelism import SharedArrays
+from respy.python.shared.shared_parallelism import start_workers
+from respy.python.shared.shared_parallelism import stop_workers
+from respy.python.simulate.simulate_python import simulate_chunk
+from respy.python.solve.solve_auxiliary import CACHE_COMPACT_INDEXER
+from respy.python.solve.solve_auxiliary import CompactIndexer
+
+
+class SimulationPool:
+    """Pool of processes which simulate chunks of agents.
+
+    The pool is created after the model is solved. Each process receives the shared
+    arrays of the state space and the remaining arguments of
+    :func:`~respy.python.simulate.simulate_python.simulate_chunk` once. Afterwards,
+    only the chunks and the simulated datasets are exchanged.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of the solved state space.
+    edu_spec : dict
+        Information on education.
+    optim_paras : dict
+        Parameters affected by optimization.
+    is_debug : bool
+        Flag for debugging modus.
+    num_procs : int
+        Number of processes.
+
+    """
+
+    def __init__(self, state_space, edu_spec, optim_paras, is_debug, num_procs):
+        arrays = {
+            "states": state_space.states,
+            "rewards": state_space.rewards,
+            "emaxs": state_space.emaxs,
+        }
+        if isinstance(state_space.indexer, CompactIndexer):
+            arrays.update(zip(CACHE_COMPACT_INDEXER, state_space.indexer.arrays))
+            indexer_shape = state_space.indexer.shape
+        else:
+            arrays["indexer"] = state_space.indexer
+            indexer_shape = None
+        self._shared = SharedArrays(arrays)
+
+        attributes = {
+            "num_periods": state_space.num_periods,
+            "num_types": state_space.num_types,
+            "edu_max": state_space.edu_max,
+        }
+        args = (
+            self._shared.specs,
+            indexer_shape,
+            attributes,
+            edu_spec,
+            optim_paras,
+            is_debug,
+        )
+        self._connections, self._processes = start_workers(
+            _simulate_chunks_in_worker, [args] * num_procs
+        )
+
+        self._finalizer = weakref.finalize(
+            self, _shutdown_pool, self._connections, self._processes, self._shared
+        )
+
+    def simulate(self, chunks):
+        """Simulate the chunks and yield the datasets in the order of the chunks.
+
+        The chunks are assigned to the processes in turns. As each process returns the
+        datasets in the order of its chunks, the datasets are received in order, too.
+        A process which is ahead of the others waits until its dataset is received.
+
+        Parameters
+        ----------
+        chunks : list
+            List with the identifier of the first agent, the number of agents and the
+            seed of each chunk.
+
+        Yields
+        ------
+        simulated_data : pd.DataFrame
+            Dataset of the simulated agents of one chunk.
+
+        """
+        num_procs = len(self._connections)
+
+        for i, conn in enumerate(self._connections):
+            conn.send(chunks[i::num_procs])
+
+        for i in range(len(chunks)):
+            result = self._connections[i % num_procs].recv()
+            if isinstance(result, Exception):
+                self.close()
+                raise result
+
+            yield result
+
+    def close(self):
+        """Stop the processes and release the shared memory."""
+        self._finalizer()
+
+
+def _simulate_chunks_in_worker(
+    conn, specs, indexer_shape, attributes, edu_spec, optim_paras, is_debug
+):
+    """Simulate the received chunks until the pool is closed."""
+    arrays = attach_shared_arrays(specs)
+    if indexer_shape is None:
+        indexer = arrays.pop("indexer")
+    else:
+        indexer = CompactIndexer.from_arrays(
+            [arrays.pop(name) for name in CACHE_COMPACT_INDEXER], indexer_shape
+        )
+    state_space = SimpleNamespace(indexer=indexer, **arrays, **attributes)
+
+    while True:
+        chunks = conn.recv()
+        if chunks is None:
+            break
+
+        for chunk in chunks:
+            try:
+                simulated_data = simulate_chunk(
+                    state_space, *chunk, edu_spec, optim_paras, is_debug
+                )
+            except Exception as e:
+                simulated_data = e
+            conn.send(simulated_data)
+
+    del state_space, indexer, arrays
+    release_shared_arrays()
+    conn.close()
+
+
+def _shutdown_pool(connections, processes, shared):
+    """Stop all processes and release the shared memory."""
+    stop_workers(connections, processes)
+    shared.close()
@@ -4,6 +4,7 @@ import pandas as pd
 from respy.python.record.record_simulation import record_simulation_progress
 from respy.python.record.record_simulation import record_simulation_start
 from respy.python.record.record_simulation import record_simulation_stop
+from respy.python.shared.shared_auxiliary import create_draws
 from respy.python.shared.shared_auxiliary import (
     get_continuation_value_and_ex_post_rewards,
 )
@@ -62,6 +63,174 @@ def pyth_simulate(
     """
     record_simulation_start(num_agents_sim, seed_sim, file_sim)
 
+    simulated_data = simulate_agents(
+        state_space, periods_draws_sims, edu_spec, optim_paras, is_debug
+    )
+
+    for i in range(num_agents_sim):
+        record_simulation_progress(i, file_sim)
+    record_simulation_stop(file_sim)
+
+    return simulated_data
+
+
+def pyth_simulate_chunks(
+    state_space,
+    num_agents_sim,
+    chunk_size,
+    seed_sim,
+    file_sim,
+    edu_spec,
+    optim_paras,
+    is_debug,
+    pool=None,
+):
+    """Simulate agents in chunks and yield the dataset of each chunk.
+
+    The draws and the initial conditions are created for each chunk separately. The
+    seed of each chunk is derived from ``seed_sim`` and the position of the chunk with
+    :class:`numpy.random.SeedSequence`. Thus, the simulated sample depends on the seed
+    and the chunk size, but not on the order in which the chunks are processed or the
+    number of processes in ``pool``. Peak memory is bounded by the size of a chunk if
+    the chunks are consumed immediately, e.g. written to disk.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    num_agents_sim : int
+        Number of simulated agents.
+    chunk_size : int
+        Number of agents which are simulated at once.
+    seed_sim : int
+        Seed for the simulation.
+    file_sim : ???
+        Undocumented parameter.
+    edu_spec : dict
+        Information on education.
+    optim_paras : dict
+        Parameters affected by optimization.
+    is_debug : bool
+        Flag for debugging modus.
+    pool : ~respy.python.simulate.simulate_parallel.SimulationPool, optional
+        Pool of processes which simulate the chunks. The chunks are still yielded in
+        order.
+
+    Yields
+    ------
+    simulated_data : pd.DataFrame
+        Dataset of the simulated agents of one chunk. The identifiers continue across
+        chunks.
+
+    """
+    record_simulation_start(num_agents_sim, seed_sim, file_sim)
+
+    chunks = get_chunks(num_agents_sim, chunk_size, seed_sim)
+    if pool is None:
+        results = (
+            simulate_chunk(state_space, *chunk, edu_spec, optim_paras, is_debug)
+            for chunk in chunks
+        )
+    else:
+        results = pool.simulate(chunks)
+
+    for (offset, num_agents_chunk, _), simulated_data in zip(chunks, results):
+        for i in range(offset, offset + num_agents_chunk):
+            record_simulation_progress(i, file_sim)
+
+        yield simulated_data
+
+    record_simulation_stop(file_sim)
+
+
+def get_chunks(num_agents_sim, chunk_size, seed_sim):
+    """Get the first identifier, the number of agents and the seed of each chunk.
+
+    Example
+    -------
+    >>> [chunk[:2] for chunk in get_chunks(10, 4, 1)]
+    [(0, 4), (4, 4), (8, 2)]
+
+    """
+    offsets = range(0, num_agents_sim, chunk_size)
+    seed_sequences = np.random.SeedSequence(seed_sim).spawn(len(offsets))
+
+    return [
+        (
+            offset,
+            min(chunk_size, num_agents_sim - offset),
+            int(seed_sequence.generate_state(1)[0]),
+        )
+        for offset, seed_sequence in zip(offsets, seed_sequences)
+    ]
+
+
+def simulate_chunk(
+    state_space, offset, num_agents, seed, edu_spec, optim_paras, is_debug
+):
+    """Simulate a chunk of agents with its own draws and initial conditions.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    offset : int
+        Identifier of the first agent in the chunk.
+    num_agents : int
+        Number of agents in the chunk.
+    seed : int
+        Seed of the chunk.
+    edu_spec : dict
+        Information on education.
+    optim_paras : dict
+        Parameters affected by optimization.
+    is_debug : bool
+        Flag for debugging modus.
+
+    Returns
+    -------
+    simulated_data : pd.DataFrame
+        Dataset of the simulated agents of the chunk.
+
+    """
+    periods_draws_sims = create_draws(
+        state_space.num_periods, num_agents, seed, is_debug
+    )
+    simulated_data = simulate_agents(
+        state_space, periods_draws_sims, edu_spec, optim_paras, is_debug
+    )
+    simulated_data["Identifier"] += offset
+
+    return simulated_data
+
+
+def simulate_agents(state_space, periods_draws_sims, edu_spec, optim_paras, is_debug):
+    """Simulate the agents which face the given draws.
+
+    The initial conditions are drawn from the global random number generator.
+
+    Parameters
+    ----------
+    state_space : class
+        Class of state space.
+    periods_draws_sims : np.ndarray
+        Array with shape (num_periods, num_agents, num_choices) containing standard
+        normal draws.
+    edu_spec : dict
+        Information on education.
+    optim_paras : dict
+        Parameters affected by optimization.
+    is_debug : bool
+        Flag for debugging modus.
+
+    Returns
+    -------
+    simulated_data : pd.DataFrame
+        Dataset of simulated agents sorted by identifiers and periods.
+
+    """
+    num_agents_sim = periods_draws_sims.shape[1]
+
     # Standard deviates transformed to the distributions relevant for the agents actual
     # decision making as traversing the tree.
     periods_draws_sims_transformed = np.full(
@@ -93,7 +262,9 @@ def pyth_simulate(
         )
     ).astype(np.uint8)
 
-    data = []
+    # The rows of each agent are stored contiguously, so that the dataset is sorted by
+    # identifiers and periods without sorting.
+    data = np.empty((num_agents_sim, state_space.num_periods, len(DATA_LABELS_SIM)))
 
     for period in range(state_space.num_periods):
 
@@ -145,7 +316,7 @@ def pyth_simulate(
         wage = wages[np.arange(num_agents_sim), max_idx]
 
         # Record data of all agents in one period.
-        rows = np.column_stack(
+        data[:, period] = np.column_stack(
             (
                 np.arange(num_agents_sim),
                 np.full(num_agents_sim, period),
@@ -169,7 +340,6 @@ def pyth_simulate(
                 rewards_ex_post,
             )
         )
-        data.append(rows)
 
         # Update work experiences or education and lagged choice for the next period.
         current_states[np.arange(num_agents_sim), max_idx] = np.where(
@@ -179,15 +349,8 @@ def pyth_simulate(
         )
         current_states[:, 3] = max_idx + 1
 
-    simulated_data = (
-        pd.DataFrame(data=np.vstack(data), columns=DATA_LABELS_SIM)
-        .astype(DATA_FORMATS_SIM)
-        .sort_values(["Identifier", "Period"])
-        .reset_index(drop=True)
-    )
-
-    for i in range(num_agents_sim):
-        record_simulation_progress(i, file_sim)
-    record_simulation_stop(file_sim)
+    simulated_data = pd.DataFrame(
+        data=data.reshape(-1, len(DATA_LABELS_SIM)), columns=DATA_LABELS_SIM
+    ).astype(DATA_FORMATS_SIM)
 
     return simulated_data
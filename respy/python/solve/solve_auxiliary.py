@@ -1,5 +1,10 @@
+import hashlib
+import json
 import os
 import shlex
+import shutil
+import tempfile
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
@@ -11,13 +16,14 @@ from respy.python.shared.shared_auxiliary import calculate_rewards_common
 from respy.python.shared.shared_auxiliary import calculate_rewards_general
 from respy.python.shared.shared_auxiliary import create_covariates
 from respy.python.shared.shared_auxiliary import get_continuation_value
-from respy.python.shared.shared_auxiliary import get_emaxs_of_subsequent_period
 from respy.python.shared.shared_auxiliary import ols
 from respy.python.shared.shared_auxiliary import transform_disturbances
 from respy.python.shared.shared_constants import HUGE_FLOAT
 from respy.python.shared.shared_constants import MISSING_FLOAT
 from respy.python.shared.shared_constants import MISSING_INT
 from respy.python.solve.solve_risk import construct_emax_risk
+from respy.python.solve.solve_risk import construct_emax_risk_batch
+from respy.python.solve.solve_risk import construct_emax_risk_moments
 
 
 @njit
@@ -77,17 +83,57 @@ def pyth_create_state_space(num_periods, num_types, edu_starts, edu_max):
     (40, 40, 40, 21, 4, 1)
 
     """
-    data = []
+    states = create_states(num_periods, num_types, edu_starts, edu_max)
 
     shape = (num_periods, num_periods, num_periods, edu_max + 1, 4, num_types)
     indexer = np.full(shape, -1, dtype=np.int32)
 
-    # Initialize counter
-    i = 0
+    # Collect mapping of state space to array index.
+    for i in range(states.shape[0]):
+        period, exp_a, exp_b, edu, choice_lagged, type_ = states[i]
+        indexer[period, exp_a, exp_b, edu, choice_lagged - 1, type_] = i
+
+    return states, indexer
+
+
+@njit
+def create_states(num_periods, num_types, edu_starts, edu_max):
+    """Create the admissible states of the state space.
+
+    This function contains the restrictions of the state space and is shared by all
+    implementations of the indexer. Duplicate states, which arise from multiple initial
+    levels of education, are detected with an array which only covers a single period.
+    Thus, the dense indexer is never allocated here.
+
+    Parameters
+    ----------
+    num_periods : int
+        Number of periods in the state space.
+    num_types : int
+        Number of types of agents.
+    edu_starts : List[int]
+        Contains levels of initial education.
+    edu_max : int
+        Maximum level of education which can be obtained by an agent.
+
+    Returns
+    -------
+    states : np.ndarray
+        Array with shape (num_states, 6) containing period, experience in OCCUPATION A,
+        experience in OCCUPATION B, years of schooling, the lagged choice and the type
+        of the agent.
+
+    """
+    data = []
 
     # Construct state space by periods
     for period in range(num_periods):
 
+        # Indicator for states which already exist in this period.
+        is_existing = np.zeros(
+            (period + 1, period + 1, edu_max + 1, 4, num_types), dtype=np.bool_
+        )
+
         # Loop over all unobserved types
         for type_ in range(num_types):
 
@@ -172,30 +218,22 @@ def pyth_create_state_space(num_periods, num_types, edu_starts, edu_max):
 
                                 # Continue if state still exist. This condition is only
                                 # triggered by multiple initial levels of education.
-                                if (
-                                    indexer[
-                                        period,
-                                        exp_a,
-                                        exp_b,
-                                        edu_start + edu_add,
-                                        choice_lagged - 1,
-                                        type_,
-                                    ]
-                                    != -1
-                                ):
+                                if is_existing[
+                                    exp_a,
+                                    exp_b,
+                                    edu_start + edu_add,
+                                    choice_lagged - 1,
+                                    type_,
+                                ]:
                                     continue
 
-                                # Collect mapping of state space to array index.
-                                indexer[
-                                    period,
+                                is_existing[
                                     exp_a,
                                     exp_b,
                                     edu_start + edu_add,
                                     choice_lagged - 1,
                                     type_,
-                                ] = i
-
-                                i += 1
+                                ] = True
 
                                 # Store information in a dictionary and append to data.
                                 row = (
@@ -210,7 +248,70 @@ def pyth_create_state_space(num_periods, num_types, edu_starts, edu_max):
 
     states = np.array(data)
 
-    return states, indexer
+    return states
+
+
+def create_child_indices(states, indexer, num_periods, edu_max):
+    """Create the indices of the states which follow each state.
+
+    The indices of the subsequent states never change once the state space is created.
+    Thus, they are looked up once so that the backward induction only needs a single
+    gather per period instead of traversing ``indexer`` for every state and evaluation.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        Array with shape (num_states, 6) containing period, experience in OCCUPATION A,
+        experience in OCCUPATION B, years of schooling, the lagged choice and the type
+        of the agent.
+    indexer : np.ndarray
+        Array with shape (num_periods, num_periods, num_periods, edu_max + 1, 4,
+        num_types).
+    num_periods : int
+        Number of periods.
+    edu_max : int
+        Maximum level of education which can be obtained by an agent.
+
+    Returns
+    -------
+    child_indices : np.ndarray
+        Array with shape (num_states, 4) containing the index of the state following
+        OCCUPATION A, OCCUPATION B, SCHOOLING and HOME. States in the last period and
+        SCHOOLING for states with maximum education have no child which is indicated by
+        -1.
+
+    Example
+    -------
+    >>> states, indexer = pyth_create_state_space(3, 1, [10], 11)
+    >>> create_child_indices(states, indexer, 3, 11)[:2]
+    array([[5, 4, 3, 2],
+           [5, 4, 3, 2]], dtype=int32)
+
+    """
+    child_indices = np.full((states.shape[0], 4), -1, dtype=np.int32)
+
+    # States are sorted by periods, so all states with children are at the top.
+    is_not_last_period = states[:, 0] < num_periods - 1
+    period, exp_a, exp_b, edu, _, type_ = states[is_not_last_period].T
+    period = period + 1
+
+    child_indices[is_not_last_period, 0] = indexer[
+        period, exp_a + 1, exp_b, edu, 0, type_
+    ]
+    child_indices[is_not_last_period, 1] = indexer[
+        period, exp_a, exp_b + 1, edu, 1, type_
+    ]
+    child_indices[is_not_last_period, 3] = indexer[period, exp_a, exp_b, edu, 3, type_]
+
+    # Adding an additional year of schooling is only possible for states which have not
+    # reached the maximum level of education.
+    idx = np.where(is_not_last_period)[0]
+    is_edu = edu < edu_max
+    child_indices[idx[is_edu], 2] = indexer[
+        period[is_edu], exp_a[is_edu], exp_b[is_edu], edu[is_edu] + 1, 2, type_[is_edu]
+    ]
+
+    return child_indices
 
 
 def pyth_calculate_rewards_systematic(states, covariates, optim_paras):
@@ -245,19 +346,10 @@ def pyth_calculate_rewards_systematic(states, covariates, optim_paras):
     rewards = np.full((states.shape[0], 4), np.nan)
 
     rewards[:, :2] = wages + rewards_general
-
-    # Calculate systematic part of SCHOOL rewards
-    covariates_education = np.column_stack(
-        (np.ones(states.shape[0]), covariates[:, 9:13], states[:, 0], covariates[:, 13])
+    rewards[:, 2:] = calculate_rewards_edu_and_home(
+        states, covariates, optim_paras["coeffs_edu"], optim_paras["coeffs_home"]
     )
 
-    rewards[:, 2] = covariates_education.dot(optim_paras["coeffs_edu"])
-
-    # Calculate systematic part of HOME
-    covariates_home = np.column_stack((np.ones(states.shape[0]), covariates[:, 14:]))
-
-    rewards[:, 3] = covariates_home.dot(optim_paras["coeffs_home"])
-
     # Add the type-specific deviation for SCHOOL and HOME.
     type_dummies = get_dummies(states[:, 5])
     type_deviations = type_dummies.dot(optim_paras["type_shifts"][:, 2:])
@@ -270,6 +362,208 @@ def pyth_calculate_rewards_systematic(states, covariates, optim_paras):
     return rewards_systematic, rewards_general, rewards_common, wages
 
 
+@njit(nogil=True)
+def calculate_rewards_systematic_by_type(
+    states_core,
+    covariates_core,
+    bounds_core,
+    coeffs_a,
+    coeffs_b,
+    coeffs_edu,
+    coeffs_home,
+    coeffs_common,
+    type_shifts,
+    is_restud,
+    is_update,
+    out,
+):
+    """Calculate systematic rewards of all states in place.
+
+    Types only enter the systematic rewards as shifts. Thus, the type-invariant part of
+    the rewards is computed once for each state of the first type and the shifts of all
+    types are added afterwards. The kernel writes directly into ``out`` and does not
+    allocate temporary arrays. The results match
+    :func:`pyth_calculate_rewards_systematic` up to floating point rounding.
+
+    Components which are not flagged in ``is_update`` are read from ``out``. Thus, if
+    only a subset of parameters changed, e.g. when computing finite differences, only
+    the affected columns are recomputed.
+
+    Parameters
+    ----------
+    states_core : np.ndarray
+        Array with shape (num_states_core, 6) containing the states of the first type.
+    covariates_core : np.ndarray
+        Array with shape (num_states_core, 16) containing the covariates of the core.
+    bounds_core : np.ndarray
+        Array with shape (num_periods, 2) containing the start and stop index of the
+        core states in each period.
+    coeffs_a : np.ndarray
+        Array with shape (15,) containing coefficients of OCCUPATION A.
+    coeffs_b : np.ndarray
+        Array with shape (15,) containing coefficients of OCCUPATION B.
+    coeffs_edu : np.ndarray
+        Array with shape (7,) containing coefficients of SCHOOL.
+    coeffs_home : np.ndarray
+        Array with shape (3,) containing coefficients of HOME.
+    coeffs_common : np.ndarray
+        Array with shape (2,) containing coefficients for high school and college
+        graduates.
+    type_shifts : np.ndarray
+        Array with shape (num_types, 4) containing type-specific deviations.
+    is_restud : bool
+        Indicator for whether the squared experiences are not rescaled like in RESFORT.
+    is_update : np.ndarray
+        Boolean array with shape (7,) indicating whether the wages of OCCUPATION A and
+        B, the general rewards of OCCUPATION A and B, the common rewards, the rewards of
+        SCHOOL and HOME have to be recomputed.
+    out : np.ndarray
+        Array with shape (num_states, 9) which is filled with systematic, general and
+        common rewards as well as wages ordered like ``StateSpace.states``.
+
+    Example
+    -------
+    >>> state_space = StateSpace(3, 2, [10], 11)
+    >>> optim_paras = {
+    ...     "coeffs_a": np.full(15, 0.01), "coeffs_b": np.full(15, 0.02),
+    ...     "coeffs_edu": np.full(7, 0.1), "coeffs_home": np.ones(3),
+    ...     "coeffs_common": np.ones(2), "type_shifts": np.arange(8.).reshape(2, 4),
+    ... }
+    >>> state_space.update_systematic_rewards(optim_paras)
+    >>> expected = np.column_stack(pyth_calculate_rewards_systematic(
+    ...     state_space.states, state_space.covariates, optim_paras
+    ... ))
+    >>> np.allclose(state_space.rewards, expected)
+    True
+
+    """
+    num_types = type_shifts.shape[0]
+    scale = 1.0 if is_restud else 100.0
+
+    is_wage_a, is_wage_b, is_general_a, is_general_b = is_update[:4]
+    is_common, is_edu, is_home = is_update[4:]
+    is_a = is_wage_a or is_general_a or is_common
+    is_b = is_wage_b or is_general_b or is_common
+
+    for period in range(bounds_core.shape[0]):
+        start, stop = bounds_core[period, 0], bounds_core[period, 1]
+        num_states_period = stop - start
+
+        for i in range(start, stop):
+            exp_a = states_core[i, 1]
+            exp_b = states_core[i, 2]
+            edu = states_core[i, 3]
+            cov = covariates_core[i]
+
+            if is_wage_a:
+                wage_a = _calculate_wage_systematic(
+                    coeffs_a, period, exp_a, exp_b, edu, cov, cov[7], cov[2], scale
+                )
+            if is_wage_b:
+                wage_b = _calculate_wage_systematic(
+                    coeffs_b, period, exp_a, exp_b, edu, cov, cov[8], cov[3], scale
+                )
+
+            general_a = coeffs_a[12] + coeffs_a[13] * cov[0] + coeffs_a[14] * cov[5]
+            general_b = coeffs_b[12] + coeffs_b[13] * cov[1] + coeffs_b[14] * cov[6]
+            common = coeffs_common[0] * cov[9] + coeffs_common[1] * cov[10]
+
+            if is_edu:
+                reward_edu = (
+                    coeffs_edu[0]
+                    + coeffs_edu[1] * cov[9]
+                    + coeffs_edu[2] * cov[10]
+                    + coeffs_edu[3] * cov[11]
+                    + coeffs_edu[4] * cov[12]
+                    + coeffs_edu[5] * period
+                    + coeffs_edu[6] * cov[13]
+                )
+            if is_home:
+                reward_home = (
+                    coeffs_home[0] + coeffs_home[1] * cov[14] + coeffs_home[2] * cov[15]
+                )
+
+            for type_ in range(num_types):
+                k = num_types * start + type_ * num_states_period + i - start
+
+                if is_wage_a:
+                    out[k, 7] = wage_a * np.exp(type_shifts[type_, 0])
+                if is_wage_b:
+                    out[k, 8] = wage_b * np.exp(type_shifts[type_, 1])
+                if is_a:
+                    out[k, 0] = out[k, 7] + general_a + common
+                    out[k, 4] = general_a
+                if is_b:
+                    out[k, 1] = out[k, 8] + general_b + common
+                    out[k, 5] = general_b
+                if is_edu:
+                    out[k, 2] = reward_edu + type_shifts[type_, 2] + common
+                if is_home:
+                    out[k, 3] = reward_home + type_shifts[type_, 3] + common
+                if is_common:
+                    out[k, 6] = common
+
+
+@njit(nogil=True)
+def _calculate_wage_systematic(
+    coeffs, period, exp_a, exp_b, edu, cov, any_exp, work_lagged, scale
+):
+    """Calculate the systematic wage of an occupation for a single state."""
+    wage = np.exp(
+        coeffs[0]
+        + coeffs[1] * edu
+        + coeffs[2] * exp_a
+        + coeffs[3] * exp_a ** 2 / scale
+        + coeffs[4] * exp_b
+        + coeffs[5] * exp_b ** 2 / scale
+        + coeffs[6] * cov[9]
+        + coeffs[7] * cov[10]
+        + coeffs[8] * period
+        + coeffs[9] * cov[13]
+        + coeffs[10] * any_exp
+        + coeffs[11] * work_lagged
+    )
+
+    return min(max(wage, 0.0), HUGE_FLOAT)
+
+
+def calculate_rewards_edu_and_home(states, covariates, coeffs_edu, coeffs_home):
+    """Calculate systematic rewards of SCHOOL and HOME without type deviations.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        Array with shape (num_states, 6).
+    covariates : np.ndarray
+        Array with shape (num_states, 16).
+    coeffs_edu : np.ndarray
+        Array with shape (7,) containing coefficients of SCHOOL.
+    coeffs_home : np.ndarray
+        Array with shape (3,) containing coefficients of HOME.
+
+    Returns
+    -------
+    rewards : np.ndarray
+        Array with shape (num_states, 2).
+
+    """
+    rewards = np.full((states.shape[0], 2), np.nan)
+
+    # Calculate systematic part of SCHOOL rewards
+    covariates_education = np.column_stack(
+        (np.ones(states.shape[0]), covariates[:, 9:13], states[:, 0], covariates[:, 13])
+    )
+
+    rewards[:, 0] = covariates_education.dot(coeffs_edu)
+
+    # Calculate systematic part of HOME
+    covariates_home = np.column_stack((np.ones(states.shape[0]), covariates[:, 14:]))
+
+    rewards[:, 1] = covariates_home.dot(coeffs_home)
+
+    return rewards
+
+
 def pyth_backward_induction(
     periods_draws_emax,
     state_space,
@@ -279,6 +573,10 @@ def pyth_backward_induction(
     optim_paras,
     file_sim,
     is_write,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    random_state=None,
 ):
     """ Calculate utilities with backward induction.
 
@@ -301,6 +599,19 @@ def pyth_backward_induction(
         Undocumented parameter.
     is_write : bool
         Undocumented parameter.
+    weights_emax : np.ndarray, optional
+        Array with shape (num_draws,) containing the weights of the draws, e.g. the
+        weights of a quadrature rule. By default, all draws have the same weight.
+    is_control_variate : bool, default False
+        Indicator for whether the wage shocks are used as control variates, see
+        :func:`get_control_variate_weights`.
+    tolerance_emax : float, optional
+        Tolerance for the standard error of the simulated emax. If given, the number of
+        draws in each period is increased until the tolerance is reached, see
+        :func:`get_adaptive_emax`. Then, the draws have the same weight.
+    random_state : np.random.RandomState, optional
+        Random number generator which draws the interpolation points. By default, the
+        global random number generator is used.
 
     Returns
     -------
@@ -310,12 +621,102 @@ def pyth_backward_induction(
         in ``state_space.emaxs``.
 
     """
-    state_space.emaxs = np.zeros((state_space.num_states, 5))
+    # Reuse an existing buffer which might be shared with other processes.
+    emaxs = getattr(state_space, "emaxs", None)
+    if emaxs is None or emaxs.shape != (state_space.num_states, 5):
+        state_space.emaxs = np.zeros((state_space.num_states, 5))
+    else:
+        emaxs[:] = 0
+
+    for period, emaxs_period in pyth_backward_induction_by_period(
+        periods_draws_emax,
+        state_space,
+        is_debug,
+        is_interpolated,
+        num_points_interp,
+        optim_paras,
+        file_sim,
+        is_write,
+        weights_emax,
+        is_control_variate,
+        tolerance_emax,
+        random_state,
+    ):
+        state_space.get_attribute_from_period("emaxs", period)[:] = emaxs_period
 
+    return state_space
+
+
+def pyth_backward_induction_by_period(
+    periods_draws_emax,
+    state_space,
+    is_debug,
+    is_interpolated,
+    num_points_interp,
+    optim_paras,
+    file_sim,
+    is_write,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    random_state=None,
+):
+    """Calculate utilities with backward induction and yield the results per period.
+
+    In contrast to :func:`pyth_backward_induction`, the emaxs are not stored in the
+    state space. Only the maximum emax of the subsequent period is kept to compute the
+    current period. Thus, callers which consume each period immediately, e.g. the
+    streaming evaluation of the likelihood, only hold two periods of emaxs in memory.
+
+    Parameters
+    ----------
+    periods_draws_emax : np.ndarray
+        Array with shape (num_periods, num_draws, num_choices) containing the
+        random draws used to simulate the emax.
+    state_space : class
+        State space object.
+    is_debug : bool
+        Flag for debug modus.
+    is_interpolated : np.array
+        Flag indicating whether interpolation is used to construct the emax in a period.
+    num_points_interp : int
+        Number of states for which the emax will be interpolated.
+    optim_paras : dict
+        Parameters affected by optimization.
+    file_sim : ???
+        Undocumented parameter.
+    is_write : bool
+        Undocumented parameter.
+    weights_emax : np.ndarray, optional
+        Array with shape (num_draws,) containing the weights of the draws, e.g. the
+        weights of a quadrature rule. By default, all draws have the same weight.
+    is_control_variate : bool, default False
+        Indicator for whether the wage shocks are used as control variates, see
+        :func:`get_control_variate_weights`.
+    tolerance_emax : float, optional
+        Tolerance for the standard error of the simulated emax. If given, the number of
+        draws in each period is increased until the tolerance is reached, see
+        :func:`get_adaptive_emax`. Then, the draws have the same weight.
+    random_state : np.random.RandomState, optional
+        Random number generator which draws the interpolation points. By default, the
+        global random number generator is used.
+
+    Yields
+    ------
+    period : int
+        Periods in reversed order.
+    emaxs_period : np.ndarray
+        Array with shape (num_states_in_period, 5) containing the emax of the subsequent
+        period of each choice, columns 0-3, as well as the maximum emax of the current
+        period for each state, column 4.
+
+    """
     # For myopic agents, utility of later periods does not play a role.
     if optim_paras["delta"] == 0:
         record_solution_progress(-2, file_sim)
-        return state_space
+        for period in reversed(range(state_space.num_periods)):
+            yield period, np.zeros((state_space.states_per_period[period], 5))
+        return
 
     # Unpack arguments.
     delta = optim_paras["delta"]
@@ -323,28 +724,38 @@ def pyth_backward_induction(
 
     shocks_cov = shocks_cholesky.dot(shocks_cholesky.T)
 
+    if weights_emax is None:
+        num_draws = periods_draws_emax.shape[1]
+        weights_emax = np.full(num_draws, 1 / num_draws)
+
     # These shifts are used to determine the expected values of the two labor market
     # alternatives. These are log normal distributed and thus the draws cannot simply
     # set to zero.
     shifts = np.zeros(4)
     shifts[:2] = np.clip(np.exp(np.diag(shocks_cov)[:2] / 2.0), 0.0, HUGE_FLOAT)
 
+    # The maximum emax of the states in the subsequent period.
+    emax_next = None
+
     for period in reversed(range(state_space.num_periods)):
+        num_states = state_space.states_per_period[period]
+        emaxs_period = np.zeros((num_states, 5))
 
         if period == state_space.num_periods - 1:
             pass
 
         else:
-            states_period = state_space.get_attribute_from_period("states", period)
-
-            state_space.emaxs = get_emaxs_of_subsequent_period(
-                states_period,
-                state_space.indexer,
-                state_space.emaxs,
-                state_space.edu_max,
+            # Look up the maximum emax of each child state. Children which cannot be
+            # reached, i.e. SCHOOLING at maximum education, are marked with -1. The
+            # indices are shifted as only the emaxs of the subsequent period are kept.
+            child_indices = state_space.get_attribute_from_period(
+                "child_indices", period
             )
-
-        num_states = state_space.states_per_period[period]
+            offset = state_space.slices_by_periods[period + 1].start
+            has_child = child_indices != -1
+            emaxs_period[:, :4][has_child] = emax_next[
+                child_indices[has_child] - offset
+            ]
 
         # Treatment of the disturbances for the risk-only case is straightforward. Their
         # distribution is fixed once and for all.
@@ -353,6 +764,13 @@ def pyth_backward_induction(
             draws_emax_standard, np.zeros(4), shocks_cholesky
         )
 
+        if is_control_variate:
+            weights_period = get_control_variate_weights(
+                draws_emax_risk, weights_emax, shifts
+            )
+        else:
+            weights_period = weights_emax
+
         if is_write:
             record_solution_progress(4, file_sim, period, num_states)
 
@@ -363,7 +781,7 @@ def pyth_backward_induction(
 
         # Unpack necessary attributes of the specific period.
         rewards_period = state_space.get_attribute_from_period("rewards", period)
-        emaxs_period = state_space.get_attribute_from_period("emaxs", period)[:, :4]
+        emaxs_subsequent = emaxs_period[:, :4]
         max_education = (
             state_space.get_attribute_from_period("states", period)[:, 3]
             >= state_space.edu_max
@@ -372,49 +790,372 @@ def pyth_backward_induction(
         if any_interpolated:
             # Get indicator for interpolation and simulation of states
             is_simulated = get_simulated_indicator(
-                num_points_interp, num_states, period, is_debug
+                num_points_interp, num_states, period, is_debug, random_state
             )
 
             # Constructing the exogenous variable for all states, including the ones
             # where simulation will take place. All information will be used in either
             # the construction of the prediction model or the prediction step.
             exogenous, max_emax = get_exogenous_variables(
-                rewards_period, emaxs_period, shifts, delta, max_education
+                rewards_period, emaxs_subsequent, shifts, delta, max_education
             )
 
             # Constructing the dependent variables for all states at the random subset
             # of points where the EMAX is actually calculated.
-            endogenous = get_endogenous_variable(
-                rewards_period,
-                emaxs_period,
-                max_emax,
-                is_simulated,
-                draws_emax_risk,
-                delta,
-                max_education,
-            )
+            if tolerance_emax is None:
+                endogenous = get_endogenous_variable(
+                    rewards_period,
+                    emaxs_subsequent,
+                    max_emax,
+                    is_simulated,
+                    draws_emax_risk,
+                    weights_period,
+                    delta,
+                    max_education,
+                )
+            else:
+                emax_simulated, num_draws_period = get_adaptive_emax(
+                    rewards_period[is_simulated, -2:],
+                    rewards_period[is_simulated, :4],
+                    emaxs_subsequent[is_simulated],
+                    draws_emax_risk,
+                    delta,
+                    max_education[is_simulated],
+                    tolerance_emax,
+                )
+                endogenous = np.full(num_states, np.nan)
+                endogenous[is_simulated] = emax_simulated - max_emax[is_simulated]
 
             # Create prediction model based on the random subset of points where the
             # EMAX is actually simulated and thus dependent and independent variables
             # are available. For the interpolation points, the actual values are used.
             emax = get_predictions(endogenous, exogenous, max_emax, is_simulated)
 
-        else:
+        elif tolerance_emax is None:
             emax = construct_emax_risk(
                 rewards_period[:, -2:],
                 rewards_period[:, :4],
-                emaxs_period,
+                emaxs_subsequent,
                 draws_emax_risk,
+                weights_period,
                 delta,
                 max_education,
             )
 
-        state_space.get_attribute_from_period("emaxs", period)[:, 4] = emax
+        else:
+            emax, num_draws_period = get_adaptive_emax(
+                rewards_period[:, -2:],
+                rewards_period[:, :4],
+                emaxs_subsequent,
+                draws_emax_risk,
+                delta,
+                max_education,
+                tolerance_emax,
+            )
+
+        if is_write and tolerance_emax is not None:
+            record_solution_progress(5, file_sim, period, num_draws=num_draws_period)
+
+        emaxs_period[:, 4] = emax
+        emax_next = emax
+
+        yield period, emaxs_period
 
-    return state_space
 
+def pyth_backward_induction_batch(
+    periods_draws_emax,
+    state_space,
+    is_debug,
+    is_interpolated,
+    num_points_interp,
+    rewards,
+    deltas,
+    shocks_choleskys,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    random_state=None,
+):
+    """Calculate utilities with backward induction for multiple sets of parameters.
+
+    The function solves the model for ``k`` sets of parameters, e.g. for the evaluations
+    of a numerical gradient, while traversing the state space once. In each period, the
+    indices of child states are looked up once for all sets of parameters and each draw
+    is loaded once by :func:`~respy.python.solve.solve_risk.construct_emax_risk_batch`.
+
+    If interpolation is used, the states at which the emax is simulated are the same for
+    all sets of parameters in a period. Control variates and the adaptive number of
+    draws are not supported because they require different weights or numbers of draws
+    for each set of parameters.
+
+    Parameters
+    ----------
+    periods_draws_emax : np.ndarray
+        Array with shape (num_periods, num_draws, num_choices) containing the
+        random draws used to simulate the emax.
+    state_space : class
+        State space object.
+    is_debug : bool
+        Flag for debug modus.
+    is_interpolated : np.array
+        Flag indicating whether interpolation is used to construct the emax in a period.
+    num_points_interp : int
+        Number of states for which the emax will be interpolated.
+    rewards : np.ndarray
+        Array with shape (k, num_states, 9) containing the systematic rewards of each
+        set of parameters, see ``state_space.rewards``.
+    deltas : np.ndarray
+        Array with shape (k,) containing the discount factors.
+    shocks_choleskys : np.ndarray
+        Array with shape (k, 4, 4) containing the Cholesky factors of the shock
+        covariance matrices.
+    weights_emax : np.ndarray, optional
+        Array with shape (num_draws,) containing the weights of the draws. By default,
+        all draws have the same weight.
+    is_control_variate : bool, default False
+        Indicator for whether the wage shocks are used as control variates. Only False
+        is supported.
+    tolerance_emax : float, optional
+        Tolerance for the standard error of the simulated emax. Only None is supported.
+    random_state : np.random.RandomState, optional
+        Random number generator which draws the interpolation points. By default, the
+        global random number generator is used.
+
+    Returns
+    -------
+    emaxs : np.ndarray
+        Array with shape (k, num_states, 5) containing the emax of the subsequent period
+        of each choice, columns 0-3, as well as the maximum emax of the current period
+        for each state, column 4, for each set of parameters.
+
+    """
+    if is_control_variate:
+        raise ValueError("Control variates are not supported for multiple parameters.")
+    if tolerance_emax is not None:
+        raise ValueError(
+            "The adaptive number of draws is not supported for multiple parameters."
+        )
 
-def get_simulated_indicator(num_points_interp, num_states, period, is_debug):
+    rewards = np.asarray(rewards, dtype=float)
+    deltas = np.asarray(deltas, dtype=float)
+    shocks_choleskys = np.asarray(shocks_choleskys, dtype=float)
+    num_sets = deltas.shape[0]
+
+    if weights_emax is None:
+        num_draws = periods_draws_emax.shape[1]
+        weights_emax = np.full(num_draws, 1 / num_draws)
+
+    emaxs = np.zeros((num_sets, state_space.num_states, 5))
+
+    # These shifts are used to determine the expected values of the two labor market
+    # alternatives.
+    shocks_covs = np.einsum("kij,klj->kil", shocks_choleskys, shocks_choleskys)
+    shifts = np.zeros((num_sets, 4))
+    shifts[:, :2] = np.clip(
+        np.exp(np.diagonal(shocks_covs, axis1=1, axis2=2)[:, :2] / 2.0), 0.0, HUGE_FLOAT
+    )
+
+    # The maximum emaxs of the states in the subsequent period.
+    emax_next = None
+
+    for period in reversed(range(state_space.num_periods)):
+        slice_ = state_space.slices_by_periods[period]
+        num_states = state_space.states_per_period[period]
+
+        # The emaxs of the subsequent period are arranged with shape (num_states, 4, k),
+        # so that the emaxs of a child state are contiguous for all sets of parameters.
+        emaxs_subsequent = np.zeros((num_states, 4, num_sets))
+        if period < state_space.num_periods - 1:
+            child_indices = state_space.get_attribute_from_period(
+                "child_indices", period
+            )
+            offset = state_space.slices_by_periods[period + 1].start
+            has_child = child_indices != -1
+            emaxs_subsequent[has_child] = emax_next[child_indices[has_child] - offset]
+
+        # Arrange the rewards and emaxs with shape (num_states, k, ...).
+        rewards_period = rewards[:, slice_].transpose(1, 0, 2)
+        emaxs_subsequent = emaxs_subsequent.transpose(0, 2, 1)
+        max_education = (
+            state_space.get_attribute_from_period("states", period)[:, 3]
+            >= state_space.edu_max
+        )
+
+        any_interpolated = (num_points_interp <= num_states) and is_interpolated
+
+        if any_interpolated:
+            is_simulated = get_simulated_indicator(
+                num_points_interp, num_states, period, is_debug, random_state
+            )
+
+            emax = np.empty((num_states, num_sets))
+            for k in range(num_sets):
+                draws_emax_risk = transform_disturbances(
+                    periods_draws_emax[period], np.zeros(4), shocks_choleskys[k]
+                )
+                exogenous, max_emax = get_exogenous_variables(
+                    rewards_period[:, k],
+                    emaxs_subsequent[:, k],
+                    shifts[k],
+                    deltas[k],
+                    max_education,
+                )
+                endogenous = get_endogenous_variable(
+                    rewards_period[:, k],
+                    emaxs_subsequent[:, k],
+                    max_emax,
+                    is_simulated,
+                    draws_emax_risk,
+                    weights_emax,
+                    deltas[k],
+                    max_education,
+                )
+                emax[:, k] = get_predictions(
+                    endogenous, exogenous, max_emax, is_simulated
+                )
+
+        else:
+            emax = construct_emax_risk_batch(
+                rewards_period[:, :, -2:],
+                rewards_period[:, :, :4],
+                emaxs_subsequent,
+                periods_draws_emax[period],
+                weights_emax,
+                shocks_choleskys,
+                deltas,
+                max_education,
+            )
+
+        emaxs[:, slice_, :4] = emaxs_subsequent.transpose(1, 0, 2)
+        emaxs[:, slice_, 4] = emax.T
+        emax_next = emax
+
+    # For myopic agents, utility of later periods does not play a role.
+    emaxs[deltas == 0] = 0
+
+    return emaxs
+
+
+def get_adaptive_emax(
+    wages,
+    rewards_systematic,
+    emaxs,
+    draws,
+    delta,
+    max_education,
+    tolerance,
+    num_draws_start=50,
+):
+    """Simulate the emax with as many draws as needed to reach the tolerance.
+
+    The number of draws starts at ``num_draws_start`` and is doubled until the standard
+    error of the simulated emax of every state is below the tolerance or all draws are
+    used. The maximum utilities of previous draws are not evaluated again.
+
+    Parameters
+    ----------
+    wages : np.ndarray
+        Array with shape (num_states_in_period, 2) containing wages.
+    rewards_systematic : np.ndarray
+        Array with shape (num_states_in_period, 4) containing systematic rewards.
+    emaxs : np.ndarray
+        Array with shape (num_states_in_period, 4) containing expected maximum utility
+        for each choice in the subsequent period.
+    draws : np.ndarray
+        Array with shape (num_draws, 4) containing the transformed draws. The number of
+        draws is the maximum number of draws.
+    delta : float
+        The discount factor.
+    max_education: np.ndarray
+        Array with shape (num_states_in_period,) containing an indicator for whether the
+        state has reached maximum education.
+    tolerance : float
+        Tolerance for the standard error of the simulated emax.
+    num_draws_start : int, default 50
+        Number of draws in the first batch.
+
+    Returns
+    -------
+    emax : np.ndarray
+        Array with shape (num_states_in_period,) containing the simulated emax.
+    num_draws : int
+        Number of draws which were used.
+
+    """
+    num_draws_max = draws.shape[0]
+
+    sum_emax = np.zeros(wages.shape[0])
+    sum_squared_emax = np.zeros(wages.shape[0])
+
+    lower, upper = 0, min(num_draws_start, num_draws_max)
+    while True:
+        sum_emax_batch, sum_squared_emax_batch = construct_emax_risk_moments(
+            wages,
+            rewards_systematic,
+            emaxs,
+            draws[lower:upper],
+            delta,
+            max_education,
+        )
+        sum_emax += sum_emax_batch
+        sum_squared_emax += sum_squared_emax_batch
+
+        emax = sum_emax / upper
+
+        if upper == num_draws_max:
+            break
+        elif upper > 1:
+            variance = np.clip(sum_squared_emax / upper - emax ** 2, 0, None)
+            std_error = np.sqrt(variance / (upper - 1))
+            if np.all(std_error <= tolerance):
+                break
+
+        lower, upper = upper, min(2 * upper, num_draws_max)
+
+    return emax, upper
+
+
+def get_control_variate_weights(draws_emax_risk, weights, shifts):
+    """Adjust the weights of the draws to use the wage shocks as control variates.
+
+    The expected values of the log-normal wage shocks are known analytically, see
+    ``shifts``. The control variate estimator of the emax corrects the simulated emax by
+    the deviation of the simulated means of the wage shocks from their expected values
+    times the coefficients of a regression of the maximum utility on the wage shocks.
+    As the regression is weighted by the draws, the correction is equivalent to new
+    weights for the draws which are the same for all states.
+
+    Parameters
+    ----------
+    draws_emax_risk : np.ndarray
+        Array with shape (num_draws, 4) containing the transformed draws.
+    weights : np.ndarray
+        Array with shape (num_draws,) containing the weights of the draws.
+    shifts : np.ndarray
+        Array with shape (4,) containing the expected values of the shocks of the two
+        labor market alternatives in the first two elements.
+
+    Returns
+    -------
+    weights : np.ndarray
+        Array with shape (num_draws,) containing the adjusted weights which still sum up
+        to one. Some weights might be negative.
+
+    """
+    controls = draws_emax_risk[:, :2]
+    controls_mean = weights.dot(controls)
+    deviations = controls - controls_mean
+    controls_cov = (deviations * weights.reshape(-1, 1)).T.dot(deviations)
+
+    # The pseudo-inverse handles degenerate shocks without variance.
+    coeffs = np.linalg.pinv(controls_cov).dot(controls_mean - shifts[:2])
+
+    return weights * (1 - deviations.dot(coeffs))
+
+
+def get_simulated_indicator(
+    num_points_interp, num_states, period, is_debug, random_state=None
+):
     """Get the indicator for points of interpolation and simulation.
 
     Parameters
@@ -427,6 +1168,9 @@ def get_simulated_indicator(num_points_interp, num_states, period, is_debug):
         Number of period.
     is_debug : bool
         Flag for debugging. If true, interpolation points are taken from file.
+    random_state : np.random.RandomState, optional
+        Random number generator which draws the interpolation points. By default, the
+        global random number generator is used.
 
     Returns
     -------
@@ -434,8 +1178,11 @@ def get_simulated_indicator(num_points_interp, num_states, period, is_debug):
         Array of shape (num_states,) indicating states which will be interpolated.
 
     """
+    if random_state is None:
+        random_state = np.random
+
     # Drawing random interpolation points
-    interpolation_points = np.random.choice(
+    interpolation_points = random_state.choice(
         num_states, size=num_points_interp, replace=False
     )
 
@@ -502,7 +1249,14 @@ def get_exogenous_variables(rewards, emaxs, draws, delta, max_education):
 
 
 def get_endogenous_variable(
-    rewards, emaxs, max_emax, is_simulated, draws_emax_risk, delta, max_education
+    rewards,
+    emaxs,
+    max_emax,
+    is_simulated,
+    draws_emax_risk,
+    weights_emax,
+    delta,
+    max_education,
 ):
     """Construct endogenous variable for the subset of interpolation points.
 
@@ -519,19 +1273,34 @@ def get_endogenous_variable(
         emaxs.
     draws_emax_risk : np.ndarray
         Array with shape (num_draws, 4) containing draws.
+    weights_emax : np.ndarray
+        Array with shape (num_draws,) containing the weights of the draws.
     delta : float
         Discount factor.
     max_education: np.ndarray
         Array with shape (num_states_in_period,) containing an indicator for whether the
         state has reached maximum education.
 
-    """
+    Returns
+    -------
+    endogenous : np.ndarray
+        Array with shape (num_states_in_period,) containing the difference of the
+        simulated emax and ``max_emax`` for the interpolation points and NaN otherwise.
 
+    """
+    # The Monte Carlo integration is only performed at the interpolation points.
     emax = construct_emax_risk(
-        rewards[:, -2:], rewards[:, :4], emaxs, draws_emax_risk, delta, max_education
+        rewards[is_simulated, -2:],
+        rewards[is_simulated, :4],
+        emaxs[is_simulated],
+        draws_emax_risk,
+        weights_emax,
+        delta,
+        max_education[is_simulated],
     )
-    endogenous = emax - max_emax
-    endogenous[~is_simulated] = np.nan
+
+    endogenous = np.full(is_simulated.shape[0], np.nan)
+    endogenous[is_simulated] = emax - max_emax[is_simulated]
 
     return endogenous
 
@@ -697,6 +1466,296 @@ def get_dummies(a):
     return np.eye(n_values)[a]
 
 
+@njit(nogil=True)
+def get_index_from_compact_indexer(
+    compact_indexer, period, exp_a, exp_b, edu, choice_lagged, type_
+):
+    """Get the index of a state from the arrays of a :class:`CompactIndexer`.
+
+    This function is the counterpart of ``indexer[period, exp_a, exp_b, edu,
+    choice_lagged, type_]`` for Numba kernels. Note that ``choice_lagged`` is the index
+    of the lagged choice starting from zero.
+
+    Parameters
+    ----------
+    compact_indexer : tuple
+        Tuple of ``keys``, ``indices``, ``period_offsets`` and ``strides`` which is
+        available as :attr:`CompactIndexer.arrays`.
+
+    Returns
+    -------
+    index : int
+        Index of the state in ``states`` or -1 if the state is not part of the state
+        space.
+
+    Example
+    -------
+    >>> state_space = StateSpace(3, 1, [10], 11, indexer_type="compact")
+    >>> get_index_from_compact_indexer(state_space.indexer.arrays, 2, 0, 1, 10, 1, 0)
+    9
+
+    """
+    keys, indices, period_offsets, strides = compact_indexer
+
+    key = (
+        period * strides[0]
+        + exp_a * strides[1]
+        + exp_b * strides[2]
+        + edu * strides[3]
+        + choice_lagged * strides[4]
+        + type_ * strides[5]
+    )
+
+    lower = period_offsets[period]
+    upper = period_offsets[period + 1]
+    pos = lower + np.searchsorted(keys[lower:upper], key)
+
+    if pos < upper and keys[pos] == key:
+        index = indices[pos]
+    else:
+        index = -1
+
+    return index
+
+
+class CompactIndexer:
+    """Compact replacement for the dense indexer of the state space.
+
+    The dense indexer has the shape (num_periods, num_periods, num_periods, edu_max + 1,
+    4, num_types) and almost all entries are -1. The compact indexer only stores the
+    position of each admissible state in the flattened dense indexer, its key, in
+    ascending order together with the index of the state. As the period is the leading
+    dimension, the keys of each period form a contiguous block whose boundaries are kept
+    in ``period_offsets``. A lookup is a binary search within the block of the period.
+
+    Lookups follow the semantics of NumPy's integer array indexing, i.e.
+    ``indexer[period, exp_a, exp_b, edu, choice_lagged - 1, type_]`` returns the same
+    values as the dense indexer. Numba kernels can use
+    :func:`get_index_from_compact_indexer` with :attr:`arrays`.
+
+    Parameters
+    ----------
+    states : np.ndarray
+        Array with shape (num_states, 6) containing period, exp_a, exp_b, edu,
+        choice_lagged and type information.
+    shape : tuple
+        Shape of the corresponding dense indexer.
+
+    """
+
+    def __init__(self, states, shape):
+        self.shape = tuple(shape)
+        self.ndim = len(self.shape)
+        self.dtype = np.dtype(np.int32)
+
+        strides = np.ones(self.ndim, dtype=np.int64)
+        strides[:-1] = np.cumprod(self.shape[::-1], dtype=np.int64)[::-1][1:]
+
+        coordinates = states.T.astype(np.int64)
+        coordinates[4] -= 1
+        keys = strides.dot(coordinates)
+
+        order = np.argsort(keys, kind="mergesort")
+        self.keys = keys[order]
+        self.indices = order.astype(np.int32)
+        self.period_offsets = np.searchsorted(
+            self.keys, np.arange(self.shape[0] + 1) * strides[0]
+        )
+        self.strides = strides
+
+    @classmethod
+    def from_arrays(cls, arrays, shape):
+        """Create the indexer from the output of :attr:`arrays`, e.g. from a cache."""
+        indexer = cls.__new__(cls)
+        indexer.shape = tuple(shape)
+        indexer.ndim = len(indexer.shape)
+        indexer.dtype = np.dtype(np.int32)
+        indexer.keys, indexer.indices, indexer.period_offsets, indexer.strides = arrays
+
+        return indexer
+
+    @property
+    def arrays(self):
+        """Get a tuple of arrays for :func:`get_index_from_compact_indexer`."""
+        return self.keys, self.indices, self.period_offsets, self.strides
+
+    @property
+    def nbytes(self):
+        """Get the number of bytes consumed by the indexer."""
+        return sum(array.nbytes for array in self.arrays)
+
+    def __getitem__(self, key):
+        """Look up the indices of states.
+
+        Each element of ``key`` is either an integer, an array of integers or a slice.
+        Integers and arrays are broadcast against each other and the resulting
+        dimensions are positioned following the rules of NumPy's advanced indexing.
+        Like in NumPy, negative integers count from the end of the dimension.
+        Inadmissible states have the index -1.
+
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) != self.ndim:
+            raise IndexError(f"The indexer requires {self.ndim} indices.")
+
+        is_slice = [isinstance(k, slice) for k in key]
+        positions_advanced = [i for i, s in enumerate(is_slice) if not s]
+        advanced = [np.asarray(key[i]) for i in positions_advanced]
+        shape_advanced = np.broadcast(*advanced).shape if advanced else ()
+
+        # Like NumPy, the broadcast dimensions replace the advanced indices if they are
+        # adjacent. Otherwise, they are placed first.
+        if advanced and positions_advanced == list(
+            range(positions_advanced[0], positions_advanced[-1] + 1)
+        ):
+            num_leading_slices = sum(is_slice[: positions_advanced[0]])
+        else:
+            num_leading_slices = 0
+
+        slices = [
+            np.arange(n)[k] for n, k in zip(self.shape, key) if isinstance(k, slice)
+        ]
+        shape_out = (
+            tuple(len(s) for s in slices[:num_leading_slices])
+            + shape_advanced
+            + tuple(len(s) for s in slices[num_leading_slices:])
+        )
+        ndim_out = len(shape_out)
+
+        flat_keys = np.zeros(shape_out, dtype=np.int64)
+        j = 0
+        for i, k in enumerate(key):
+            if is_slice[i]:
+                axis = j if j < num_leading_slices else j + len(shape_advanced)
+                coordinate = slices[j].reshape(
+                    [-1 if d == axis else 1 for d in range(ndim_out)]
+                )
+                j += 1
+            else:
+                coordinate = np.broadcast_to(np.asarray(k), shape_advanced).reshape(
+                    (1,) * num_leading_slices
+                    + shape_advanced
+                    + (1,) * (len(slices) - num_leading_slices)
+                )
+
+            if np.any((coordinate < -self.shape[i]) | (coordinate >= self.shape[i])):
+                raise IndexError(f"Index out of bounds for axis {i}.")
+            coordinate = coordinate % self.shape[i]
+
+            flat_keys += coordinate * self.strides[i]
+
+        pos = np.searchsorted(self.keys, flat_keys)
+        pos_clipped = np.minimum(pos, self.keys.shape[0] - 1)
+        is_admissible = self.keys[pos_clipped] == flat_keys
+
+        indices = np.where(is_admissible, self.indices[pos_clipped], -1)
+        indices = indices.astype(np.int32)
+
+        return indices[()]
+
+    def __array__(self, dtype=None):
+        """Convert the compact indexer to its dense counterpart."""
+        indexer = np.full(self.shape, -1, dtype=np.int32 if dtype is None else dtype)
+        indexer.reshape(-1)[self.keys] = self.indices
+
+        return indexer
+
+
+CACHE_COMPACT_INDEXER = [
+    "indexer_keys",
+    "indexer_indices",
+    "indexer_period_offsets",
+    "indexer_strides",
+]
+
+
+def get_state_space_cache_key(num_periods, num_types, edu_starts, edu_max, kind):
+    """Get the name of the cache entry of a state space.
+
+    The key is a hash of all inputs which determine the structure of the state space.
+    The order of ``edu_starts`` matters as it determines the order of states.
+
+    Example
+    -------
+    >>> get_state_space_cache_key(3, 1, [10], 11, "dense")
+    'state_space_8da82b1f855eed25'
+
+    """
+    inputs = [num_periods, num_types, [int(i) for i in edu_starts], edu_max, kind]
+    hash_ = hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+    return f"state_space_{hash_[:16]}"
+
+
+REWARDS_PARAMETERS = [
+    "coeffs_a",
+    "coeffs_b",
+    "coeffs_edu",
+    "coeffs_home",
+    "coeffs_common",
+    "type_shifts",
+]
+
+
+def get_changed_reward_components(last, optim_paras):
+    """Get the reward components which depend on changed parameters.
+
+    Parameters
+    ----------
+    last : dict
+        Contains the parameters of the last update of the rewards.
+    optim_paras : dict
+        Contains the current parameters.
+
+    Returns
+    -------
+    is_update : np.ndarray
+        Boolean array with shape (7,) indicating whether the wages of OCCUPATION A and
+        B, the general rewards of OCCUPATION A and B, the common rewards, the rewards of
+        SCHOOL and HOME have to be recomputed.
+
+    Example
+    -------
+    >>> last = {
+    ...     "coeffs_a": np.zeros(15), "coeffs_b": np.zeros(15),
+    ...     "coeffs_edu": np.zeros(7), "coeffs_home": np.zeros(3),
+    ...     "coeffs_common": np.zeros(2), "type_shifts": np.zeros((1, 4)),
+    ... }
+    >>> optim_paras = {**last, "coeffs_a": np.append(np.zeros(14), 1)}
+    >>> get_changed_reward_components(last, optim_paras)
+    array([False, False,  True, False, False, False, False])
+
+    """
+    def is_changed(key, slice_=slice(None)):
+        return not np.array_equal(last[key][slice_], optim_paras[key][slice_])
+
+    is_shift_changed = (last["type_shifts"] != optim_paras["type_shifts"]).any(axis=0)
+    is_common = is_changed("coeffs_common")
+
+    is_update = np.array(
+        [
+            is_changed("coeffs_a", slice(12)) or is_shift_changed[0],
+            is_changed("coeffs_b", slice(12)) or is_shift_changed[1],
+            is_changed("coeffs_a", slice(12, None)),
+            is_changed("coeffs_b", slice(12, None)),
+            is_common,
+            is_changed("coeffs_edu") or is_shift_changed[2] or is_common,
+            is_changed("coeffs_home") or is_shift_changed[3] or is_common,
+        ]
+    )
+
+    return is_update
+
+
+def _slices_to_bounds(slices):
+    return np.array([[slice_.start, slice_.stop] for slice_ in slices])
+
+
+def _bounds_to_slices(bounds):
+    return [slice(int(start), int(stop)) for start, stop in bounds]
+
+
 class StateSpace:
     """Class containing all objects related to the state space of a discrete choice
     dynamic programming model.
@@ -714,17 +1773,35 @@ class StateSpace:
     optim_paras : dict
         Contains various information necessary for the calculation of rewards for each
         agent.
+    indexer_type : {"dense", "compact"}
+        The dense indexer allocates an entry for every combination of state variables
+        and grows with the cube of ``num_periods``. The compact indexer only stores the
+        admissible states and supports the same lookups.
+    cache : str, optional
+        Path to a directory in which the state space is cached. If the directory
+        contains a state space built from the same inputs, its arrays are loaded as
+        read-only memory maps, so that many processes share the same pages. Otherwise,
+        the state space is built and written to the directory.
 
     Attributes
     ----------
     states : np.ndarray
         Array with shape (num_states, 6) containing period, exp_a, exp_b, edu,
         choice_lagged and type information.
-    indexer : np.ndarray
+    indexer : np.ndarray or CompactIndexer
         Array with shape (num_periods, num_periods, num_periods, edu_max, 4, num_types).
     covariates : np.ndarray
-        Array with shape (num_periods, 16) containing covariates of each state necessary
-        to calculate rewards.
+        Array with shape (num_states, 16) containing covariates of each state necessary
+        to calculate rewards. It is created on access from ``covariates_core``.
+    states_core : np.ndarray
+        Array with shape (num_states_core, 6) containing the states of the first type.
+        The states of the other types only differ in the type column.
+    covariates_core : np.ndarray
+        Array with shape (num_states_core, 16) containing the covariates of
+        ``states_core`` which do not depend on the type.
+    child_indices : np.ndarray
+        Array with shape (num_states, 4) containing the indices of the subsequent state
+        for each choice. The value is -1 if there is no subsequent state.
     rewards : np.ndarray
         Array with shape (num_states, 9) containing rewards of each state.
     emaxs : np.ndarray
@@ -781,28 +1858,120 @@ class StateSpace:
 
     emaxs_columns = ["emax_a", "emax_b", "emax_edu", "emax_home", "emax"]
 
-    def __init__(self, num_periods, num_types, edu_starts, edu_max, optim_paras=None):
+    def __init__(
+        self,
+        num_periods,
+        num_types,
+        edu_starts,
+        edu_max,
+        optim_paras=None,
+        indexer_type="dense",
+        cache=None,
+    ):
         self.num_periods = num_periods
         self.num_types = num_types
         self.edu_max = edu_max
 
-        self.states, self.indexer = pyth_create_state_space(
-            num_periods, num_types, edu_starts, edu_max
-        )
-        self.covariates = create_covariates(self.states)
+        if indexer_type not in ["dense", "compact"]:
+            raise ValueError(f"Unknown indexer_type {indexer_type!r}.")
+
+        if cache is None:
+            self._create_state_space(edu_starts, indexer_type)
+        else:
+            path = Path(cache) / get_state_space_cache_key(
+                num_periods, num_types, edu_starts, edu_max, indexer_type
+            )
+            if path.exists():
+                self._load_from_cache(path, indexer_type)
+            else:
+                self._create_state_space(edu_starts, indexer_type)
+                self._save_to_cache(path)
 
         # Passing :data:`optim_paras` is optional.
         if optim_paras:
-            self.rewards = np.column_stack(
-                (
-                    pyth_calculate_rewards_systematic(
-                        self.states, self.covariates, optim_paras
-                    )
-                )
+            self.update_systematic_rewards(optim_paras)
+
+    def _create_state_space(self, edu_starts, indexer_type):
+        """Create the states, the indexer and all type-invariant attributes."""
+        num_periods, num_types, edu_max = self.num_periods, self.num_types, self.edu_max
+
+        if indexer_type == "dense":
+            self.states, self.indexer = pyth_create_state_space(
+                num_periods, num_types, edu_starts, edu_max
             )
+        else:
+            self.states = create_states(num_periods, num_types, edu_starts, edu_max)
+            shape = (num_periods, num_periods, num_periods, edu_max + 1, 4, num_types)
+            self.indexer = CompactIndexer(self.states, shape)
 
         self._create_slices_by_periods(num_periods)
 
+        # Within each period, the states of all types are stored in consecutive blocks
+        # which only differ in the type column. Type-invariant data is only kept for the
+        # first block.
+        self.states_core = self.states[self.states[:, 5] == 0]
+        self.covariates_core = create_covariates(self.states_core)
+        self._create_slices_by_periods_core(num_periods)
+
+        self.child_indices = create_child_indices(
+            self.states, self.indexer, num_periods, edu_max
+        )
+
+    def _save_to_cache(self, path):
+        """Save the structural arrays of the state space to ``path``.
+
+        The arrays are written to a temporary directory which is renamed afterwards.
+        Thus, concurrent processes never observe an incomplete cache entry.
+
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = Path(tempfile.mkdtemp(dir=path.parent, prefix=".tmp-"))
+
+        arrays = {
+            "states": self.states,
+            "states_core": self.states_core,
+            "covariates_core": self.covariates_core,
+            "child_indices": self.child_indices,
+            "bounds_by_periods": _slices_to_bounds(self.slices_by_periods),
+            "bounds_by_periods_core": _slices_to_bounds(self.slices_by_periods_core),
+        }
+        if isinstance(self.indexer, CompactIndexer):
+            arrays["indexer_shape"] = np.array(self.indexer.shape)
+            for name, array in zip(CACHE_COMPACT_INDEXER, self.indexer.arrays):
+                arrays[name] = array
+        else:
+            arrays["indexer"] = self.indexer
+
+        for name, array in arrays.items():
+            np.save(tmp_path / f"{name}.npy", array)
+
+        try:
+            tmp_path.rename(path)
+        except OSError:
+            # Another process has created the same entry in the meantime.
+            shutil.rmtree(tmp_path)
+
+    def _load_from_cache(self, path, indexer_type):
+        """Load the structural arrays of the state space as read-only memory maps."""
+
+        def load(name):
+            return np.load(path / f"{name}.npy", mmap_mode="r")
+
+        self.states = load("states")
+        self.states_core = load("states_core")
+        self.covariates_core = load("covariates_core")
+        self.child_indices = load("child_indices")
+        self.slices_by_periods = _bounds_to_slices(load("bounds_by_periods"))
+        self.slices_by_periods_core = _bounds_to_slices(load("bounds_by_periods_core"))
+
+        if indexer_type == "dense":
+            self.indexer = load("indexer")
+        else:
+            self.indexer = CompactIndexer.from_arrays(
+                [load(name) for name in CACHE_COMPACT_INDEXER],
+                tuple(load("indexer_shape")),
+            )
+
     @property
     def states_per_period(self):
         """Get a list of states per period starting from the first period."""
@@ -813,15 +1982,69 @@ class StateSpace:
         """Get the total number states in the state space."""
         return self.states.shape[0]
 
-    def update_systematic_rewards(self, optim_paras):
-        self.rewards = np.column_stack(
-            (
-                pyth_calculate_rewards_systematic(
-                    self.states, self.covariates, optim_paras
-                )
+    @property
+    def covariates(self):
+        """Get the covariates of all states by repeating the core for each type.
+
+        The array is created on the first access and reused afterwards. The covariates
+        of a single period are available without creating the array with
+        :meth:`get_attribute_from_period`.
+
+        """
+        if getattr(self, "_covariates", None) is None:
+            self._covariates = np.concatenate(
+                [
+                    np.tile(self.covariates_core[slice_], (self.num_types, 1))
+                    for slice_ in self.slices_by_periods_core
+                ]
             )
+
+        return self._covariates
+
+    def update_systematic_rewards(self, optim_paras):
+        """Update the systematic rewards in place.
+
+        The buffer ``self.rewards`` is allocated once and reused in subsequent calls,
+        e.g. for each evaluation of the criterion function. It might also be replaced
+        with a buffer in shared memory. The parameters of the last update are stored and
+        only reward components which depend on changed parameters are recomputed.
+
+        """
+        is_restud = os.path.exists(".restud.respy.scratch")
+        last = getattr(self, "_optim_paras_rewards", None)
+
+        rewards = getattr(self, "rewards", None)
+        if rewards is None or rewards.shape != (self.num_states, 9):
+            self.rewards = np.empty((self.num_states, 9))
+            last = None
+
+        if last is None or last["is_restud"] != is_restud:
+            is_update = np.ones(7, dtype=np.bool_)
+        else:
+            is_update = get_changed_reward_components(last, optim_paras)
+            if not is_update.any():
+                return
+
+        calculate_rewards_systematic_by_type(
+            self.states_core,
+            self.covariates_core,
+            _slices_to_bounds(self.slices_by_periods_core),
+            optim_paras["coeffs_a"],
+            optim_paras["coeffs_b"],
+            optim_paras["coeffs_edu"],
+            optim_paras["coeffs_home"],
+            optim_paras["coeffs_common"],
+            optim_paras["type_shifts"],
+            is_restud,
+            is_update,
+            self.rewards,
         )
 
+        self._optim_paras_rewards = {
+            key: np.array(optim_paras[key], copy=True) for key in REWARDS_PARAMETERS
+        }
+        self._optim_paras_rewards["is_restud"] = is_restud
+
     def get_attribute_from_period(self, attr, period):
         """Get an attribute of the state space sliced to a given period.
 
@@ -839,6 +2062,15 @@ class StateSpace:
             space.
 
         """
+        # The covariates of the period are repeated from the core for each type.
+        if attr == "covariates":
+            try:
+                slice_ = self.slices_by_periods_core[period]
+            except IndexError:
+                raise StateSpaceError("Inadmissible period.")
+
+            return np.tile(self.covariates_core[slice_], (self.num_types, 1))
+
         try:
             attribute = getattr(self, attr)
         except AttributeError:
@@ -887,6 +2119,13 @@ class StateSpace:
             idx_start, idx_end = np.where(self.states[:, 0] == i)[0][[0, -1]]
             self.slices_by_periods.append(slice(idx_start, idx_end + 1))
 
+    def _create_slices_by_periods_core(self, num_periods):
+        """Create slices to index the type-invariant core in a given period."""
+        bounds = np.append(0, np.bincount(self.states_core[:, 0]).cumsum())
+        self.slices_by_periods_core = [
+            slice(bounds[i], bounds[i + 1]) for i in range(num_periods)
+        ]
+
     def _create_attributes_from_fortran_counterparts(self, periods_emax):
         """Create state space attributes from FORTRAN outputs.
 
@@ -936,7 +2175,7 @@ class StateSpace:
         # The indexer has to be modified because ``mapping_state_idx`` resets the
         # counter to zero for each period and ``self.indexer`` not. For every period,
         # subtract the minimum index.
-        mapping_state_idx = self.indexer.copy()
+        mapping_state_idx = np.array(self.indexer)
         for period in range(self.num_periods):
             mask = mapping_state_idx[period] != -1
             minimum_index = mapping_state_idx[period][mask].min()
@@ -13,6 +13,11 @@ def pyth_solve(
     optim_paras,
     file_sim,
     num_types,
+    state_space_cache=None,
+    weights_emax=None,
+    is_control_variate=False,
+    tolerance_emax=None,
+    indexer_type="dense",
 ):
     """Solve the model.
 
@@ -40,13 +45,33 @@ def pyth_solve(
         Undocumented parameter.
     num_types : int
         Number of types.
+    state_space_cache : str, optional
+        Directory in which the state space is cached.
+    weights_emax : np.ndarray, optional
+        Array with shape (num_draws,) containing the weights of the draws for the
+        expected maximum utility. By default, all draws have the same weight.
+    is_control_variate : bool, default False
+        Indicator for whether the wage shocks are used as control variates for the
+        expected maximum utility.
+    tolerance_emax : float, optional
+        Tolerance for the standard error of the simulated expected maximum utility. If
+        given, the number of draws is chosen adaptively in each period.
+    indexer_type : {"dense", "compact"}
+        Type of the indexer of the state space, see
+        :class:`~respy.python.solve.solve_auxiliary.StateSpace`.
 
     """
     record_solution_progress(1, file_sim)
 
     # Create the state space
     state_space = StateSpace(
-        num_periods, num_types, edu_spec["start"], edu_spec["max"], optim_paras
+        num_periods,
+        num_types,
+        edu_spec["start"],
+        edu_spec["max"],
+        optim_paras,
+        indexer_type=indexer_type,
+        cache=state_space_cache,
     )
 
     record_solution_progress(-1, file_sim)
@@ -69,6 +94,9 @@ def pyth_solve(
         optim_paras,
         file_sim,
         True,
+        weights_emax,
+        is_control_variate,
+        tolerance_emax,
     )
 
     if optim_paras["delta"]:
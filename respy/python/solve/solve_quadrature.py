@@ -0,0 +1,119 @@
+"""Quadrature rules for the integration of the expected maximum utility.
+
+The shocks are transformations of four independent standard normal random variables.
+Thus, the expected maximum utility can be approximated deterministically with
+Gauss-Hermite nodes and weights instead of random draws.
+
+"""
+import itertools
+
+import numpy as np
+from numpy.polynomial.hermite_e import hermegauss
+from scipy.special import comb
+
+
+def create_quadrature(num_periods, rule, num_nodes, num_dims=4):
+    """Create the nodes and weights of a Gauss-Hermite quadrature rule.
+
+    The nodes replace the standard normal draws for the integration of the expected
+    maximum utility. As the nodes do not depend on the period, they are repeated for
+    each period.
+
+    Parameters
+    ----------
+    num_periods : int
+        Number of periods.
+    rule : str
+        Either ``"product"`` for the tensor product of one-dimensional rules with
+        ``num_nodes`` nodes in each dimension or ``"smolyak"`` for the sparse grid of
+        level ``num_nodes``.
+    num_nodes : int
+        Number of nodes in each dimension or level of the sparse grid. Both rules
+        integrate polynomials up to degree ``2 * num_nodes - 1`` in each dimension
+        exactly, but the sparse grid requires far less nodes for higher levels.
+    num_dims : int, default 4
+        Number of dimensions.
+
+    Returns
+    -------
+    periods_nodes : np.ndarray
+        Array with shape (num_periods, num_points, num_dims) containing the nodes.
+    weights : np.ndarray
+        Array with shape (num_points,) containing the weights which sum to one.
+
+    Example
+    -------
+    >>> nodes, weights = create_quadrature(1, "product", 3)
+    >>> nodes.shape, weights.shape
+    ((1, 81, 4), (81,))
+    >>> nodes, weights = create_quadrature(1, "smolyak", 3)
+    >>> nodes.shape, weights.shape
+    ((1, 41, 4), (41,))
+    >>> np.allclose(weights @ nodes[0] ** 2, 1)
+    True
+
+    """
+    if rule == "product":
+        nodes, weights = _create_product_rule(num_nodes, num_dims)
+    elif rule == "smolyak":
+        nodes, weights = _create_smolyak_rule(num_nodes, num_dims)
+    else:
+        raise NotImplementedError
+
+    periods_nodes = np.broadcast_to(nodes, (num_periods,) + nodes.shape).copy()
+
+    return periods_nodes, weights
+
+
+def _create_gauss_hermite_rule(num_nodes):
+    """Create the Gauss-Hermite rule for the standard normal distribution."""
+    nodes, weights = hermegauss(num_nodes)
+
+    return nodes, weights / weights.sum()
+
+
+def _create_product_rule(num_nodes, num_dims):
+    """Create the tensor product of one-dimensional Gauss-Hermite rules."""
+    nodes, weights = _create_gauss_hermite_rule(num_nodes)
+
+    grid = np.array(list(itertools.product(nodes, repeat=num_dims)))
+    grid_weights = np.array(
+        [np.prod(w) for w in itertools.product(weights, repeat=num_dims)]
+    )
+
+    return grid, grid_weights
+
+
+def _create_smolyak_rule(level, num_dims):
+    """Create a sparse grid with the combination technique of Smolyak.
+
+    The sparse grid is a weighted combination of small product rules. The numbers of
+    nodes per dimension, ``levels``, of each product rule sum up to at least ``level``
+    and at most ``level + num_dims - 1``. Some weights are negative, which is why the
+    sparse grid is inaccurate for integrands with kinks, e.g. the maximum of choices
+    with similar values. Nodes which appear in multiple product rules are merged.
+
+    """
+    rules = [_create_gauss_hermite_rule(i) for i in range(1, level + 1)]
+
+    nodes = []
+    weights = []
+    for levels in itertools.product(range(1, level + 1), repeat=num_dims):
+        excess = level + num_dims - 1 - sum(levels)
+        if not 0 <= excess <= num_dims - 1:
+            continue
+
+        coefficient = (-1) ** excess * comb(num_dims - 1, excess, exact=True)
+        for point in itertools.product(*[range(i) for i in levels]):
+            nodes.append([rules[i - 1][0][j] for i, j in zip(levels, point)])
+            weight = np.prod([rules[i - 1][1][j] for i, j in zip(levels, point)])
+            weights.append(coefficient * weight)
+
+    # Nodes are merged after rounding because the same node can differ slightly between
+    # the one-dimensional rules.
+    nodes, inverse = np.unique(np.round(nodes, 12), axis=0, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=weights)
+
+    is_used = ~np.isclose(weights, 0, atol=1e-15)
+
+    return nodes[is_used], weights[is_used]
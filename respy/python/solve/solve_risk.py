@@ -1,32 +1,36 @@
+import numpy as np
 from numba import guvectorize
 
+from respy.python.shared.shared_constants import HUGE_FLOAT
 from respy.python.shared.shared_constants import INADMISSIBILITY_PENALTY
 
 
 @guvectorize(
     [
-        "f4[:], f4[:], f4[:], f4[:, :], f4, b1, f4[:]",
-        "f8[:], f8[:], f8[:], f8[:, :], f8, b1, f8[:]",
+        "f4[:], f4[:], f4[:], f4[:, :], f4[:], f4, b1, f4[:]",
+        "f8[:], f8[:], f8[:], f8[:, :], f8[:], f8, b1, f8[:]",
     ],
-    "(m), (n), (n), (p, n), (), () -> ()",
+    "(m), (n), (n), (p, n), (p), (), () -> ()",
     nopython=True,
     target="parallel",
 )
 def construct_emax_risk(
-    wages, rewards_systematic, emaxs, draws, delta, max_education, cont_value
+    wages, rewards_systematic, emaxs, draws, weights, delta, max_education, cont_value
 ):
     """Simulate expected maximum utility for a given distribution of the unobservables.
 
     The function takes an agent and calculates the utility for each of the choices, the
     ex-post rewards, with multiple draws from the distribution of unobservables and adds
     the discounted expected maximum utility of subsequent periods resulting from
-    choices. Averaging over all maximum utilities yields the expected maximum utility of
-    this state.
+    choices. The weighted sum of all maximum utilities yields the expected maximum
+    utility of this state.
 
     The underlying process in this function is called `Monte Carlo integration`_. The
     goal is to approximate an integral by evaluating the integrand at randomly chosen
     points. In this setting, one wants to approximate the expected maximum utility of
-    the current state.
+    the current state. Then, each draw has the weight ``1 / num_draws``. Instead of
+    random draws, the nodes and weights of a quadrature rule can be used, see
+    :func:`~respy.python.solve.solve_quadrature.create_quadrature`.
 
     Parameters
     ----------
@@ -39,6 +43,8 @@ def construct_emax_risk(
         subsequent period.
     draws : np.ndarray
         Array with shape (num_draws, 4).
+    weights : np.ndarray
+        Array with shape (num_draws,) containing the weight of each draw.
     delta : float
         The discount factor.
     max_education: bool
@@ -76,6 +82,166 @@ def construct_emax_risk(
             if emax_choice > current_max_emax:
                 current_max_emax = emax_choice
 
-        cont_value[0] += current_max_emax
+        cont_value[0] += weights[i] * current_max_emax
 
-    cont_value[0] /= num_draws
+
+@guvectorize(
+    ["f8[:, :], f8[:, :], f8[:, :], f8[:, :], f8[:], f8[:, :, :], f8[:], b1, f8[:]"],
+    "(k, m), (k, n), (k, n), (p, n), (p), (k, n, n), (k), () -> (k)",
+    nopython=True,
+    target="parallel",
+)
+def construct_emax_risk_batch(
+    wages,
+    rewards_systematic,
+    emaxs,
+    draws_standard,
+    weights,
+    shocks_cholesky,
+    delta,
+    max_education,
+    cont_value,
+):
+    """Simulate expected maximum utility for multiple sets of parameters at once.
+
+    The function is equivalent to :func:`construct_emax_risk` applied to each of the
+    ``k`` sets of parameters. Instead of transforming the draws for each set of
+    parameters beforehand, each standard normal draw is loaded once and transformed with
+    all Cholesky factors.
+
+    Parameters
+    ----------
+    wages : np.ndarray
+        Array with shape (k, 2) containing wages.
+    rewards_systematic : np.ndarray
+        Array with shape (k, 4) containing systematic rewards.
+    emaxs : np.ndarray
+        Array with shape (k, 4) containing expected maximum utility for each choice in
+        the subsequent period.
+    draws_standard : np.ndarray
+        Array with shape (num_draws, 4) containing standard normal draws.
+    weights : np.ndarray
+        Array with shape (num_draws,) containing the weight of each draw.
+    shocks_cholesky : np.ndarray
+        Array with shape (k, 4, 4) containing the Cholesky factors of the shock
+        covariance matrices.
+    delta : np.ndarray
+        Array with shape (k,) containing the discount factors.
+    max_education: bool
+        Indicator for whether the state has reached maximum education.
+
+    Returns
+    -------
+    cont_value : np.ndarray
+        Array with shape (k,) containing the expected maximum utility of an agent for
+        each set of parameters.
+
+    """
+    num_draws, num_choices = draws_standard.shape
+    num_sets, num_wages = wages.shape
+
+    for k in range(num_sets):
+        cont_value[k] = 0.0
+
+    for i in range(num_draws):
+        for k in range(num_sets):
+
+            current_max_emax = 0.0
+
+            for j in range(num_choices):
+                draw = 0.0
+                for m in range(num_choices):
+                    draw += shocks_cholesky[k, j, m] * draws_standard[i, m]
+
+                if j < num_wages:
+                    draw = min(max(np.exp(draw), 0.0), HUGE_FLOAT)
+                    rew_ex = (
+                        wages[k, j] * draw + rewards_systematic[k, j] - wages[k, j]
+                    )
+                else:
+                    rew_ex = rewards_systematic[k, j] + draw
+
+                emax_choice = rew_ex + delta[k] * emaxs[k, j]
+
+                if j == 2 and max_education:
+                    emax_choice += INADMISSIBILITY_PENALTY
+
+                if emax_choice > current_max_emax:
+                    current_max_emax = emax_choice
+
+            cont_value[k] += weights[i] * current_max_emax
+
+
+@guvectorize(
+    ["f8[:], f8[:], f8[:], f8[:, :], f8, b1, f8[:], f8[:]"],
+    "(m), (n), (n), (p, n), (), () -> (), ()",
+    nopython=True,
+    target="parallel",
+)
+def construct_emax_risk_moments(
+    wages,
+    rewards_systematic,
+    emaxs,
+    draws,
+    delta,
+    max_education,
+    sum_emax,
+    sum_squared_emax,
+):
+    """Sum up the maximum utilities and their squares over the draws.
+
+    The sums are accumulated over batches of draws to compute the expected maximum
+    utility and the standard error of the simulation, see
+    :func:`~respy.python.solve.solve_auxiliary.get_adaptive_emax`. The maximum utility
+    of each draw is the same as in :func:`construct_emax_risk`.
+
+    Parameters
+    ----------
+    wages : np.ndarray
+        Array with shape (2,) containing wages.
+    rewards_systematic : np.ndarray
+        Array with shape (4,) containing systematic rewards.
+    emaxs : np.ndarray
+        Array with shape (4,) containing expected maximum utility for each choice in the
+        subsequent period.
+    draws : np.ndarray
+        Array with shape (num_draws, 4).
+    delta : float
+        The discount factor.
+    max_education: bool
+        Indicator for whether the state has reached maximum education.
+
+    Returns
+    -------
+    sum_emax : float
+        Sum of the maximum utilities.
+    sum_squared_emax : float
+        Sum of the squared maximum utilities.
+
+    """
+    num_draws, num_choices = draws.shape
+    num_wages = wages.shape[0]
+
+    sum_emax[0] = 0.0
+    sum_squared_emax[0] = 0.0
+
+    for i in range(num_draws):
+
+        current_max_emax = 0.0
+
+        for j in range(num_choices):
+            if j < num_wages:
+                rew_ex = wages[j] * draws[i, j] + rewards_systematic[j] - wages[j]
+            else:
+                rew_ex = rewards_systematic[j] + draws[i, j]
+
+            emax_choice = rew_ex + delta * emaxs[j]
+
+            if j == 2 and max_education:
+                emax_choice += INADMISSIBILITY_PENALTY
+
+            if emax_choice > current_max_emax:
+                current_max_emax = emax_choice
+
+        sum_emax[0] += current_max_emax
+        sum_squared_emax[0] += current_max_emax ** 2
@@ -116,6 +116,9 @@ def generate_random_model(
     options["simulation"]["agents"] = randint(3, bound_constr["max_agents"] + 1)
     options["simulation"]["seed"] = randint(1, 1000)
     options["simulation"]["file"] = "data"
+    options["simulation"]["chunk_size"] = None
+    options["simulation"]["format"] = "text"
+    options["simulation"]["info"] = True
 
     options["num_periods"] = randint(1, bound_constr["max_periods"])
 
@@ -131,6 +134,15 @@ def generate_random_model(
     options["solution"]["seed"] = randint(1, 10000)
     # don't remove the seemingly redundant conversion from numpy._bool to python bool!
     options["solution"]["store"] = bool(choice([True, False]))
+    options["solution"]["cache_dir"] = None
+    options["solution"]["indexer"] = "dense"
+    options["solution"]["sequence"] = "random"
+    options["solution"]["integration"] = "monte-carlo"
+    options["solution"]["rule"] = choice(["product", "smolyak"])
+    options["solution"]["nodes"] = randint(1, 4)
+    options["solution"]["antithetic"] = False
+    options["solution"]["control_variate"] = False
+    options["solution"]["tolerance"] = None
 
     options["estimation"]["agents"] = randint(1, options["simulation"]["agents"])
     options["estimation"]["draws"] = randint(1, bound_constr["max_draws"])
@@ -142,8 +154,16 @@ def generate_random_model(
         options["estimation"]["optimizer"] = "SCIPY-LBFGSB"
     options["estimation"]["maxfun"] = randint(1, 1000)
     options["estimation"]["tau"] = uniform(100, 500)
+    options["estimation"]["streaming"] = bool(choice([True, False]))
+    options["estimation"]["cache"] = randint(0, 100)
+    if version == "fortran":
+        options["estimation"]["streaming"] = False
+        options["estimation"]["cache"] = 0
+    options["estimation"]["cache_file"] = None
+    options["estimation"]["sequence"] = "random"
+    options["estimation"]["antithetic"] = False
 
-    options["derivatives"] = "forward-differences"
+    options["derivatives"] = choice(["forward-differences", "central-differences"])
 
     options["preconditioning"]["minimum"] = uniform(0.0000001, 0.001)
     options["preconditioning"]["type"] = choice(["gradient", "identity", "magnitudes"])
@@ -132,6 +132,7 @@ class TestClass(object):
             rewards_period[:4],
             emaxs_period,
             draws_emax_risk,
+            np.full(num_draws_emax, 1 / num_draws_emax),
             optim_paras["delta"],
             max_education_period,
         )
@@ -868,6 +869,7 @@ class TestClass(object):
             max_emax,
             is_simulated,
             draws_emax_risk,
+            np.full(num_draws_emax, 1 / num_draws_emax),
             optim_paras["delta"],
             max_education,
         )
@@ -912,7 +914,8 @@ class TestClass(object):
             assert_array_almost_equal(py, f90)
 
     def test_7(self):
-        """ This is a special test for shared functions related to the interpolation setup.
+        """ This is a special test for shared functions related to the interpolation
+        setup.
         """
         # Impose constraints
         point_constr = {"num_periods": np.random.randint(2, 5)}
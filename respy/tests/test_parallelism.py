@@ -104,3 +104,42 @@ class TestClass(object):
             if base_est_log is None:
                 base_est_log = open("est.respy.log", "r").readlines()
             compare_est_log(base_est_log)
+
+
+@pytest.mark.parametrize("is_interpolated", [False, True])
+def test_python_parallelism_yields_identical_estimation(is_interpolated):
+    """Ensure that the Python version yields the same estimation whether the criterion
+    function and its gradient are evaluated by a pool of processes or not.
+
+    With interpolation, the interpolation points are only fixed across evaluations if
+    multiple processes are used. Thus, pools of different sizes are compared.
+
+    """
+    constr = {
+        "program": {"version": "python"},
+        "estimation": {
+            "maxfun": np.random.randint(1, 15),
+            "agents": 50,
+            "streaming": False,
+        },
+        "interpolation": {"flag": is_interpolated, "points": 10},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    options_spec["estimation"]["optimizer"] = np.random.choice(
+        ["SCIPY-BFGS", "SCIPY-LBFGSB"]
+    )
+
+    base = None
+    for procs in [2, 3] if is_interpolated else [1, 2]:
+        options_spec["program"]["procs"] = procs
+
+        respy_obj = RespyCls(params_spec, options_spec)
+        respy_obj = simulate_observed(respy_obj)
+        x, crit_val = respy_obj.fit()
+
+        if base is None:
+            base = x, crit_val
+            base_est_log = open("est.respy.log", "r").readlines()
+
+        np.testing.assert_equal(base, (x, crit_val))
+        compare_est_log(base_est_log)
@@ -2,23 +2,67 @@ from functools import partial
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 import pytest
 from numba import njit
+from pandas.testing import assert_frame_equal
 from pandas.testing import assert_series_equal
 
 from respy import RespyCls
+from respy.pre_processing.data_processing import process_dataset
+from respy.pre_processing.data_processing import read_dataset
 from respy.pre_processing.model_processing import _read_options_spec
 from respy.pre_processing.model_processing import _read_params_spec
-from respy.python.evaluate.evaluate_python import create_draws_and_prob_wages
+from respy.python.estimate.estimate_parallel import CriterionPool
+from respy.python.estimate.estimate_python import pyth_criterion
+from respy.python.estimate.estimate_python import pyth_criterion_batch
+from respy.python.evaluate.evaluate_auxiliary import create_draws_and_prob_wages
+from respy.python.evaluate.evaluate_auxiliary import (
+    simulate_probability_of_agents_observed_choice,
+)
+from respy.python.evaluate.evaluate_auxiliary import (
+    simulate_probability_of_observation,
+)
+from respy.python.evaluate.evaluate_parallel import ContributionsPool
+from respy.python.evaluate.evaluate_python import prepare_data_for_contributions
+from respy.python.evaluate.evaluate_python import pyth_contributions
+from respy.python.shared.shared_auxiliary import create_covariates
+from respy.python.shared.shared_auxiliary import create_draws
 from respy.python.shared.shared_auxiliary import dist_class_attributes
 from respy.python.shared.shared_auxiliary import distribute_parameters
 from respy.python.shared.shared_auxiliary import (
     get_continuation_value_and_ex_post_rewards,
 )
+from respy.python.shared.shared_auxiliary import get_conditional_probabilities
+from respy.python.shared.shared_auxiliary import get_emaxs_of_subsequent_period
 from respy.python.shared.shared_auxiliary import get_optim_paras
+from respy.python.shared.shared_auxiliary import transform_disturbances
+from respy.python.shared.shared_constants import DATA_FORMATS_SIM
 from respy.python.shared.shared_constants import DECIMALS
 from respy.python.shared.shared_constants import MISSING_FLOAT
+from respy.python.simulate.simulate_auxiliary import construct_transition_matrix
+from respy.python.simulate.simulate_auxiliary import get_info_statistics
+from respy.python.simulate.simulate_auxiliary import get_random_choice_lagged_start
+from respy.python.simulate.simulate_auxiliary import get_random_edu_start
+from respy.python.simulate.simulate_auxiliary import get_random_types
+from respy.python.simulate.simulate_auxiliary import merge_info_statistics
+from respy.python.simulate.simulate_auxiliary import sort_type_info
+from respy.python.simulate.simulate_auxiliary import write_dataset
+from respy.python.simulate.simulate_auxiliary import write_info_statistics
+from respy.python.solve.solve_auxiliary import CompactIndexer
+from respy.python.solve.solve_auxiliary import get_adaptive_emax
+from respy.python.solve.solve_auxiliary import get_control_variate_weights
+from respy.python.solve.solve_auxiliary import get_endogenous_variable
+from respy.python.solve.solve_auxiliary import get_index_from_compact_indexer
+from respy.python.solve.solve_auxiliary import get_simulated_indicator
+from respy.python.solve.solve_auxiliary import pyth_backward_induction
+from respy.python.solve.solve_auxiliary import pyth_backward_induction_batch
+from respy.python.solve.solve_auxiliary import pyth_backward_induction_by_period
+from respy.python.solve.solve_auxiliary import pyth_calculate_rewards_systematic
 from respy.python.solve.solve_auxiliary import StateSpace
+from respy.python.solve.solve_quadrature import create_quadrature
+from respy.python.solve.solve_risk import construct_emax_risk
+from respy.tests.codes.auxiliary import simulate_observed
 from respy.tests.codes.random_model import generate_random_model
 
 
@@ -334,3 +378,1105 @@ def test_state_space_restrictions_by_traversing_forward(
     indicator = indicator[state_space.states_per_period[0] :]
 
     assert (indicator == 1).all()
+
+
+@pytest.mark.parametrize(
+    "num_periods, num_types, edu_starts, edu_max",
+    [(10, 1, [10], 15), (10, 3, [10, 12], 13)],
+)
+def test_child_indices_match_lookup_with_indexer(
+    num_periods, num_types, edu_starts, edu_max
+):
+    """Test that the precomputed child indices yield the same emaxs as the indexer."""
+    state_space = StateSpace(num_periods, num_types, edu_starts, edu_max)
+    emaxs = np.random.randn(state_space.num_states, 5)
+
+    for period in range(num_periods - 1):
+        states = state_space.get_attribute_from_period("states", period)
+        emaxs = get_emaxs_of_subsequent_period(
+            states, state_space.indexer, emaxs, edu_max
+        )
+
+        child_indices = state_space.get_attribute_from_period("child_indices", period)
+        emaxs_subsequent = emaxs[child_indices, 4]
+        emaxs_subsequent[child_indices == -1] = 0.0
+
+        np.testing.assert_array_equal(
+            emaxs[state_space.slices_by_periods[period], :4], emaxs_subsequent
+        )
+
+
+@pytest.mark.parametrize(
+    "num_periods, num_types, edu_starts, edu_max",
+    [(10, 1, [10], 15), (10, 3, [10, 12], 13)],
+)
+def test_compact_indexer_matches_dense_indexer(
+    num_periods, num_types, edu_starts, edu_max
+):
+    """Test that the compact indexer yields the same lookups as the dense one."""
+    dense = StateSpace(num_periods, num_types, edu_starts, edu_max)
+    compact = StateSpace(
+        num_periods, num_types, edu_starts, edu_max, indexer_type="compact"
+    )
+
+    np.testing.assert_array_equal(dense.states, compact.states)
+    np.testing.assert_array_equal(dense.child_indices, compact.child_indices)
+    np.testing.assert_array_equal(dense.indexer, np.array(compact.indexer))
+
+    # Lookup all types at once as done in the evaluation and simulation.
+    idx = np.random.randint(dense.num_states, size=100)
+    period, exp_a, exp_b, edu, choice_lagged, type_ = dense.states[idx].T
+    np.testing.assert_array_equal(
+        dense.indexer[period, exp_a, exp_b, edu, choice_lagged - 1, :],
+        compact.indexer[period, exp_a, exp_b, edu, choice_lagged - 1, :],
+    )
+
+    # Negative indices count from the end of the dimension.
+    np.testing.assert_array_equal(
+        dense.indexer[-1, exp_a, exp_b, -edu_max - 1 + edu, -1, :],
+        compact.indexer[-1, exp_a, exp_b, -edu_max - 1 + edu, -1, :],
+    )
+
+    # Inadmissible states, e.g. working in occupation A without experience, are
+    # signaled by -1.
+    np.testing.assert_array_equal(
+        compact.indexer[period, 0, exp_b, edu, 0, type_], -1
+    )
+
+    for i in idx[:10]:
+        period, exp_a, exp_b, edu, choice_lagged, type_ = dense.states[i]
+        k = get_index_from_compact_indexer(
+            compact.indexer.arrays, period, exp_a, exp_b, edu, choice_lagged - 1, type_
+        )
+        assert k == i
+
+    with pytest.raises(ValueError, match="Unknown indexer_type 'sparse'."):
+        StateSpace(num_periods, num_types, edu_starts, edu_max, indexer_type="sparse")
+
+
+def test_compact_indexer_option_yields_identical_simulation():
+    """Test that the simulated sample does not depend on the type of the indexer."""
+    constr = {"program": {"version": "python"}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    _, df = RespyCls(params_spec, options_spec).simulate()
+
+    options_spec["solution"]["indexer"] = "compact"
+    respy_obj, df_compact = RespyCls(params_spec, options_spec).simulate()
+
+    assert isinstance(respy_obj.get_attr("state_space").indexer, CompactIndexer)
+    assert_frame_equal(df, df_compact)
+
+
+def test_rewards_of_type_invariant_core_match_full_state_space():
+    """Test that broadcasting type shifts over the core yields the original rewards."""
+    params_spec, options_spec = generate_random_model()
+    respy_obj = RespyCls(params_spec, options_spec)
+
+    num_periods, num_types, optim_paras, edu_spec = dist_class_attributes(
+        respy_obj, "num_periods", "num_types", "optim_paras", "edu_spec"
+    )
+
+    state_space = StateSpace(
+        num_periods, num_types, edu_spec["start"], edu_spec["max"], optim_paras
+    )
+
+    assert state_space.states_core.shape[0] * num_types == state_space.num_states
+    for period in range(num_periods):
+        np.testing.assert_array_equal(
+            state_space.get_attribute_from_period("covariates", period),
+            create_covariates(state_space.get_attribute_from_period("states", period)),
+        )
+    np.testing.assert_array_equal(
+        state_space.covariates, create_covariates(state_space.states)
+    )
+    assert state_space.covariates is state_space.covariates
+
+    rewards = np.column_stack(
+        pyth_calculate_rewards_systematic(
+            state_space.states, state_space.covariates, optim_paras
+        )
+    )
+    assert_almost_equal(state_space.rewards, rewards)
+
+    # The buffer is reused for subsequent updates.
+    buffer = state_space.rewards
+    state_space.update_systematic_rewards(optim_paras)
+    assert state_space.rewards is buffer
+
+
+@pytest.mark.parametrize("indexer_type", ["dense", "compact"])
+def test_state_space_cache(tmp_path, indexer_type):
+    """Test that a cached state space is loaded as memory maps and is unchanged."""
+    args = (5, 2, [10, 12], 15)
+    state_space = StateSpace(*args, indexer_type=indexer_type)
+
+    StateSpace(*args, indexer_type=indexer_type, cache=tmp_path)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    cached_state_space = StateSpace(*args, indexer_type=indexer_type, cache=tmp_path)
+
+    assert isinstance(cached_state_space.states, np.memmap)
+    for attr in ["states", "states_core", "covariates", "child_indices"]:
+        np.testing.assert_array_equal(
+            getattr(state_space, attr), getattr(cached_state_space, attr)
+        )
+    np.testing.assert_array_equal(
+        np.array(state_space.indexer), np.array(cached_state_space.indexer)
+    )
+    assert state_space.slices_by_periods == cached_state_space.slices_by_periods
+
+
+def test_incremental_update_of_rewards():
+    """Test that updating only the changed reward components gives the full result."""
+    params_spec, options_spec = generate_random_model()
+    respy_obj = RespyCls(params_spec, options_spec)
+
+    num_periods, num_types, optim_paras, edu_spec = dist_class_attributes(
+        respy_obj, "num_periods", "num_types", "optim_paras", "edu_spec"
+    )
+    args = (num_periods, num_types, edu_spec["start"], edu_spec["max"])
+
+    state_space = StateSpace(*args, optim_paras)
+
+    for key in [
+        "coeffs_a",
+        "coeffs_b",
+        "coeffs_edu",
+        "coeffs_home",
+        "coeffs_common",
+        "type_shifts",
+    ]:
+        optim_paras = {**optim_paras, key: optim_paras[key].copy()}
+        optim_paras[key].flat[np.random.randint(optim_paras[key].size)] += 0.01
+
+        state_space.update_systematic_rewards(optim_paras)
+
+        np.testing.assert_array_equal(
+            state_space.rewards, StateSpace(*args, optim_paras).rewards
+        )
+
+
+@pytest.mark.parametrize("is_interpolated", [False, True])
+def test_batched_backward_induction_matches_sequential_solutions(is_interpolated):
+    """Test that solving the model for multiple sets of parameters at once yields the
+    same emaxs as solving the model for each set of parameters.
+
+    """
+    constr = {"interpolation": {"flag": is_interpolated}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+
+    num_periods, num_types, optim_paras, edu_spec, num_draws_emax, seed_emax = (
+        dist_class_attributes(
+            respy_obj,
+            "num_periods",
+            "num_types",
+            "optim_paras",
+            "edu_spec",
+            "num_draws_emax",
+            "seed_emax",
+        )
+    )
+    num_points_interp = respy_obj.get_attr("num_points_interp")
+    periods_draws_emax = create_draws(num_periods, num_draws_emax, seed_emax, True)
+    state_space = StateSpace(num_periods, num_types, edu_spec["start"], edu_spec["max"])
+
+    optim_paras_sets = [
+        optim_paras,
+        {
+            **optim_paras,
+            "coeffs_a": optim_paras["coeffs_a"] + 0.01,
+            "shocks_cholesky": optim_paras["shocks_cholesky"] * 1.2,
+            "delta": optim_paras["delta"] * 0.5,
+        },
+        {**optim_paras, "delta": np.zeros(1)},
+    ]
+
+    rewards, emaxs = [], []
+    for optim_paras_ in optim_paras_sets:
+        state_space.update_systematic_rewards(optim_paras_)
+        rewards.append(state_space.rewards.copy())
+
+        np.random.seed(123)
+        pyth_backward_induction(
+            periods_draws_emax,
+            state_space,
+            True,
+            is_interpolated,
+            num_points_interp,
+            optim_paras_,
+            "",
+            False,
+        )
+        emaxs.append(state_space.emaxs.copy())
+
+    np.random.seed(123)
+    emaxs_batch = pyth_backward_induction_batch(
+        periods_draws_emax,
+        state_space,
+        True,
+        is_interpolated,
+        num_points_interp,
+        np.stack(rewards),
+        np.array([op["delta"] for op in optim_paras_sets]).reshape(-1),
+        np.stack([op["shocks_cholesky"] for op in optim_paras_sets]),
+    )
+
+    np.testing.assert_allclose(emaxs_batch, np.stack(emaxs), rtol=1e-10)
+
+    # Options which require different draws or weights for each set are rejected.
+    for kwargs in [{"is_control_variate": True}, {"tolerance_emax": 0.1}]:
+        with pytest.raises(ValueError):
+            pyth_backward_induction_batch(
+                periods_draws_emax,
+                state_space,
+                True,
+                is_interpolated,
+                num_points_interp,
+                np.stack(rewards),
+                np.array([op["delta"] for op in optim_paras_sets]).reshape(-1),
+                np.stack([op["shocks_cholesky"] for op in optim_paras_sets]),
+                **kwargs,
+            )
+
+
+def test_endogenous_variable_is_only_simulated_at_interpolation_points():
+    """Test that integrating only the subset matches integrating all states."""
+    num_states, num_draws = 100, 50
+    rewards = np.random.uniform(0, 10, size=(num_states, 9))
+    emaxs = np.random.uniform(0, 10, size=(num_states, 4))
+    max_emax = np.random.uniform(0, 10, size=num_states)
+    is_simulated = np.random.choice([True, False], size=num_states)
+    draws = np.random.randn(num_draws, 4)
+    max_education = np.random.choice([True, False], size=num_states)
+
+    weights = np.full(draws.shape[0], 1 / draws.shape[0])
+
+    endogenous = get_endogenous_variable(
+        rewards, emaxs, max_emax, is_simulated, draws, weights, 0.95, max_education
+    )
+
+    emax = construct_emax_risk(
+        rewards[:, -2:], rewards[:, :4], emaxs, draws, weights, 0.95, max_education
+    )
+    expected = np.where(is_simulated, emax - max_emax, np.nan)
+
+    np.testing.assert_array_equal(endogenous, expected)
+
+
+def test_interpolation_points_from_random_state_leave_global_state_unchanged():
+    """Test that the interpolation points drawn with a seeded random number generator
+    are reproducible and do not advance the global random number generator.
+
+    """
+    np.random.seed(0)
+    expected = np.random.random_sample()
+
+    np.random.seed(0)
+    points = [
+        get_simulated_indicator(10, 100, 0, False, np.random.RandomState(1))
+        for _ in range(2)
+    ]
+
+    np.testing.assert_array_equal(points[0], points[1])
+    assert points[0].sum() == 10
+    assert np.random.random_sample() == expected
+
+
+def test_streaming_evaluation_matches_evaluation_after_solution():
+    """Test that evaluating the likelihood during the backward induction yields the
+    same contributions as evaluating it after the model is solved.
+
+    """
+    constr = {"interpolation": {"flag": False}, "program": {"version": "python"}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj, df = respy_obj.simulate()
+
+    (
+        state_space,
+        optim_paras,
+        num_periods,
+        num_draws_emax,
+        seed_emax,
+        num_draws_prob,
+        seed_prob,
+        tau,
+    ) = dist_class_attributes(
+        respy_obj,
+        "state_space",
+        "optim_paras",
+        "num_periods",
+        "num_draws_emax",
+        "seed_emax",
+        "num_draws_prob",
+        "seed_prob",
+        "tau",
+    )
+    periods_draws_emax = create_draws(num_periods, num_draws_emax, seed_emax, True)
+    periods_draws_prob = create_draws(num_periods, num_draws_prob, seed_prob, True)
+
+    contribs = pyth_contributions(
+        state_space, df, periods_draws_prob, tau, optim_paras
+    )
+
+    emaxs_by_period = pyth_backward_induction_by_period(
+        periods_draws_emax, state_space, True, False, 1, optim_paras, "", False
+    )
+    contribs_streaming = pyth_contributions(
+        state_space, df, periods_draws_prob, tau, optim_paras, emaxs_by_period
+    )
+
+    np.testing.assert_array_equal(contribs, contribs_streaming)
+
+    # The data can be prepared once and reused in every evaluation.
+    prepared_data = prepare_data_for_contributions(state_space, df)
+    for _ in range(2):
+        contribs_prepared = pyth_contributions(
+            state_space, prepared_data, periods_draws_prob, tau, optim_paras
+        )
+        np.testing.assert_array_equal(contribs, contribs_prepared)
+
+    # Observations without wages are grouped into cells. Evaluating each observation
+    # separately yields the same contributions.
+    inverse = prepared_data["idx_unique_observations_inverse"]
+    assert inverse.max() + 1 <= df.shape[0]
+    prepared_data_all = {
+        **prepared_data,
+        "unique_observations": {
+            key: value[inverse]
+            for key, value in prepared_data["unique_observations"].items()
+        },
+        "idx_unique_observations_inverse": np.arange(df.shape[0]),
+    }
+    contribs_all = pyth_contributions(
+        state_space, prepared_data_all, periods_draws_prob, tau, optim_paras
+    )
+    np.testing.assert_array_equal(contribs, contribs_all)
+
+
+def test_fused_probability_of_observation():
+    """Test that the fused kernel matches the adjustment of draws and the simulation of
+    choice probabilities in separate steps.
+
+    """
+    num_obs, num_periods, num_draws = 200, 3, 50
+    periods_draws_prob = np.random.randn(num_periods, num_draws, 4)
+    sc = np.tril(np.random.uniform(0.1, 0.5, size=(4, 4)))
+
+    choices = np.random.randint(1, 5, size=num_obs)
+    wages_observed = np.where(choices <= 2, np.random.lognormal(size=num_obs), np.nan)
+    wages_observed[np.random.choice([True, False], size=num_obs)] = np.nan
+    wages_systematic = np.random.lognormal(size=(num_obs, 2))
+    rewards_systematic = np.random.uniform(0, 10, size=(num_obs, 4))
+    emaxs = np.random.uniform(0, 10, size=(num_obs, 4))
+    periods = np.random.randint(num_periods, size=num_obs)
+    max_education = np.random.choice([True, False], size=num_obs)
+    delta, tau = 0.95, 500.0
+
+    draws, prob_wages = create_draws_and_prob_wages(
+        wages_observed, wages_systematic, periods, periods_draws_prob, choices, sc
+    )
+    prob_choices = simulate_probability_of_agents_observed_choice(
+        wages_systematic,
+        rewards_systematic,
+        emaxs,
+        draws,
+        delta,
+        max_education,
+        choices - 1,
+        tau,
+    )
+    expected = (prob_choices * prob_wages).mean(axis=1)
+
+    prob_obs = simulate_probability_of_observation(
+        wages_observed,
+        wages_systematic,
+        rewards_systematic,
+        emaxs,
+        periods,
+        periods_draws_prob,
+        choices,
+        sc,
+        delta,
+        max_education,
+        tau,
+        False,
+    )
+    np.testing.assert_allclose(prob_obs, expected, rtol=1e-12)
+
+    log_prob_obs = simulate_probability_of_observation(
+        wages_observed,
+        wages_systematic,
+        rewards_systematic,
+        emaxs,
+        periods,
+        periods_draws_prob,
+        choices,
+        sc,
+        delta,
+        max_education,
+        tau,
+        True,
+    )
+    np.testing.assert_allclose(np.exp(log_prob_obs), expected, rtol=1e-10)
+
+
+def test_log_contributions_do_not_underflow():
+    """Test that log contributions match the contributions in levels and that they are
+    finite for long panels where the contributions in levels underflow.
+
+    """
+    constr = {"interpolation": {"flag": False}, "program": {"version": "python"}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj, df = respy_obj.simulate()
+
+    state_space, optim_paras, num_periods, num_draws_prob, seed_prob, tau = (
+        dist_class_attributes(
+            respy_obj,
+            "state_space",
+            "optim_paras",
+            "num_periods",
+            "num_draws_prob",
+            "seed_prob",
+            "tau",
+        )
+    )
+    periods_draws_prob = create_draws(num_periods, num_draws_prob, seed_prob, True)
+    args = (state_space, df, periods_draws_prob, tau, optim_paras)
+
+    contribs = pyth_contributions(*args)
+    log_contribs = pyth_contributions(*args, is_log=True)
+    np.testing.assert_allclose(np.exp(log_contribs), contribs, rtol=1e-10)
+
+    # Duplicate the panel of each agent many times to provoke an underflow.
+    prepared_data = prepare_data_for_contributions(state_space, df)
+    num_obs_per_agent = np.bincount(df.Identifier.values)
+    num_repetitions = 1000
+    idx = np.concatenate(
+        [
+            np.tile(np.arange(start, start + num_obs), num_repetitions)
+            for start, num_obs in zip(
+                prepared_data["idx_agents_first_observation"], num_obs_per_agent
+            )
+        ]
+    )
+    long_data = {
+        **prepared_data,
+        "idx_unique_observations_inverse": prepared_data[
+            "idx_unique_observations_inverse"
+        ][idx],
+        "idx_agents_first_observation": prepared_data["idx_agents_first_observation"]
+        * num_repetitions,
+    }
+    args = (state_space, long_data, periods_draws_prob, tau, optim_paras)
+
+    log_contribs_long = pyth_contributions(*args, is_log=True)
+    assert np.isfinite(log_contribs_long).all()
+    if state_space.num_types == 1:
+        np.testing.assert_allclose(log_contribs_long, log_contribs * num_repetitions)
+
+
+def test_pool_evaluation_matches_serial_evaluation():
+    """Test that a pool of processes yields the same contributions as the serial
+    evaluation and that the state space is usable after the pool is closed.
+
+    """
+    constr = {"program": {"version": "python"}, "estimation": {"agents": 20}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj, df = respy_obj.simulate()
+
+    state_space, optim_paras, num_periods, num_draws_prob, seed_prob, tau = (
+        dist_class_attributes(
+            respy_obj,
+            "state_space",
+            "optim_paras",
+            "num_periods",
+            "num_draws_prob",
+            "seed_prob",
+            "tau",
+        )
+    )
+    periods_draws_prob = create_draws(num_periods, num_draws_prob, seed_prob, True)
+    emaxs = state_space.emaxs.copy()
+
+    pool = ContributionsPool(state_space, df, periods_draws_prob, tau, 2)
+    np.testing.assert_array_equal(state_space.emaxs, emaxs)
+
+    for is_log in [False, True]:
+        contribs = pyth_contributions(
+            state_space, df, periods_draws_prob, tau, optim_paras, is_log=is_log
+        )
+        contribs_pool = pool.evaluate(optim_paras, is_log=is_log)
+        np.testing.assert_array_equal(contribs, contribs_pool)
+
+    pool.close()
+    np.testing.assert_array_equal(state_space.emaxs, emaxs)
+
+
+@pytest.mark.parametrize("is_interpolated", [False, True])
+def test_batched_criterion_matches_sequential_criterion(is_interpolated):
+    """Test that evaluating the criterion function at multiple points at once yields the
+    same values as evaluating it at each point.
+
+    """
+    constr = {
+        "program": {"version": "python"},
+        "estimation": {"agents": 20},
+        "interpolation": {"flag": is_interpolated},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj, df = respy_obj.simulate()
+
+    (
+        state_space,
+        optim_paras,
+        num_paras,
+        num_periods,
+        num_draws_emax,
+        seed_emax,
+        num_draws_prob,
+        seed_prob,
+        num_points_interp,
+        tau,
+    ) = dist_class_attributes(
+        respy_obj,
+        "state_space",
+        "optim_paras",
+        "num_paras",
+        "num_periods",
+        "num_draws_emax",
+        "seed_emax",
+        "num_draws_prob",
+        "seed_prob",
+        "num_points_interp",
+        "tau",
+    )
+    args = (
+        is_interpolated,
+        num_points_interp,
+        True,
+        prepare_data_for_contributions(state_space, df),
+        tau,
+        create_draws(num_periods, num_draws_emax, seed_emax, True),
+        create_draws(num_periods, num_draws_prob, seed_prob, True),
+        state_space,
+        False,
+        None,
+        False,
+        None,
+        seed_emax,
+    )
+
+    x = get_optim_paras(optim_paras, num_paras, "all", True)
+    xs = [x, x + 0.001, x * 1.001]
+
+    fvals = [pyth_criterion(x_, *args) for x_ in xs]
+    fvals_batch = pyth_criterion_batch(xs, *args)
+
+    np.testing.assert_allclose(fvals_batch, fvals, rtol=1e-10)
+
+    # The rewards are consistent with the parameters of the last update.
+    rewards = state_space.rewards.copy()
+    state_space.update_systematic_rewards(distribute_parameters(xs[-1], True))
+    np.testing.assert_array_equal(state_space.rewards, rewards)
+
+
+@pytest.mark.parametrize("indexer_type", ["dense", "compact"])
+def test_criterion_pool_matches_serial_criterion(indexer_type):
+    """Test that a pool of processes which receives the large arrays in shared memory
+    yields the same values of the criterion function as the serial evaluation.
+
+    """
+    constr = {
+        "program": {"version": "python"},
+        "estimation": {"agents": 20},
+        "solution": {"indexer": indexer_type},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj, df = respy_obj.simulate()
+
+    (
+        state_space,
+        optim_paras,
+        num_paras,
+        num_periods,
+        num_draws_emax,
+        seed_emax,
+        num_draws_prob,
+        seed_prob,
+        is_interpolated,
+        num_points_interp,
+        tau,
+    ) = dist_class_attributes(
+        respy_obj,
+        "state_space",
+        "optim_paras",
+        "num_paras",
+        "num_periods",
+        "num_draws_emax",
+        "seed_emax",
+        "num_draws_prob",
+        "seed_prob",
+        "is_interpolated",
+        "num_points_interp",
+        "tau",
+    )
+    args = (
+        is_interpolated,
+        num_points_interp,
+        True,
+        prepare_data_for_contributions(state_space, df),
+        tau,
+        create_draws(num_periods, num_draws_emax, seed_emax, True),
+        create_draws(num_periods, num_draws_prob, seed_prob, True),
+        state_space,
+        False,
+        None,
+        False,
+        None,
+        seed_emax,
+        None,
+    )
+
+    x = get_optim_paras(optim_paras, num_paras, "all", True)
+    xs = [x, x + 0.001, x * 1.001]
+
+    pool = CriterionPool(args, 2)
+    fvals_pool = pool.evaluate(xs)
+    pool.close()
+
+    fvals = [pyth_criterion(x_, *args) for x_ in xs]
+    np.testing.assert_array_equal(fvals_pool, fvals)
+
+
+def test_criterion_cache_does_not_change_estimation():
+    """Test that the cache of the criterion function does not change the estimation and
+    that a restarted estimation replays all evaluations from the cache file.
+
+    """
+    constr = {
+        "program": {"version": "python", "procs": 1},
+        "estimation": {"maxfun": 20, "agents": 50, "optimizer": "SCIPY-LBFGSB"},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    simulate_observed(RespyCls(params_spec, options_spec))
+
+    base = None
+    for cache, cache_file in [(0, None), (50, "crit.respy.cache")] * 2:
+        options_spec["estimation"]["cache"] = cache
+        options_spec["estimation"]["cache_file"] = cache_file
+
+        respy_obj = RespyCls(params_spec, options_spec)
+        x, crit_val = respy_obj.fit()
+
+        if base is None:
+            base = x, crit_val
+        np.testing.assert_equal(base, (x, crit_val))
+
+    with open("est.respy.info") as in_file:
+        numbers = {
+            line.rsplit(None, 1)[0]: int(line.split()[-1])
+            for line in in_file
+            if line.startswith(" Number of")
+        }
+
+    assert numbers[" Number of Evaluations"] == numbers[" Number of Cache Hits"] > 0
+
+
+@pytest.mark.parametrize("sequence", ["sobol", "halton"])
+def test_quasi_random_draws_are_more_even_than_random_draws(sequence):
+    """Test that draws based on low-discrepancy sequences are reproducible, differ
+    between periods and match the moments of the standard normal distribution more
+    closely than pseudo-random draws.
+
+    """
+    pytest.importorskip("scipy.stats.qmc")
+
+    num_periods, num_draws, seed = 3, 256, 123
+
+    draws = create_draws(num_periods, num_draws, seed, False, sequence)
+    draws_random = create_draws(num_periods, num_draws, seed, False)
+
+    assert draws.shape == draws_random.shape
+    assert np.all(np.isfinite(draws))
+    np.testing.assert_array_equal(
+        draws, create_draws(num_periods, num_draws, seed, False, sequence)
+    )
+    assert not np.allclose(draws[0], draws[1])
+
+    for draws_ in [draws, draws_random]:
+        error_mean = np.abs(draws_.mean(axis=1)).max()
+        error_std = np.abs(draws_.std(axis=1) - 1).max()
+        if draws_ is draws:
+            errors = error_mean, error_std
+        else:
+            assert errors[0] < error_mean
+            assert errors[1] < error_std
+
+
+@pytest.mark.parametrize("rule", ["product", "smolyak"])
+def test_quadrature_rules_integrate_polynomials_exactly(rule):
+    """Test that the quadrature rules of level four integrate the moments of the
+    standard normal distribution up to degree seven exactly.
+
+    """
+    nodes, weights = create_quadrature(2, rule, 4)
+
+    np.testing.assert_array_equal(nodes[0], nodes[1])
+    np.testing.assert_allclose(weights.sum(), 1)
+    np.testing.assert_allclose(weights @ nodes[0], 0, atol=1e-12)
+    np.testing.assert_allclose(weights @ nodes[0] ** 4, 3)
+    np.testing.assert_allclose(weights @ nodes[0] ** 6, 15)
+    np.testing.assert_allclose(weights @ np.prod(nodes[0][:, :3] ** 2, axis=1), 1)
+
+
+def test_quadrature_approximates_monte_carlo_integration_of_emax():
+    """Test that the emax integrated with a product rule with few nodes matches the
+    emax integrated with many random draws.
+
+    """
+    num_states = 20
+    rewards = np.random.uniform(0, 2, size=(num_states, 9))
+    rewards[:, -2:] = np.random.uniform(1, 2, size=(num_states, 2))
+    emaxs = np.random.uniform(0, 2, size=(num_states, 4))
+    max_education = np.random.choice([True, False], size=num_states)
+    shocks_cholesky = np.diag([0.2, 0.2, 1.0, 1.0])
+
+    nodes, weights = create_quadrature(1, "product", 6)
+    draws = np.random.randn(200000, 4)
+
+    emax_quadrature, emax_monte_carlo = [
+        construct_emax_risk(
+            rewards[:, -2:],
+            rewards[:, :4],
+            emaxs,
+            transform_disturbances(draws_, np.zeros(4), shocks_cholesky),
+            weights_,
+            0.95,
+            max_education,
+        )
+        for draws_, weights_ in [
+            (nodes[0], weights),
+            (draws, np.full(draws.shape[0], 1 / draws.shape[0])),
+        ]
+    ]
+
+    np.testing.assert_allclose(emax_quadrature, emax_monte_carlo, rtol=2e-2)
+
+
+def test_variance_reduction_lowers_the_error_of_the_emax():
+    """Test that antithetic draws and control variates each reduce the mean squared
+    error of the emax and that both together at least halve it.
+
+    """
+    num_states, num_draws = 20, 100
+    rewards = np.random.uniform(0, 2, size=(num_states, 9))
+    rewards[:, -2:] = np.random.uniform(1, 2, size=(num_states, 2))
+    emaxs = np.random.uniform(0, 2, size=(num_states, 4))
+    max_education = np.random.choice([True, False], size=num_states)
+    shocks_cholesky = np.diag([0.5, 0.5, 1.0, 1.0])
+    shifts = np.zeros(4)
+    shifts[:2] = np.exp(np.diag(shocks_cholesky.dot(shocks_cholesky.T))[:2] / 2)
+
+    def emax(draws, weights):
+        return construct_emax_risk(
+            rewards[:, -2:], rewards[:, :4], emaxs, draws, weights, 0.95, max_education
+        )
+
+    draws = np.random.randn(500000, 4)
+    draws = transform_disturbances(draws, np.zeros(4), shocks_cholesky)
+    expected = emax(draws, np.full(draws.shape[0], 1 / draws.shape[0]))
+
+    errors = {key: [] for key in ["plain", "antithetic", "cv", "both"]}
+    weights = np.full(num_draws, 1 / num_draws)
+    for seed in range(30):
+        for is_antithetic in [False, True]:
+            draws = create_draws(1, num_draws, seed, False, is_antithetic=is_antithetic)
+            assert np.allclose(draws.mean(axis=1), 0) == is_antithetic
+
+            draws = transform_disturbances(draws[0], np.zeros(4), shocks_cholesky)
+            weights_cv = get_control_variate_weights(draws, weights, shifts)
+            np.testing.assert_allclose(weights_cv.sum(), 1)
+            np.testing.assert_allclose(weights_cv.dot(draws[:, :2]), shifts[:2])
+
+            key, key_cv = ("antithetic", "both") if is_antithetic else ("plain", "cv")
+            errors[key].append(((emax(draws, weights) - expected) ** 2).mean())
+            errors[key_cv].append(((emax(draws, weights_cv) - expected) ** 2).mean())
+
+    mse = {key: np.mean(value) for key, value in errors.items()}
+    assert mse["antithetic"] < mse["plain"]
+    assert mse["cv"] < mse["plain"]
+    assert mse["both"] < mse["plain"] / 2
+
+
+def test_adaptive_emax_stops_once_the_tolerance_is_reached():
+    """Test that the number of draws is doubled until the standard errors of the
+    simulated emaxs are below the tolerance.
+
+    """
+    num_states, num_draws = 20, 1000
+    rewards = np.random.uniform(0, 2, size=(num_states, 9))
+    emaxs = np.random.uniform(0, 2, size=(num_states, 4))
+    max_education = np.random.choice([True, False], size=num_states)
+    draws = transform_disturbances(
+        np.random.randn(num_draws, 4), np.zeros(4), np.diag([0.2, 0.2, 1.0, 1.0])
+    )
+    args = (rewards[:, -2:], rewards[:, :4], emaxs, draws, 0.95, max_education)
+
+    # Compute the maximum utility of each draw with shape (num_draws, num_states).
+    utilities = construct_emax_risk(
+        *args[:3], draws[:, None, None], np.ones(1), *args[4:]
+    )
+
+    for tolerance, expected in [(1e10, 50), (1e-10, num_draws), (0.05, None)]:
+        emax, num_draws_used = get_adaptive_emax(*args, tolerance)
+
+        np.testing.assert_allclose(emax, utilities[:num_draws_used].mean(axis=0))
+        if expected is not None:
+            assert num_draws_used == expected
+        else:
+            assert num_draws_used in [100, 200, 400, 800]
+            for num, is_below in [(num_draws_used, True), (num_draws_used // 2, False)]:
+                std_error = utilities[:num].std(axis=0, ddof=1) / np.sqrt(num)
+                assert np.all(std_error <= tolerance) == is_below
+
+
+def test_adaptive_number_of_draws_is_recorded_in_the_solution_log():
+    """Test that the number of draws used in each period is written to the log."""
+    constr = {
+        "program": {"version": "python", "procs": 1},
+        "solution": {"tolerance": 1.0},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    params_spec.loc[("delta", "delta"), "para"] = 0.95
+
+    respy_obj = RespyCls(params_spec, options_spec)
+    respy_obj.simulate()
+
+    num_periods, num_draws_emax = dist_class_attributes(
+        respy_obj, "num_periods", "num_draws_emax"
+    )
+    with open(respy_obj.get_attr("file_sim") + ".respy.sol") as file_:
+        lines = [line.split() for line in file_ if " used " in line]
+
+    assert [int(line[2]) for line in lines] == list(reversed(range(num_periods)))
+    assert all(0 < int(line[4]) <= num_draws_emax for line in lines)
+
+
+@pytest.mark.parametrize("num_agents", [1, 500])
+def test_initial_conditions_match_sampling_agent_by_agent(num_agents):
+    """Test that the batched sampling of initial conditions yields the same agents as
+    drawing the type and the lagged choice of each agent separately.
+
+    """
+    params_spec, options_spec = generate_random_model()
+    respy_obj = RespyCls(params_spec, options_spec)
+    edu_spec, optim_paras, num_types = dist_class_attributes(
+        respy_obj, "edu_spec", "optim_paras", "num_types"
+    )
+    type_info = sort_type_info(optim_paras, num_types)
+
+    np.random.seed(123)
+    edu_start = get_random_edu_start(edu_spec, num_agents, False)
+    types = get_random_types(num_types, optim_paras, num_agents, edu_start, False)
+    lagged = get_random_choice_lagged_start(edu_spec, num_agents, edu_start, False)
+
+    np.random.seed(123)
+    expected_edu_start = get_random_edu_start(edu_spec, num_agents, False)
+    expected_types = [
+        np.random.choice(
+            type_info["order"],
+            p=get_conditional_probabilities(type_info["shares"], np.array([edu])),
+        )
+        for edu in expected_edu_start
+    ]
+    expected_lagged = []
+    for edu in expected_edu_start:
+        share = edu_spec["lagged"][edu_spec["start"].index(edu)]
+        expected_lagged.append(np.random.choice([3, 4], p=[share, 1 - share]))
+
+    np.testing.assert_array_equal(edu_start, expected_edu_start)
+    np.testing.assert_array_equal(types, expected_types)
+    np.testing.assert_array_equal(lagged, expected_lagged)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_simulation_in_chunks(chunk_size):
+    """Test that the simulation in chunks is reproducible and writes a complete sample
+    which is sorted by identifiers and periods.
+
+    """
+    constr = {
+        "program": {"version": "python", "procs": 1},
+        "simulation": {"chunk_size": chunk_size, "file": "chunks"},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+
+    respy_obj, df_returned = RespyCls(params_spec, options_spec).simulate()
+    df = read_dataset("chunks.respy.dat")
+    RespyCls(params_spec, options_spec).simulate()
+    df_repeated = read_dataset("chunks.respy.dat")
+
+    num_agents_sim, num_periods = dist_class_attributes(
+        respy_obj, "num_agents_sim", "num_periods"
+    )
+
+    assert df_returned is None
+    assert df.equals(df_repeated)
+    np.testing.assert_array_equal(
+        df["Identifier"], np.repeat(np.arange(num_agents_sim), num_periods)
+    )
+    np.testing.assert_array_equal(
+        df["Period"], np.tile(np.arange(num_periods), num_agents_sim)
+    )
+    assert df.drop(columns="Wage").notna().all().all()
+
+
+@pytest.mark.parametrize("num_procs", [2, 3])
+def test_pool_simulation_matches_serial_simulation(num_procs):
+    """Test that the simulation of chunks in a pool of processes yields the same sample
+    as the serial simulation.
+
+    """
+    constr = {
+        "program": {"version": "python", "procs": 1},
+        "estimation": {"streaming": False},
+        "simulation": {"chunk_size": 7, "file": "serial"},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    RespyCls(params_spec, options_spec).simulate()
+
+    options_spec["program"]["procs"] = num_procs
+    options_spec["simulation"]["file"] = "pool"
+    RespyCls(params_spec, options_spec).simulate()
+
+    assert read_dataset("serial.respy.dat").equals(read_dataset("pool.respy.dat"))
+
+
+def test_parquet_chunks_match_text_chunks():
+    """Test that the sample written to a Parquet file chunk by chunk matches the sample
+    appended to the text file.
+
+    """
+    pytest.importorskip("pyarrow")
+
+    constr = {
+        "program": {"version": "python", "procs": 1},
+        "simulation": {"chunk_size": 3, "file": "text"},
+    }
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    RespyCls(params_spec, options_spec).simulate()
+
+    options_spec["simulation"]["format"] = "parquet"
+    options_spec["simulation"]["file"] = "binary"
+    RespyCls(params_spec, options_spec).simulate()
+
+    df_binary = read_dataset("binary.respy.parquet")
+    assert df_binary["Period"].dtype == np.int16
+    assert_frame_equal(
+        df_binary.astype(DATA_FORMATS_SIM),
+        read_dataset("text.respy.dat").astype(DATA_FORMATS_SIM),
+        atol=1e-5,
+    )
+
+
+@pytest.mark.parametrize("num_chunks", [1, 2, 5])
+def test_info_from_chunks_matches_info_from_sample(num_chunks):
+    """Test that the summary statistics merged from chunks of agents yield the same
+    report as the full sample.
+
+    """
+    params_spec, options_spec = generate_random_model()
+    respy_obj, df = RespyCls(params_spec, options_spec).simulate()
+    file_sim, num_periods, num_types, edu_spec = dist_class_attributes(
+        respy_obj, "file_sim", "num_periods", "num_types", "edu_spec"
+    )
+
+    with open(file_sim + ".respy.info") as file_:
+        expected = file_.read()
+
+    agents = np.array_split(df["Identifier"].unique(), num_chunks)
+    statistics = None
+    for agents_chunk in agents:
+        chunk = df[df["Identifier"].isin(agents_chunk)]
+        statistics_chunk = get_info_statistics(chunk, num_periods, num_types, edu_spec)
+        if statistics is None:
+            statistics = statistics_chunk
+        else:
+            statistics = merge_info_statistics(statistics, statistics_chunk)
+    write_info_statistics(respy_obj, statistics)
+
+    with open(file_sim + ".respy.info") as file_:
+        assert file_.read() == expected
+
+
+@pytest.mark.parametrize("format_", ["npz", "parquet", "feather"])
+def test_binary_dataset_matches_text_dataset(format_):
+    """Test that the estimation sample read from a binary file matches the sample read
+    from the text file and that integer columns are stored with compact types.
+
+    """
+    if format_ in ["parquet", "feather"]:
+        pytest.importorskip("pyarrow")
+
+    params_spec, options_spec = generate_random_model()
+    respy_obj, df = RespyCls(params_spec, options_spec).simulate()
+
+    options_spec["simulation"]["format"] = format_
+    options_spec["simulation"]["file"] = "binary"
+    options_spec["estimation"]["file"] = "binary.respy." + format_
+    respy_obj_binary, df_binary = RespyCls(params_spec, options_spec).simulate()
+
+    df_read = read_dataset("binary.respy." + format_)
+    assert df_read["Period"].dtype == np.int16
+    assert_frame_equal(
+        df_read.astype(DATA_FORMATS_SIM), df_binary.reset_index(drop=True)
+    )
+
+    assert_frame_equal(
+        process_dataset(respy_obj_binary), process_dataset(respy_obj), rtol=1e-4
+    )
+
+
+def test_unknown_binary_format_is_rejected():
+    """Test that the error for an unknown file extension names the supported ones."""
+    params_spec, options_spec = generate_random_model()
+    _, df = RespyCls(params_spec, options_spec).simulate()
+
+    with pytest.raises(ValueError, match=r"Supported are \.parquet, \.feather, \.npz"):
+        write_dataset(df, "data.respy.csv")
+
+
+def test_transition_matrix_matches_crosstab():
+    """Test that the transition matrix counted with np.bincount matches the crosstab of
+    choices and subsequent choices, also if the rows of agents are interleaved.
+
+    """
+    params_spec, options_spec = generate_random_model()
+    _, df = RespyCls(params_spec, options_spec).simulate()
+    df = df.iloc[np.lexsort((df["Identifier"], df["Period"]))]
+
+    choice_next = df.groupby(level="Identifier")["Choice"].shift(-1)
+    expected = pd.crosstab(
+        pd.Categorical(df["Choice"], categories=range(1, 5)),
+        pd.Categorical(choice_next, categories=range(1, 5)),
+        normalize="index",
+        dropna=False,
+    ).to_numpy()
+
+    np.testing.assert_array_almost_equal(construct_transition_matrix(df), expected)
+
+
+def test_info_file_is_optional():
+    """Test that the report on the simulated sample is only written if requested."""
+    constr = {"simulation": {"info": False}}
+    params_spec, options_spec = generate_random_model(point_constr=constr)
+    RespyCls(params_spec, options_spec).simulate()
+
+    assert Path("data.respy.dat").exists()
+    assert not Path("data.respy.info").exists()
@@ -44,7 +44,12 @@ class TestClass(object):
         point_constr = {
             "interpolation": {"flag": is_interpolated},
             "program": {"procs": 1, "threads": 1, "version": "python"},
-            "estimation": {"maxfun": 0, "agents": num_agents},
+            "estimation": {
+                "maxfun": 0,
+                "agents": num_agents,
+                "streaming": False,
+                "cache": 0,
+            },
             "simulation": {"agents": num_agents},
             "num_periods": np.random.randint(1, 5),
         }
@@ -140,7 +145,7 @@ class TestClass(object):
         point_constr = {
             "interpolation": {"flag": False},
             "program": {"procs": 1, "threads": 1, "version": "python"},
-            "estimation": {"maxfun": 0},
+            "estimation": {"maxfun": 0, "streaming": False, "cache": 0},
         }
 
         params_spec, options_spec = generate_random_model(
@@ -194,7 +199,7 @@ class TestClass(object):
         point_constr = {
             "interpolation": {"flag": False},
             "program": {"procs": 1, "threads": 1, "version": "python"},
-            "estimation": {"maxfun": 0},
+            "estimation": {"maxfun": 0, "streaming": False, "cache": 0},
         }
 
         params_spec, options_spec = generate_random_model(
@@ -263,7 +268,12 @@ class TestClass(object):
 
         point_constr = {
             "program": {"version": "python"},
-            "estimation": {"maxfun": np.random.randint(1, 6), "agents": num_agents},
+            "estimation": {
+                "maxfun": np.random.randint(1, 6),
+                "agents": num_agents,
+                "streaming": False,
+                "cache": 0,
+            },
             "simulation": {"agents": num_agents},
         }
 
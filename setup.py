@@ -70,14 +70,17 @@ setup(
         "Operating System :: OS Independent",
         "Programming Language :: Python :: 3.6",
         "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.8",
     ],
     install_requires=[
         "numba>=0.43",
+        "numpy>=1.17",
         "pandas>=0.24",
         "scipy>=0.19",
         "pytest>=4.0",
         "pyaml",
     ],
+    extras_require={"parquet": ["pyarrow"], "qmc": ["scipy>=1.7"]},
     cmdclass={"build_py": CustonBuildCommand, "develop": CustomDevelopCommand},
     platforms="any",
     include_package_data=True,